@@ -0,0 +1,200 @@
+"""
+Approximate Nearest-Neighbour Retrieval
+
+An IVF-style index for TF-IDF document vectors. Vectors are reduced with
+TruncatedSVD, partitioned by a k-means coarse quantiser, and stored as
+inverted lists. A query probes the ``nprobe`` closest lists, scores their
+members in the reduced space, and re-ranks the best ``rerank`` candidates
+with exact sparse cosine similarity.
+
+``nprobe`` and ``rerank`` trade recall for latency: probing more lists and
+re-ranking more candidates approaches exact search. The index is meant for
+large corpora; below ANN_MIN_DOCUMENTS exact search is both faster and exact.
+"""
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+# Corpus size from which the approximate tier is worth using
+ANN_MIN_DOCUMENTS = 20000
+
+DEFAULT_COMPONENTS = 128
+DEFAULT_NPROBE = 8
+DEFAULT_RERANK = 500
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file index over SVD-reduced document vectors with exact re-ranking.
+    """
+
+    def __init__(self, n_components=DEFAULT_COMPONENTS, n_lists=None, random_state=42):
+        """
+        Args:
+            n_components (int): Dimensions kept by TruncatedSVD
+            n_lists (int, optional): Number of coarse clusters. Defaults to
+                about the square root of the corpus size.
+            random_state (int): Seed for the SVD and k-means
+        """
+        self.n_components = n_components
+        self.n_lists = n_lists
+        self.random_state = random_state
+        self.svd = None
+        self.components = None
+        self.centroids = None
+        self.embeddings = None
+        self.list_offsets = None
+        self.list_members = None
+        self.matrix = None
+
+    def fit(self, matrix, embeddings=None, svd=None):
+        """
+        Build the index for a document matrix.
+
+        Args:
+            matrix (scipy.sparse.csr_matrix): L2-normalised TF-IDF rows, kept
+                for exact re-ranking
+            embeddings (numpy.ndarray, optional): Precomputed L2-normalised
+                reduced vectors for the rows, used as-is (memory maps stay
+                memory maps); computed with TruncatedSVD if not given
+            svd (TruncatedSVD, optional): Fitted projection matching ``embeddings``
+
+        Returns:
+            IVFIndex: self
+        """
+        n_docs = matrix.shape[0]
+        self.matrix = matrix.tocsr()
+
+        if embeddings is None:
+            n_components = max(1, min(self.n_components, matrix.shape[1] - 1, n_docs - 1))
+            self.svd = TruncatedSVD(n_components=n_components, random_state=self.random_state)
+            embeddings = _normalize_rows(self.svd.fit_transform(matrix).astype(np.float32))
+            embeddings = np.ascontiguousarray(embeddings)
+        else:
+            self.svd = svd
+        # Projecting with the raw components avoids TruncatedSVD.transform's
+        # per-call input validation, which dominates single-query latency
+        self.components = np.ascontiguousarray(self.svd.components_.T, dtype=np.float32)
+        self.embeddings = embeddings
+
+        n_lists = self.n_lists or max(1, int(np.sqrt(n_docs)))
+        n_lists = min(n_lists, n_docs)
+        if n_docs > 10000:
+            quantiser = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state,
+                                        batch_size=4096, n_init=3)
+        else:
+            quantiser = KMeans(n_clusters=n_lists, random_state=self.random_state, n_init=3)
+        assignments = quantiser.fit_predict(self.embeddings)
+        self.centroids = _normalize_rows(quantiser.cluster_centers_.astype(np.float32))
+
+        # Inverted lists as one array of document ids grouped by list
+        self.list_members = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=n_lists)
+        self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return self
+
+    def parts(self):
+        """
+        Get the fitted coarse quantiser and inverted lists, for storing the
+        index alongside its matrix, embeddings and SVD (see restore).
+
+        Returns:
+            dict: Centroids, list offsets and list members
+        """
+        return {"centroids": self.centroids, "list_offsets": self.list_offsets, "list_members": self.list_members}
+
+    def restore(self, matrix, embeddings, svd, centroids, list_offsets, list_members):
+        """
+        Set up a fitted index from stored parts, without running the SVD or
+        k-means again.
+
+        Returns:
+            IVFIndex: self
+        """
+        self.matrix = matrix.tocsr()
+        self.svd = svd
+        self.components = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+        self.embeddings = embeddings
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_members = list_members
+        return self
+
+    def project(self, query_vector):
+        """Project a sparse query vector into the reduced, normalised space."""
+        reduced = np.asarray(query_vector @ self.components, dtype=np.float32).ravel()
+        norm = np.linalg.norm(reduced)
+        return reduced / norm if norm else reduced
+
+    def candidates(self, reduced_query, nprobe=DEFAULT_NPROBE):
+        """Get the document ids in the ``nprobe`` lists closest to the query."""
+        nprobe = min(nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ reduced_query
+        probed = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([
+            self.list_members[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probed
+        ])
+
+    def search(self, query_vector, top_k=5, nprobe=DEFAULT_NPROBE, rerank=DEFAULT_RERANK, reduced_query=None):
+        """
+        Find the approximate top-k documents for a query.
+
+        Args:
+            query_vector (scipy.sparse matrix): L2-normalised 1 x n_features query
+            top_k (int): Number of results
+            nprobe (int): Number of inverted lists to probe
+            rerank (int): Number of candidates re-ranked with exact cosine
+            reduced_query (numpy.ndarray, optional): Query already projected
+                with ``project``
+
+        Returns:
+            tuple: (document ids, exact similarities), best first
+        """
+        if reduced_query is None:
+            reduced_query = self.project(query_vector)
+        ids = self.candidates(reduced_query, nprobe)
+        if len(ids) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        # Approximate scores in the reduced space pick the shortlist
+        rerank = max(rerank, top_k)
+        if len(ids) > rerank:
+            approx = self.embeddings[ids] @ reduced_query
+            ids = ids[np.argpartition(-approx, rerank - 1)[:rerank]]
+
+        # Exact cosine on the shortlist
+        exact = np.asarray((self.matrix[ids] @ query_vector.T).todense()).ravel()
+        k = min(top_k, len(ids))
+        best = np.argpartition(-exact, k - 1)[:k]
+        best = best[np.argsort(-exact[best])]
+        return ids[best], exact[best]
+
+
+def exact_search(matrix, query_vector, top_k=5):
+    """
+    Exact top-k cosine search over L2-normalised sparse rows.
+
+    Returns:
+        tuple: (document ids, similarities), best first
+    """
+    scores = np.asarray((matrix @ query_vector.T).todense()).ravel()
+    k = min(top_k, len(scores))
+    if k == 0:
+        return np.array([], dtype=np.int64), scores[:0]
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    return best, scores[best]
+
+
+def recall_at_k(approx_ids, exact_ids):
+    """Fraction of the exact top-k ids that the approximate search also returned."""
+    if len(exact_ids) == 0:
+        return 1.0
+    return len(set(np.asarray(approx_ids).tolist()) & set(np.asarray(exact_ids).tolist())) / len(exact_ids)
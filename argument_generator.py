@@ -1,19 +1,155 @@
-import nltk
-from nltk.tokenize import word_tokenize
 import re
+import json
 import random
+import hashlib
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from string import Formatter
+from collections import OrderedDict
+from instrumentation import traced, stage
 from legal_data import (
     ipc_sections, it_act_sections, mv_act_sections, 
-    legal_precedents, get_offense_details, get_precedents_for_section
+    legal_precedents, fact_pattern_triggers, get_offense_details, get_precedents_for_section
 )
+from fact_patterns import FactPatternMatcher
+from bail_assessment import bail_assessor
+from text_normalization import normalize_text, normalize_batch
 
-# Ensure NLTK data is downloaded
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('punkt_tab')
+# Number of generated argument sets kept per generator
+ARGUMENT_CACHE_SIZE = 256
+
+# Cases rendered per thread pool task in batch generation
+BATCH_CHUNK_SIZE = 64
+
+BATCH_COLUMNS = ["case_id", "act", "section", "position", "arguments", "error"]
+
+# Bail factor (see legal_data.bail_factors) argued by each bail template, in template order;
+# None for a template that argues no single factor
+BAIL_TEMPLATE_FACTORS = {
+    "bail_favor": [
+        "community_roots", "bailable_offense", "first_offender", "weak_evidence", "medical_grounds",
+        "caregiver", "cooperation", "supporting_precedent", "investigation_complete", "long_custody"
+    ],
+    "bail_against": [
+        "non_bailable_offense", "flight_risk", "witness_tampering", "bail_violation", "investigation_pending",
+        "prior_record", "grave_offense", None, "strong_evidence", "organised_crime", "use_of_weapon"
+    ]
+}
+
+def request_rng(section, act, case_description, position, seed=0):
+    """
+    Get a random generator seeded from a hash of the request.
+    
+    The same request and seed always give the same sequence, independent of
+    the global random state and of other requests.
+    
+    Returns:
+        random.Random: Generator for this request
+    """
+    key = "\x1f".join([str(section), str(act), case_description, position, str(seed)])
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+class ArgumentTemplate:
+    """
+    An argument template parsed once into literal pieces and slot names.
+    """
+    
+    def __init__(self, text, factor=None):
+        self.text = text
+        # Bail factor the template argues, if any
+        self.factor = factor
+        # Literal pieces with a placeholder part for each slot, and the slot at each placeholder
+        self.parts = []
+        self.slot_positions = []
+        for literal, field, _, _ in Formatter().parse(text):
+            self.parts.append(literal)
+            if field:
+                self.slot_positions.append((len(self.parts), field))
+                self.parts.append("")
+        self.slots = frozenset(field for _, field in self.slot_positions)
+        self.literal = "".join(self.parts)
+    
+    def fits(self, available):
+        """Whether every slot of the template can be filled from ``available``."""
+        return self.slots <= available
+    
+    def render(self, values):
+        """Fill the slots; ``values`` must cover every slot (see fits)."""
+        if not self.slot_positions:
+            return self.literal
+        parts = self.parts[:]
+        for position, field in self.slot_positions:
+            parts[position] = values[field]
+        return "".join(parts)
+
+class PrecedentRanker:
+    """
+    TF-IDF vectors of precedent summaries and key points, for ranking a
+    section's precedents against a case description.
+    
+    The summaries are the rows of the legal predictor's precedent index, and
+    key points are vectorised with the same fitted vectorizer, so precedents
+    are ranked in the same normalised term space as precedent search and no
+    second vectorizer is fitted. Ranking a request costs one query transform
+    and a sparse dot product over the candidates' summary and key point rows.
+    """
+    
+    def __init__(self, precedents, predictor):
+        """
+        Args:
+            precedents (list): Precedent dicts to index; those outside the
+                predictor's precedent data are ranked last
+            predictor (LegalPredictor): Predictor whose precedent vectorizer
+                and matrix are reused
+        """
+        self.summary_matrix = predictor.build_precedent_index()
+        self.vectorizer = predictor.tfidf_vectorizer
+        summary_rows = {id(p): row for row, p in enumerate(predictor.precedent_data)}
+        
+        points = []
+        self.rows = {}
+        for precedent in precedents:
+            if id(precedent) not in summary_rows:
+                continue
+            precedent_points = precedent.get("key_points") or []
+            self.rows[id(precedent)] = (summary_rows[id(precedent)], len(points), len(precedent_points))
+            points.extend(precedent_points)
+        self.point_matrix = self.vectorizer.transform(normalize_batch(points)) if points else None
+    
+    def rank(self, case_description, precedents):
+        """
+        Rank precedents by similarity to a case description.
+        
+        A precedent scores the similarity of its summary plus that of its
+        best key point. Ties keep the given order.
+        
+        Returns:
+            list: (precedent, best key point or None) pairs, best first
+        """
+        known = [p for p in precedents if id(p) in self.rows]
+        if not known:
+            return [(p, (p.get("key_points") or [None])[0]) for p in precedents]
+        
+        spans = [self.rows[id(p)] for p in known]
+        query_vector = self.vectorizer.transform([normalize_text(case_description)]).T
+        summary_scores = (self.summary_matrix[[row for row, _, _ in spans]] @ query_vector).toarray().ravel()
+        point_rows = [row for _, start, count in spans for row in range(start, start + count)]
+        point_scores = (self.point_matrix[point_rows] @ query_vector).toarray().ravel() if point_rows else None
+        
+        ranked = []
+        offset = 0
+        for position, (precedent, (_, _, count)) in enumerate(zip(known, spans)):
+            scores = point_scores[offset:offset + count] if count else None
+            best = int(scores.argmax()) if count else None
+            score = summary_scores[position] + (scores[best] if count else 0.0)
+            ranked.append((-score, position, precedent, precedent["key_points"][best] if count else None))
+            offset += count
+        ranked.sort(key=lambda item: item[:2])
+        
+        unknown = [(p, (p.get("key_points") or [None])[0]) for p in precedents if id(p) not in self.rows]
+        return [(precedent, point) for _, _, precedent, point in ranked] + unknown
 
 class ArgumentGenerator:
     """
@@ -30,10 +166,46 @@ class ArgumentGenerator:
         
         # Common argument templates
         self.argument_templates = self._load_argument_templates()
+        
+        # Compiled fact-pattern triggers for case descriptions
+        self.fact_matcher = FactPatternMatcher(fact_pattern_triggers)
+        self._fitting = {}
+        self._ranker = None
+        self._ranker_lock = threading.Lock()
+        
+        # Predictor whose precedent index the ranker reuses; model.legal_predictor when None
+        self.predictor = None
+        
+        # Completed argument sets keyed by request, least recently used first
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _cached(self, key, build):
+        """Get a generated result from the LRU cache, building it on a miss."""
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+        if result is None:
+            result = build()
+            if "error" in result:
+                return result
+            with self._cache_lock:
+                self._cache[key] = result
+                while len(self._cache) > ARGUMENT_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        # Callers get their own argument list
+        return {name: list(value) if name in ("arguments", "bail_arguments") else value
+                for name, value in result.items()}
+    
+    def clear_cache(self):
+        """Drop all cached argument sets."""
+        with self._cache_lock:
+            self._cache.clear()
     
     def _load_argument_templates(self):
-        """Load argument templates for different types of cases."""
-        return {
+        """Load argument templates for different types of cases, parsed into ArgumentTemplates."""
+        templates = {
             # Templates for arguments in favor of defense
             "defense_favor": [
                 "The prosecution has failed to establish {element} beyond reasonable doubt.",
@@ -79,19 +251,30 @@ class ArgumentGenerator:
             "bail_against": [
                 "The offense is serious and non-bailable under section {section}.",
                 "The accused poses a flight risk due to the severity of punishment.",
-                "There is reasonable apprehension of witness tampering or evidence interference.",
-                "The accused has a history of non-appearance in court proceedings.",
+                "The accused may influence or threaten witnesses or tamper with evidence if released.",
+                "The accused has a history of non-appearance and has violated bail conditions before.",
                 "The investigation is ongoing and custody is necessary for proper investigation.",
-                "The accused may influence or threaten witnesses if released.",
+                "The accused has prior convictions or pending cases and is likely to reoffend if released.",
                 "Public sentiment is strong against the offense and may lead to law and order issues.",
                 "As established in {precedent}, bail should be denied in such circumstances.",
                 "There is prima facie strong evidence against the accused.",
-                "The accused has previously violated bail conditions in other cases."
+                "The offense involves an organised gang that may help the accused evade the trial if released.",
+                "A dangerous weapon was used, which shows the accused is a danger to the public."
             ]
         }
+        return {
+            kind: [ArgumentTemplate(text, factor) for text, factor in
+                   zip(texts, BAIL_TEMPLATE_FACTORS.get(kind, [None] * len(texts)))]
+            for kind, texts in templates.items()
+        }
     
-    def _get_case_elements(self, section, act, case_description):
-        """Extract key elements relevant to the case based on section and description."""
+    def _get_case_elements(self, section, act, case_description, section_elements=None):
+        """
+        Extract key elements relevant to the case based on section and description.
+        
+        ``section_elements`` takes the result of _section_elements when the
+        caller has already looked it up.
+        """
         elements = []
         
         # Common legal elements
@@ -100,51 +283,80 @@ class ArgumentGenerator:
             "documentary proof", "alibi", "criminal history", "chain of events"
         ]
         
-        # Extract specific elements from case description
-        tokens = word_tokenize(case_description.lower())
-        
-        # Look for certain patterns in the description
-        if "threat" in tokens or "intimidate" in tokens or "fear" in tokens:
-            elements.append("threat or intimidation")
-        
-        if "weapon" in tokens or "gun" in tokens or "knife" in tokens:
-            elements.append("use of dangerous weapon")
-        
-        if "plan" in tokens or "premeditate" in tokens or "conspire" in tokens:
-            elements.append("premeditation")
+        # Find fact patterns in the description in one pass over its tokens
+        elements.extend(self.fact_matcher.find(case_description))
         
-        if "confess" in tokens or "admit" in tokens:
-            elements.append("confession or admission")
+        # Add section-specific elements
+        elements.extend(self._section_elements(section, act) if section_elements is None else section_elements)
         
-        if "injury" in tokens or "harm" in tokens or "damage" in tokens:
-            elements.append("extent of injury or damage")
+        # If no specific elements found, use common ones
+        if not elements:
+            elements = common_elements
         
-        # Add section-specific elements
+        return elements
+    
+    def _section_elements(self, section, act):
+        """Get the elements specific to an offense section."""
         if act == "IPC":
             if section == "302":  # Murder
-                elements.extend(["intention to cause death", "premeditation", "motive for murder"])
+                return ["intention to cause death", "premeditation", "motive for murder"]
             elif section == "376":  # Rape
-                elements.extend(["consent", "force or coercion", "identification of accused"])
+                return ["consent", "force or coercion", "identification of accused"]
             elif section == "420":  # Cheating
-                elements.extend(["fraudulent intent", "deception", "wrongful gain"])
+                return ["fraudulent intent", "deception", "wrongful gain"]
         
         elif act == "IT Act":
             if section == "66":  # Computer-related offense
-                elements.extend(["unauthorized access", "damage to computer system", "data theft"])
+                return ["unauthorized access", "damage to computer system", "data theft"]
             elif section == "67":  # Obscene content
-                elements.extend(["obscene nature of content", "publication intent", "public access"])
+                return ["obscene nature of content", "publication intent", "public access"]
         
         elif act == "MV Act":
             if section == "184":  # Dangerous driving
-                elements.extend(["dangerous speed", "reckless behavior", "traffic conditions"])
+                return ["dangerous speed", "reckless behavior", "traffic conditions"]
             elif section == "185":  # Drunk driving
-                elements.extend(["blood alcohol level", "sobriety test", "driving impairment"])
+                return ["blood alcohol level", "sobriety test", "driving impairment"]
         
-        # If no specific elements found, use common ones
-        if not elements:
-            elements = common_elements
+        return []
+    
+    def _resolve_section(self, section, act):
+        """
+        Look up everything the arguments for a section need.
         
-        return elements
+        Returns:
+            dict: Offense details, precedents and section elements, or None
+                if the section is unknown
+        """
+        offense_details = get_offense_details(section, act)
+        if not offense_details:
+            return None
+        precedents = get_precedents_for_section(section, act)
+        return {
+            "offense_details": offense_details,
+            "precedents": precedents,
+            "argued_precedents": [p for p in precedents if p.get("key_points")] if precedents else [],
+            "section_elements": self._section_elements(section, act)
+        }
+    
+    def precedent_ranker(self):
+        """Get the precedent ranker, building it on first use."""
+        if self._ranker is None:
+            with self._ranker_lock:
+                if self._ranker is None:
+                    predictor = self.predictor
+                    if predictor is None:
+                        from model import legal_predictor as predictor
+                    self._ranker = PrecedentRanker(self.legal_precedents, predictor)
+        return self._ranker
+    
+    def _fitting_templates(self, kinds, available):
+        """Get the templates of the given kinds whose slots are all in ``available``, memoised."""
+        key = (kinds, available)
+        templates = self._fitting.get(key)
+        if templates is None:
+            templates = [t for kind in kinds for t in self.argument_templates[kind] if t.fits(available)]
+            self._fitting[key] = templates
+        return templates
     
     def _get_constitutional_rights(self):
         """Get list of relevant constitutional rights that might apply."""
@@ -154,24 +366,23 @@ class ArgumentGenerator:
             "bail", "due process"
         ]
     
-    def _format_argument(self, template, replacements):
-        """Format an argument template with given replacements."""
-        try:
-            return template.format(**replacements)
-        except KeyError:
-            # Fallback if formatting fails
-            return template
-    
-    def generate_arguments(self, section, act, case_description, favor_defense=True, num_arguments=5):
+    @traced("ArgumentGenerator.generate_arguments")
+    def generate_arguments(self, section, act, case_description, favor_defense=True, num_arguments=5, seed=0):
         """
         Generate legal arguments based on section, act, and case description.
         
+        The output is deterministic: templates and fillers are drawn from a
+        generator seeded by the request (see request_rng), and completed
+        argument sets are cached, so a repeated request is a dict lookup.
+        Pass a different ``seed`` for a different selection.
+        
         Args:
             section (str): Legal section number (e.g., "302")
             act (str): Act name (e.g., "IPC", "IT Act", "MV Act")
             case_description (str): Description of the case
             favor_defense (bool): If True, generate arguments favoring defense, otherwise prosecution
             num_arguments (int): Number of arguments to generate
+            seed (int): Seed mixed into the request hash
             
         Returns:
             dict: Dictionary containing generated arguments and supporting information
@@ -180,71 +391,99 @@ class ArgumentGenerator:
         if not section or not act or not case_description:
             return {"error": "Missing required input parameters"}
         
-        # Get offense details
-        offense_details = get_offense_details(section, act)
-        if not offense_details:
-            return {"error": f"Section {section} not found in {act}"}
-        
-        # Get relevant precedents
-        precedents = get_precedents_for_section(section, act)
+        key = ("arguments", section, act, case_description, favor_defense, num_arguments, seed)
+        return self._cached(key, lambda: self._generate_arguments(
+            section, act, case_description, favor_defense, num_arguments, seed
+        ))
+    
+    def _generate_arguments(self, section, act, case_description, favor_defense, num_arguments, seed,
+                            resolved=None):
+        position = "defense" if favor_defense else "prosecution"
+        rng = request_rng(section, act, case_description, position, seed)
         
-        # Get case elements
-        elements = self._get_case_elements(section, act, case_description)
+        with stage("lookup"):
+            # Get offense details and relevant precedents, unless already resolved
+            if resolved is None:
+                resolved = self._resolve_section(section, act)
+            if resolved is None:
+                return {"error": f"Section {section} not found in {act}"}
+            offense_details = resolved["offense_details"]
+            precedents = resolved["precedents"]
+            
+            # Get case elements
+            elements = self._get_case_elements(section, act, case_description, resolved["section_elements"])
         
         # Get constitutional rights
         rights = self._get_constitutional_rights()
         
-        # Select appropriate templates
-        if favor_defense:
-            primary_templates = self.argument_templates["defense_favor"]
-            secondary_templates = self.argument_templates["bail_favor"]
-        else:
-            primary_templates = self.argument_templates["prosecution_favor"]
-            secondary_templates = self.argument_templates["bail_against"]
+        # Select appropriate templates; only those whose slots can all be filled are candidates
+        kinds = ("defense_favor", "bail_favor") if favor_defense else ("prosecution_favor", "bail_against")
+        argued = resolved["argued_precedents"]
+        available = {"element", "right", "section"}
+        if precedents:
+            available.add("precedent")
+        if argued:
+            available.add("argument")
+        all_templates = self._fitting_templates(kinds, frozenset(available))
+        
+        # Draw templates from the combined primary and secondary lists
+        chosen = rng.sample(range(len(all_templates)), min(num_arguments, len(all_templates)))
         
-        # Combine and shuffle templates
-        all_templates = primary_templates + secondary_templates
-        random.shuffle(all_templates)
+        # Rank the precedents against the description if any template cites one
+        if precedents and any("precedent" in all_templates[i].slots for i in chosen):
+            with stage("score"):
+                ranked = self.precedent_ranker().rank(case_description, precedents)
+            ranked_argued = [(p, point) for p, point in ranked if point is not None]
+        cited = 0
         
         # Generate arguments
-        arguments = []
-        for i in range(min(num_arguments, len(all_templates))):
-            template = all_templates[i]
-            
-            # Prepare replacements
-            replacements = {
-                "element": random.choice(elements),
-                "right": random.choice(rights),
-                "section": section
-            }
-            
-            # Add precedent if available
-            if precedents and "precedent" in template:
-                precedent = random.choice(precedents)
-                replacements["precedent"] = precedent["case_name"]
-                replacements["argument"] = random.choice(precedent["key_points"])
-            
-            # Format the argument
-            argument = self._format_argument(template, replacements)
-            arguments.append(argument)
+        with stage("format"):
+            arguments = []
+            for i in chosen:
+                template = all_templates[i]
+                
+                # Prepare replacements for the template's slots
+                replacements = {"section": section}
+                if "element" in template.slots:
+                    replacements["element"] = rng.choice(elements)
+                if "right" in template.slots:
+                    replacements["right"] = rng.choice(rights)
+                
+                # Cite the best-ranked precedents in turn, with their best key point
+                if "argument" in template.slots:
+                    precedent, point = ranked_argued[cited % len(ranked_argued)]
+                    replacements["precedent"] = precedent["case_name"]
+                    replacements["argument"] = point
+                    cited += 1
+                elif "precedent" in template.slots:
+                    replacements["precedent"] = ranked[cited % len(ranked)][0]["case_name"]
+                    cited += 1
+                
+                arguments.append(template.render(replacements))
         
         return {
             "arguments": arguments,
             "offense_details": offense_details,
             "supporting_precedents": precedents if precedents else [],
-            "position": "defense" if favor_defense else "prosecution"
+            "position": position
         }
     
-    def generate_bail_arguments(self, section, act, case_description, favor_bail=True, num_arguments=5):
+    @traced("ArgumentGenerator.generate_bail_arguments")
+    def generate_bail_arguments(self, section, act, case_description, favor_bail=True, num_arguments=5, seed=0):
         """
         Generate bail-specific arguments based on section, act, and case description.
         
+        Templates are taken in order and cited precedents are ranked
+        against the description, so the output is deterministic; it is
+        cached like generate_arguments.
+        
         Args:
             section (str): Legal section number
             act (str): Act name
             case_description (str): Description of the case
             favor_bail (bool): If True, generate arguments favoring bail, otherwise against
             num_arguments (int): Number of arguments to generate
+            seed (int): Accepted for symmetry with generate_arguments; bail arguments do not depend on it
             
         Returns:
             dict: Dictionary containing generated bail arguments and supporting information
@@ -253,46 +492,160 @@ class ArgumentGenerator:
         if not section or not act or not case_description:
             return {"error": "Missing required input parameters"}
         
-        # Get offense details
-        offense_details = get_offense_details(section, act)
-        if not offense_details:
+        key = ("bail", section, act, case_description, favor_bail, num_arguments, seed)
+        return self._cached(key, lambda: self._generate_bail_arguments(
+            section, act, case_description, favor_bail, num_arguments, seed
+        ))
+    
+    def _generate_bail_arguments(self, section, act, case_description, favor_bail, num_arguments, seed,
+                                 resolved=None):
+        position = "favor" if favor_bail else "against"
+        
+        # Get offense details and relevant precedents, unless already resolved
+        if resolved is None:
+            resolved = self._resolve_section(section, act)
+        if resolved is None:
             return {"error": f"Section {section} not found in {act}"}
+        offense_details = resolved["offense_details"]
+        precedents = resolved["precedents"]
         
-        # Get bail information
-        bail_info = offense_details.get("bail_info", {})
+        # Weigh the bail factors of the case
+        assessment = bail_assessor.assess(section, act, case_description)
         
-        # Get relevant precedents
-        precedents = get_precedents_for_section(section, act)
+        # Select appropriate templates, skipping those citing a precedent when there is none
+        kinds = ("bail_favor",) if favor_bail else ("bail_against",)
+        available = frozenset(("section", "precedent") if precedents else ("section",))
+        templates = self._fitting_templates(kinds, available)
+        
+        # Argue the factors present in the case first, strongest first, then the rest in order,
+        # leaving out templates that contradict the offense's bail class
+        present = [factor["factor"] for factor in assessment.get("favor" if favor_bail else "against", [])]
+        rank = {factor: i for i, factor in enumerate(present)}
+        templates = sorted(
+            (template for template in templates
+             if template.factor in rank or bail_assessor.factors.get(template.factor, {}).get("source") != "bail_class"),
+            key=lambda template: rank.get(template.factor, len(rank))
+        )
         
-        # Select appropriate templates
-        templates = self.argument_templates["bail_favor"] if favor_bail else self.argument_templates["bail_against"]
+        # Rank the precedents against the description if any template cites one
+        templates = templates[:num_arguments]
+        if any("precedent" in template.slots for template in templates):
+            ranked = self.precedent_ranker().rank(case_description, precedents)
+        cited = 0
         
         # Generate arguments
         arguments = []
-        for i in range(min(num_arguments, len(templates))):
-            template = templates[i]
-            
+        for template in templates:
             # Prepare replacements
             replacements = {
                 "section": section
             }
             
-            # Add precedent if available
-            if precedents and "precedent" in template:
-                precedent = random.choice(precedents)
-                replacements["precedent"] = precedent["case_name"]
+            # Cite the best-ranked precedents in turn
+            if "precedent" in template.slots:
+                replacements["precedent"] = ranked[cited % len(ranked)][0]["case_name"]
+                cited += 1
             
-            # Format the argument
-            argument = self._format_argument(template, replacements)
-            arguments.append(argument)
+            arguments.append(template.render(replacements))
         
         return {
             "bail_arguments": arguments,
             "offense_details": offense_details,
-            "is_bailable": "bailable" in str(bail_info).lower(),
+            "is_bailable": offense_details["bail_class"] == "bailable",
+            "assessment": assessment,
             "supporting_precedents": precedents if precedents else [],
-            "position": "favor" if favor_bail else "against"
+            "position": position
+        }
+
+    def iter_batch(self, cases, bail=False, num_arguments=5, seed=0, max_workers=None):
+        """
+        Generate arguments for many cases, such as a whole cause-list.
+        
+        Offense details, precedents and section elements are resolved once
+        per (act, section) group, then the cases are rendered in chunks
+        across a thread pool. Output matches generate_arguments (or
+        generate_bail_arguments) for each case, but bypasses its cache.
+        
+        Args:
+            cases (iterable): Dicts with "section", "act" and
+                "case_description", and optionally "case_id" and "favor"
+                (favour the defense, or bail; True by default)
+            bail (bool): Generate bail arguments instead of trial arguments
+            num_arguments (int): Number of arguments per case
+            seed (int): Seed mixed into each request hash
+            max_workers (int, optional): Thread pool size
+            
+        Yields:
+            dict: One record per case, in input order, with case_id, act,
+                section, position, arguments and error (None on success)
+        """
+        cases = list(cases)
+        
+        with stage("lookup"):
+            groups = {}
+            for case in cases:
+                key = (case.get("act"), case.get("section"))
+                if key not in groups:
+                    groups[key] = self._resolve_section(key[1], key[0]) if all(key) else None
+        
+        def render(chunk):
+            return [self._batch_record(index, case, groups, bail, num_arguments, seed) for index, case in chunk]
+        
+        indexed = list(enumerate(cases))
+        chunks = [indexed[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(indexed), BATCH_CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for records in pool.map(render, chunks):
+                yield from records
+    
+    def _batch_record(self, index, case, groups, bail, num_arguments, seed):
+        section, act = case.get("section"), case.get("act")
+        case_description = case.get("case_description")
+        favor = case.get("favor", True)
+        
+        if not section or not act or not case_description:
+            result = {"error": "Missing required input parameters"}
+        elif groups[(act, section)] is None:
+            result = {"error": f"Section {section} not found in {act}"}
+        elif bail:
+            result = self._generate_bail_arguments(section, act, case_description, favor, num_arguments, seed,
+                                                   groups[(act, section)])
+        else:
+            result = self._generate_arguments(section, act, case_description, favor, num_arguments, seed,
+                                              groups[(act, section)])
+        
+        return {
+            "case_id": case.get("case_id", index),
+            "act": act,
+            "section": section,
+            "position": result.get("position"),
+            "arguments": result.get("bail_arguments" if bail else "arguments", []),
+            "error": result.get("error")
         }
+    
+    @traced("ArgumentGenerator.generate_batch")
+    def generate_batch(self, cases, bail=False, num_arguments=5, seed=0, max_workers=None, path=None):
+        """
+        Generate arguments for many cases as a table or a JSONL export.
+        
+        Args:
+            cases, bail, num_arguments, seed, max_workers: See iter_batch
+            path (str, optional): Stream the records to this JSONL file
+                instead of building a DataFrame
+            
+        Returns:
+            pandas.DataFrame: One row per case (see iter_batch), or the
+                number of records written when ``path`` is given
+        """
+        records = self.iter_batch(cases, bail, num_arguments, seed, max_workers)
+        if path is None:
+            return pd.DataFrame.from_records(list(records), columns=BATCH_COLUMNS)
+        
+        written = 0
+        with open(path, "w", encoding="utf-8") as handle:
+            for record in records:
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+                written += 1
+        return written
 
 # Initialize the argument generator
 argument_generator = ArgumentGenerator()
@@ -0,0 +1,291 @@
+"""
+Artifact Cache
+
+On-disk cache for fitted vectorizers, document matrices and search indexes,
+so a worker restart loads them instead of fitting them again. An artifact is
+a set of named parts stored under a key made from a hash of its source data
+and its build config (vectorizer parameters, library versions, a digest of
+the code that builds it). Changing any of them gives a new key, so a stale
+artifact is never loaded.
+
+Parts are stored by type:
+
+- numpy arrays as .npy files
+- scipy sparse matrices as uncompressed .npz files
+- anything else (fitted sklearn objects) with joblib
+
+Loading is lazy: each part is opened on first access, and arrays, including
+those inside sparse matrices and joblib files, are memory maps, so pages
+are read on demand and shared between worker processes.
+
+Artifacts are written to a temporary directory and renamed into place, so
+concurrent workers can share one cache directory: readers never see a
+partial artifact, and when two workers build the same artifact the first
+rename wins.
+"""
+
+import os
+import json
+import shutil
+import struct
+import uuid
+import zipfile
+import hashlib
+from functools import lru_cache
+import numpy as np
+import scipy
+import scipy.sparse as sp
+import sklearn
+import joblib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_ARTIFACT_DIR = os.environ.get("LEGAL_ARTIFACT_DIR", os.path.join(BASE_DIR, "models", "artifacts"))
+
+# Bump when the on-disk layout changes
+ARTIFACT_FORMAT = 1
+
+# Arrays smaller than this are read into memory rather than memory-mapped
+MMAP_MIN_BYTES = 4096
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+@lru_cache(maxsize=64)
+def source_digest(*names):
+    """
+    Digest of source files, for the configs of artifacts they build, so that
+    editing the code that fits an artifact invalidates it.
+
+    Args:
+        *names: File names relative to the project directory
+
+    Returns:
+        str: Short hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    for name in names:
+        with open(os.path.join(BASE_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def content_hash(data, config=None):
+    """
+    Hash an artifact's source data and build config.
+
+    Args:
+        data: JSON-serialisable source data; the items of a list or tuple
+            are hashed one at a time
+        config (dict, optional): Build parameters
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    header = {
+        "format": ARTIFACT_FORMAT,
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "sklearn": sklearn.__version__,
+        "config": config or {}
+    }
+    digest.update(json.dumps(header, sort_keys=True, default=str).encode("utf-8"))
+    for item in data if isinstance(data, (list, tuple)) else [data]:
+        digest.update(b"\x1e")
+        digest.update(json.dumps(item, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_array(f, offset, path):
+    """Open the .npy array at ``offset`` in a file, as a memory map unless it is small."""
+    f.seek(offset)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    size = int(np.prod(shape)) * dtype.itemsize
+    if dtype.hasobject or size < MMAP_MIN_BYTES:
+        f.seek(offset)
+        return np.lib.format.read_array(f, allow_pickle=False)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape,
+                     order="F" if fortran_order else "C", offset=f.tell())
+
+
+def load_npz(path):
+    """
+    Open the arrays of an uncompressed .npz file as memory maps.
+
+    Returns:
+        dict: Array name to array
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+                continue
+            f.seek(info.header_offset)
+            fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            name_length, extra_length = fields[-2], fields[-1]
+            arrays[name] = _read_array(f, info.header_offset + _LOCAL_HEADER.size + name_length + extra_length,
+                                       path)
+    return arrays
+
+
+def load_sparse(path):
+    """
+    Open a sparse matrix saved with scipy.sparse.save_npz(compressed=False),
+    keeping its arrays memory-mapped.
+
+    Returns:
+        scipy.sparse.csr_matrix or csc_matrix: The matrix
+    """
+    arrays = load_npz(path)
+    matrix_format = arrays["format"].item()
+    if isinstance(matrix_format, bytes):
+        matrix_format = matrix_format.decode("ascii")
+    shape = tuple(int(n) for n in arrays["shape"])
+    # Plain ndarray views of the maps, since scipy copies ndarray subclasses
+    data, indices, indptr = (np.asarray(arrays[name]) for name in ("data", "indices", "indptr"))
+    if matrix_format == "csr":
+        return sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+    if matrix_format == "csc":
+        return sp.csc_matrix((data, indices, indptr), shape=shape, copy=False)
+    return sp.load_npz(path)
+
+
+class Artifact:
+    """
+    The parts of a stored artifact, each opened on first access.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {os.path.splitext(name)[0]: name for name in os.listdir(directory)}
+        self._parts = {}
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __getitem__(self, name):
+        if name not in self._parts:
+            path = os.path.join(self.directory, self.files[name])
+            extension = os.path.splitext(path)[1]
+            if extension == ".npy":
+                self._parts[name] = np.load(path, mmap_mode="r")
+            elif extension == ".npz":
+                self._parts[name] = load_sparse(path)
+            else:
+                self._parts[name] = joblib.load(path, mmap_mode="r")
+        return self._parts[name]
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def keys(self):
+        return self.files.keys()
+
+
+class ArtifactCache:
+    """
+    Directory of artifacts keyed by a hash of their source data and config.
+    """
+
+    def __init__(self, directory=DEFAULT_ARTIFACT_DIR):
+        """
+        Args:
+            directory (str): Cache directory, created on first write
+        """
+        self.directory = directory
+
+    def key(self, name, data, config=None):
+        """Get the directory name an artifact is stored under."""
+        return f"{name}-{content_hash(data, config)[:24]}"
+
+    def load(self, name, data, config=None):
+        """
+        Load a stored artifact.
+
+        Returns:
+            Artifact: The artifact's parts, or None if it is not cached
+        """
+        return self._open(self.key(name, data, config))
+
+    def _open(self, key):
+        directory = os.path.join(self.directory, key)
+        return Artifact(directory) if os.path.isdir(directory) else None
+
+    def get_or_build(self, name, data, build, config=None):
+        """
+        Load an artifact, or build and store it on a miss.
+
+        Args:
+            name (str): Artifact name, the prefix of its key
+            data: Source data the artifact is built from, see content_hash()
+            build (callable): Function returning the parts as a dict of part
+                name to array, sparse matrix or picklable object; None values
+                are left out
+            config (dict, optional): Build parameters
+
+        Returns:
+            Artifact or dict: The stored parts, or the freshly built ones
+        """
+        key = self.key(name, data, config)
+        artifact = self._open(key)
+        if artifact is not None:
+            return artifact
+        parts = {part: value for part, value in build().items() if value is not None}
+        try:
+            self.save(key, parts)
+        except OSError as e:
+            print(f"Could not cache artifact {name}: {str(e)}")
+        return parts
+
+    def save(self, key, parts):
+        """
+        Write an artifact's parts atomically.
+
+        The parts are written to a temporary directory that is then renamed
+        to the key. If another process stored the same key first, its copy
+        is kept.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        final_dir = os.path.join(self.directory, key)
+        tmp_dir = os.path.join(self.directory, f".{key}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        os.makedirs(tmp_dir)
+        try:
+            for part, value in parts.items():
+                path = os.path.join(tmp_dir, part)
+                if isinstance(value, np.ndarray):
+                    with open(f"{path}.npy", "wb") as f:
+                        np.save(f, np.asarray(value), allow_pickle=False)
+                elif sp.issparse(value):
+                    # Loaded matrices are read-only, so store them with sorted indices
+                    if not value.has_canonical_format:
+                        value = value.copy()
+                        value.sum_duplicates()
+                    with open(f"{path}.npz", "wb") as f:
+                        sp.save_npz(f, value, compressed=False)
+                else:
+                    joblib.dump(value, f"{path}.joblib")
+            try:
+                os.rename(tmp_dir, final_dir)
+            except OSError:
+                if not os.path.isdir(final_dir):
+                    raise
+        finally:
+            if os.path.isdir(tmp_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def clear(self):
+        """Remove every stored artifact."""
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+
+# Initialize the shared artifact cache
+artifact_cache = ArtifactCache()
@@ -0,0 +1,222 @@
+"""
+Query Autocompletion
+
+Suggestions for the home page search box, from the section titles of every
+act in legal_data and the names and citations of the precedents.
+
+Every suggestion is lowercased, reduced to its words and appended to one
+text buffer. The index is a sorted array of offsets into that buffer, one
+per word start, ordered by the text that follows. The suggestions whose
+words begin with a typed prefix ("murd", "ipc 30", "2 scc") are then a
+contiguous run of the array, found with two binary searches that compare
+buffer slices of the prefix's length. The buffer and three flat arrays
+(offsets, their suggestions and start bonuses) are the whole index, so
+there are no per-key strings or trie nodes.
+
+Within the run, suggestions are ranked by popularity counters, which start
+at the number of precedents citing a section and grow with record() as
+users pick suggestions; ties go to matches at the start of the suggestion,
+then alphabetical order.
+"""
+
+import sys
+import bisect
+import threading
+import numpy as np
+from text_normalization import WORD_PATTERN
+
+DEFAULT_LIMIT = 8
+
+# Candidates ranked per lookup, as a multiple of the limit; a suggestion can
+# match a prefix at several of its words
+CANDIDATE_FACTOR = 4
+
+# Extra score for a match at the start of a suggestion, less than one pick
+START_BONUS = 0.5
+
+# Acts offered as suggestions, by the name shown and the legal_data table
+SECTION_TABLES = {
+    "IPC": "ipc_sections",
+    "CrPC": "crpc_sections",
+    "CPC": "cpc_sections",
+    "Evidence Act": "evidence_act_sections",
+    "IT Act": "it_act_sections",
+    "MV Act": "mv_act_sections"
+}
+
+
+def normalize_query(text):
+    """
+    Normalise text the way suggestions are indexed.
+
+    Returns:
+        str: Lowercase words joined by single spaces, with a trailing space
+            kept so that "ipc " only matches the whole word "ipc"
+    """
+    words = " ".join(WORD_PATTERN.findall(text.lower()))
+    return words + " " if words and text[-1:].isspace() else words
+
+
+class AutocompleteIndex:
+    """
+    Sorted-array prefix index over suggestions, ranked by popularity.
+    """
+
+    def __init__(self, suggestions):
+        """
+        Args:
+            suggestions (list): Dicts with the ``text`` shown, optional
+                ``keys`` (extra texts it is found by, such as a citation),
+                ``popularity`` (initial count) and any payload for the caller
+        """
+        self.suggestions = [dict(suggestion, id=i) for i, suggestion in enumerate(suggestions)]
+        self.popularity = np.array([s.get("popularity", 0) for s in self.suggestions], dtype=np.float64)
+        self._lock = threading.Lock()
+
+        # One buffer segment per indexed text; "\x00" sorts before any word
+        segments, owners = [], []
+        for i, suggestion in enumerate(self.suggestions):
+            for position, text in enumerate([suggestion["text"]] + list(suggestion.get("keys", []))):
+                normalized = normalize_query(text).strip()
+                if normalized:
+                    segments.append(normalized)
+                    owners.append((i, position == 0))
+        self.buffer = "\x00".join(segments) + "\x00"
+
+        offsets, entries, bonus = [], [], []
+        start = 0
+        for segment, (i, primary) in zip(segments, owners):
+            offsets.append(start)
+            bonus.append(START_BONUS if primary else 0.0)
+            for position, char in enumerate(segment):
+                if char == " ":
+                    offsets.append(start + position + 1)
+                    bonus.append(0.0)
+            entries.extend([i] * (len(offsets) - len(entries)))
+            start += len(segment) + 1
+
+        buffer = self.buffer
+        order = sorted(range(len(offsets)), key=lambda k: buffer[offsets[k]:buffer.index("\x00", offsets[k])])
+        self.offsets = np.array(offsets, dtype=np.int32)[order]
+        self.entries = np.array(entries, dtype=np.int32)[order]
+        self.bonus = np.array(bonus, dtype=np.float32)[order]
+
+    @classmethod
+    def from_legal_data(cls, legal_data=None):
+        """
+        Build the index over legal_data's sections and precedents.
+
+        Args:
+            legal_data (module, optional): The legal data module, for a
+                reloaded copy; imported by default
+
+        Returns:
+            AutocompleteIndex: The index
+        """
+        if legal_data is None:
+            import legal_data
+
+        cited = {}
+        for precedent in legal_data.legal_precedents:
+            key = (precedent["act"], precedent["section"])
+            cited[key] = cited.get(key, 0) + 1
+
+        suggestions = []
+        for act, table in SECTION_TABLES.items():
+            for section, title in getattr(legal_data, table).items():
+                keys = [f"section {section} {title}"] if section[:1].isdigit() else []
+                suggestions.append({
+                    "text": f"{act} {section}: {title}",
+                    "keys": keys,
+                    "kind": "section",
+                    "act": act,
+                    "section": section,
+                    "popularity": cited.get((act, section), 0)
+                })
+        for precedent in legal_data.legal_precedents:
+            suggestions.append({
+                "text": precedent["case_name"],
+                "keys": [precedent["citation"]],
+                "kind": "precedent",
+                "act": precedent["act"],
+                "section": precedent["section"],
+                "citation": precedent["citation"]
+            })
+        return cls(suggestions)
+
+    def _range(self, key):
+        """Get the slice of the offset array whose text starts with ``key``."""
+        buffer, length = self.buffer, len(key)
+        prefix = lambda offset: buffer[offset:offset + length]
+        lo = bisect.bisect_left(self.offsets, key, key=prefix)
+        return lo, bisect.bisect_right(self.offsets, key, lo=lo, key=prefix)
+
+    def suggest(self, query, limit=DEFAULT_LIMIT):
+        """
+        Get the suggestions for a partly typed query.
+
+        Args:
+            query (str): Text typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: Suggestion dicts, most popular first, each with its
+                ``id`` for record()
+        """
+        key = normalize_query(query)
+        if not key:
+            return []
+        lo, hi = self._range(key)
+        if lo == hi:
+            return []
+
+        entries = self.entries[lo:hi]
+        scores = self.popularity[entries] + self.bonus[lo:hi]
+        candidates = limit * CANDIDATE_FACTOR
+        while True:
+            if candidates < len(scores):
+                cutoff = -np.partition(-scores, candidates - 1)[candidates - 1]
+                # Ties at the cut-off go to the first in the run, which is alphabetical
+                top = np.concatenate([np.flatnonzero(scores > cutoff),
+                                      np.flatnonzero(scores == cutoff)[:candidates]])
+            else:
+                top = np.arange(len(scores))
+            # Highest score first, then alphabetical (the order of the run)
+            top = top[np.lexsort((top, -scores[top]))]
+            chosen = list(dict.fromkeys(entries[top].tolist()))[:limit]
+            if len(chosen) == limit or candidates >= len(scores):
+                break
+            candidates *= 2
+        return [self.suggestions[i] for i in chosen]
+
+    def record(self, suggestion_id, count=1):
+        """Count a pick of a suggestion, raising it in later rankings."""
+        with self._lock:
+            self.popularity[suggestion_id] += count
+
+    def memory_usage(self):
+        """
+        Report the memory held by the index.
+
+        Returns:
+            dict: Counts and bytes of the text buffer, the offset, suggestion
+                and popularity arrays, and the suggestion dicts themselves
+        """
+        index_bytes = sys.getsizeof(self.buffer) + self.offsets.nbytes + self.entries.nbytes + self.bonus.nbytes
+        suggestion_bytes = sum(
+            sys.getsizeof(suggestion) + sum(sys.getsizeof(value) for value in suggestion.values())
+            for suggestion in self.suggestions
+        )
+        return {
+            "suggestions": len(self.suggestions),
+            "keys": len(self.offsets),
+            "buffer_chars": len(self.buffer),
+            "index_bytes": index_bytes,
+            "suggestion_bytes": suggestion_bytes,
+            "popularity_bytes": self.popularity.nbytes,
+            "total_bytes": index_bytes + suggestion_bytes + self.popularity.nbytes
+        }
+
+
+# Initialize the autocomplete index
+autocomplete_index = AutocompleteIndex.from_legal_data()
@@ -0,0 +1,180 @@
+"""
+Bail Assessment
+
+Scores bail applications from the factors in legal_data.bail_factors. Each
+application becomes a row of 0/1 features: the offense's bail class, its
+gravity (from the offense title), support in the section's precedents, and
+fact patterns in the case description found with the Aho-Corasick matcher
+from fact_patterns.py, ignoring negated ones ("no previous conviction",
+"has never tampered with evidence"). The offense and precedent features
+depend only on the section, so they are worked out once per section and
+reused.
+
+A batch is scored at once: the feature matrix times the signed factor
+weights gives every factor's contribution, and a logistic function of the
+row sums gives the score. Each case gets the factors present ranked by
+contribution, for and against bail.
+"""
+
+import numpy as np
+from instrumentation import traced
+from legal_data import bail_factors, get_offense_details, get_precedents_for_section
+from fact_patterns import FactPatternMatcher
+
+# Log-odds of bail before any factor is weighed
+BASE_LOG_ODDS = 0.0
+
+# Score bounds for the "likely" and "unlikely" outlooks
+LIKELY_SCORE = 0.65
+UNLIKELY_SCORE = 0.35
+
+
+class BailAssessor:
+    """
+    Vectorised bail-outcome scoring over a table of weighted factors.
+    """
+
+    def __init__(self, factors=None):
+        """
+        Args:
+            factors (dict, optional): Factor table in the format of
+                legal_data.bail_factors, which is the default
+        """
+        self.factors = bail_factors if factors is None else factors
+        self.names = list(self.factors)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.weights = np.array([
+            factor["weight"] if factor["direction"] == "favor" else -factor["weight"]
+            for factor in self.factors.values()
+        ], dtype=np.float32)
+
+        def matcher(source, negation=False):
+            return FactPatternMatcher({name: factor["triggers"] for name, factor in self.factors.items()
+                                       if factor["source"] == source}, negation)
+
+        # Descriptions often deny a factor ("has not absconded"), so negated triggers are ignored
+        self.description_matcher = matcher("description", negation=True)
+        self.offense_matcher = matcher("offense")
+        self.precedent_matcher = matcher("precedent")
+        self._offense_rows = {}
+
+    def _offense_row(self, section, act):
+        """
+        Get the features that depend only on the section, memoised.
+
+        Returns:
+            numpy.ndarray: Feature row with the bail class, offense and
+                precedent factors set, or None if the section is unknown
+        """
+        key = (str(section), act)
+        row = self._offense_rows.get(key)
+        if row is None:
+            offense_details = get_offense_details(section, act)
+            if not offense_details:
+                return None
+            row = np.zeros(len(self.names), dtype=np.float32)
+            for name, factor in self.factors.items():
+                if factor["source"] == "bail_class" and factor["bail_class"] == offense_details["bail_class"]:
+                    row[self.index[name]] = 1.0
+            for name in self.offense_matcher.find(offense_details["title"]):
+                row[self.index[name]] = 1.0
+
+            precedents = get_precedents_for_section(str(section), act)
+            precedent_text = " ".join(
+                " ".join([precedent.get("summary", "")] + precedent.get("key_points", []))
+                for precedent in precedents
+            )
+            for name in self.precedent_matcher.find(precedent_text):
+                row[self.index[name]] = 1.0
+            self._offense_rows[key] = row
+        return row
+
+    def features(self, applications):
+        """
+        Build the feature matrix for a batch of applications.
+
+        Args:
+            applications (list): Dicts with ``section``, ``act`` (IPC by
+                default) and ``case_description``
+
+        Returns:
+            tuple: (float32 matrix with one row per application, boolean
+                array marking the applications whose section is known)
+        """
+        X = np.zeros((len(applications), len(self.names)), dtype=np.float32)
+        known = np.ones(len(applications), dtype=bool)
+        for i, application in enumerate(applications):
+            row = self._offense_row(application.get("section", ""), application.get("act", "IPC"))
+            if row is None:
+                known[i] = False
+                continue
+            X[i] = row
+            for name in self.description_matcher.find(application.get("case_description", "")):
+                X[i, self.index[name]] = 1.0
+        return X, known
+
+    def _factor_list(self, names, contributions):
+        return [{
+            "factor": name,
+            "label": self.factors[name]["label"],
+            "weight": round(float(abs(contribution)), 3)
+        } for name, contribution in zip(names, contributions)]
+
+    @traced("BailAssessor.assess_many")
+    def assess_many(self, applications):
+        """
+        Score a batch of bail applications.
+
+        Args:
+            applications (list): Dicts with ``section``, ``act`` and
+                ``case_description``, see features()
+
+        Returns:
+            list: One dict per application, in order, with ``score`` (the
+                estimated chance of bail, 0 to 1), ``outlook`` ("likely",
+                "uncertain" or "unlikely") and the present factors ranked by
+                weight under ``favor`` and ``against``; or ``error`` if the
+                section is unknown
+        """
+        if not applications:
+            return []
+        X, known = self.features(applications)
+        contributions = X * self.weights
+        scores = 1.0 / (1.0 + np.exp(-(BASE_LOG_ODDS + contributions.sum(axis=1))))
+        # Strongest contributions first in every row; absent factors sort last
+        order = np.argsort(-np.abs(contributions), axis=1, kind="stable")
+
+        results = []
+        for i, application in enumerate(applications):
+            section, act = application.get("section", ""), application.get("act", "IPC")
+            if not known[i]:
+                results.append({"error": f"Section {section} not found in {act}"})
+                continue
+            row = contributions[i]
+            ranked = order[i][:int(np.count_nonzero(row))]
+            favor = ranked[row[ranked] > 0]
+            against = ranked[row[ranked] < 0]
+            score = float(scores[i])
+            results.append({
+                "section": section,
+                "act": act,
+                "score": round(score, 4),
+                "outlook": "likely" if score >= LIKELY_SCORE else "unlikely" if score <= UNLIKELY_SCORE
+                           else "uncertain",
+                "favor": self._factor_list([self.names[j] for j in favor], row[favor]),
+                "against": self._factor_list([self.names[j] for j in against], row[against])
+            })
+        return results
+
+    def assess(self, section, act, case_description):
+        """
+        Score a single bail application, see assess_many().
+
+        Returns:
+            dict: Score, outlook and ranked factors, or ``error``
+        """
+        return self.assess_many([{"section": section, "act": act, "case_description": case_description}])[0]
+
+
+# Initialize the bail assessor
+bail_assessor = BailAssessor()
@@ -0,0 +1,1055 @@
+"""
+Performance Benchmarks
+
+Run all benchmarks with ``python benchmarks.py`` or a subset by name,
+e.g. ``python benchmarks.py engine_rerun``. The memory_profile benchmark
+compares peak allocations against memory_baselines.json; refresh the
+baselines with ``python benchmarks.py --update-memory-baselines``.
+"""
+
+import os
+import sys
+import time
+import json
+
+# Stored peak allocations per workload and stage, see bench_memory_profile
+MEMORY_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory_baselines.json")
+
+# A peak counts as a regression above baseline * (1 + tolerance) + slack
+MEMORY_TOLERANCE = 0.2
+MEMORY_SLACK_KB = 256
+
+
+def _time_ms(func, repeat=5):
+    """Run func ``repeat`` times and return the best wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def bench_engine_rerun(repeat=5):
+    """
+    Compare the engine set-up cost paid on a rerun with and without the
+    Streamlit resource cache.
+
+    Returns:
+        dict: Milliseconds per rerun before (rebuilding) and after (cached)
+    """
+    import legal_data
+    from model import LegalPredictor
+    from semantic_search import EnhancedLegalCaseMatcher
+    from argument_generator import ArgumentGenerator
+    import streamlit_cache
+
+    def uncached():
+        predictor = LegalPredictor()
+        predictor.build_precedent_index()
+        EnhancedLegalCaseMatcher()
+        ArgumentGenerator()
+        dict(legal_data.ipc_sections)
+
+    streamlit_cache.warm_up()
+
+    def cached():
+        streamlit_cache.get_legal_predictor()
+        streamlit_cache.get_precedent_index()
+        streamlit_cache.get_case_matcher()
+        streamlit_cache.get_argument_generator()
+        streamlit_cache.get_legal_tables()
+
+    before = _time_ms(uncached, repeat)
+    after = _time_ms(cached, repeat)
+    return {
+        "before_ms": round(before, 3),
+        "after_ms": round(after, 3),
+        "speedup": round(before / after, 1) if after else None
+    }
+
+
+def bench_page_payload():
+    """
+    Measure the HTML bytes the home page sends per rerun, with the
+    stylesheet inlined and with it served as a static file.
+
+    Returns:
+        dict: Payload bytes and element counts for both modes, plus the
+            unminified stylesheet size the page used to send inline
+    """
+    from streamlit import config
+    from streamlit.testing.v1 import AppTest
+    import static_assets
+
+    results = {"raw_css_bytes": static_assets.get_bundle()["raw_css_bytes"]}
+    for mode, static_serving in (("inline", False), ("static", True)):
+        config.set_option("server.enableStaticServing", static_serving)
+        app = AppTest.from_file("app.py", default_timeout=60)
+        app.run()
+        app.run()
+        payload = app.session_state["asset_payload"]
+        results[f"{mode}_payload_bytes"] = payload["bytes"]
+        results[f"{mode}_html_elements"] = payload["calls"]
+    config.set_option("server.enableStaticServing", False)
+    return results
+
+
+def bench_tracing_overhead(calls=200000):
+    """
+    Measure the per-call cost of the tracing decorator and stage timer,
+    with tracing disabled and enabled.
+
+    Returns:
+        dict: Nanoseconds per call for a bare function, and a traced function
+            with one stage, in both modes
+    """
+    import instrumentation
+
+    def bare():
+        return None
+
+    @instrumentation.traced("bench.traced")
+    def traced():
+        with instrumentation.stage("work"):
+            return None
+
+    def per_call_ns(func):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            func()
+        return (time.perf_counter_ns() - start) / calls
+
+    was_enabled = instrumentation.is_enabled()
+    try:
+        instrumentation.enable(False)
+        results = {"bare_ns": round(per_call_ns(bare), 1), "disabled_ns": round(per_call_ns(traced), 1)}
+        instrumentation.enable(True)
+        results["enabled_ns"] = round(per_call_ns(traced), 1)
+    finally:
+        instrumentation.enable(was_enabled)
+    return results
+
+
+def bench_relevance_models(calls=2000):
+    """
+    Measure relevance model load time from the artifact cache and per-call
+    latency of predict_rights and suggest_defense_options.
+
+    Returns:
+        dict: Load time in milliseconds and microseconds per prediction
+    """
+    from model import legal_predictor
+
+    description = "The accused stabbed the victim with a knife after sudden provocation and claims self-defense"
+    legal_predictor.load_relevance_models()
+    load_ms = _time_ms(legal_predictor.load_relevance_models)
+
+    def per_call_us(func):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func("302", "IPC", description)
+        return (time.perf_counter() - start) / calls * 1e6
+
+    return {
+        "load_ms": round(load_ms, 3),
+        "predict_rights_us": round(per_call_us(legal_predictor.predict_rights), 1),
+        "suggest_defense_options_us": round(per_call_us(legal_predictor.suggest_defense_options), 1)
+    }
+
+
+def _synthetic_corpus(n_docs, n_topics=200, vocab_size=20000, doc_length=60, seed=7, return_topics=False):
+    """
+    Generate topic-structured documents of synthetic terms.
+
+    Each document mixes terms from one topic's vocabulary with background
+    terms, so the corpus has the cluster structure of real judgments.
+    With ``return_topics``, also return each document's topic id.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    topic_vocab = rng.integers(0, vocab_size, size=(n_topics, 300))
+    ranks = np.arange(1, 301)
+    topic_weights = (1.0 / ranks) / (1.0 / ranks).sum()
+
+    topics = rng.integers(0, n_topics, size=n_docs)
+    docs = []
+    for topic in topics:
+        topical = topic_vocab[topic][rng.choice(300, size=int(doc_length * 0.7), p=topic_weights)]
+        background = rng.integers(0, vocab_size, size=doc_length - len(topical))
+        docs.append(" ".join(f"t{term}" for term in np.concatenate([topical, background])))
+    if return_topics:
+        return docs, topics
+    return docs
+
+
+def bench_ann_recall(n_docs=50000, queries=100, top_k=10, nprobes=(1, 4, 8, 16, 32)):
+    """
+    Measure recall@k and latency of the approximate precedent index against
+    exact TF-IDF cosine search on a synthetic corpus.
+
+    Returns:
+        dict: Build time, exact search latency, and recall@k with latency
+            for each nprobe setting
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from ann_index import IVFIndex, exact_search, recall_at_k
+
+    corpus = _synthetic_corpus(n_docs + queries)
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(corpus[:n_docs])
+    query_vectors = [vectorizer.transform([text]) for text in corpus[n_docs:]]
+
+    start = time.perf_counter()
+    index = IVFIndex().fit(matrix)
+    results = {"docs": n_docs, "build_s": round(time.perf_counter() - start, 2)}
+
+    start = time.perf_counter()
+    exact_ids = [exact_search(matrix, q, top_k)[0] for q in query_vectors]
+    results["exact_ms"] = round((time.perf_counter() - start) / queries * 1000, 3)
+
+    for nprobe in nprobes:
+        start = time.perf_counter()
+        approx_ids = [index.search(q, top_k, nprobe=nprobe)[0] for q in query_vectors]
+        elapsed = (time.perf_counter() - start) / queries * 1000
+        recall = np.mean([recall_at_k(a, e) for a, e in zip(approx_ids, exact_ids)])
+        results[f"nprobe_{nprobe}"] = {"recall_at_k": round(float(recall), 3), "ms": round(elapsed, 3)}
+    return results
+
+
+def bench_lsa_embeddings(n_docs=20000, queries=200, top_k=10, query_terms=3, doc_length=300):
+    """
+    Compare the matcher's sparse TF-IDF ranker with its LSA embedding ranker
+    on a synthetic corpus: index size, query latency, and precision@k, where
+    a result counts as relevant if it shares the query's topic.
+
+    Documents are judgment-length (``doc_length`` terms). Queries are the
+    first few terms of held-out documents, so they share few exact terms
+    with most documents of their topic.
+
+    Returns:
+        dict: Index bytes, milliseconds per query and precision@k per ranker
+    """
+    import os
+    import tempfile
+    import numpy as np
+    from semantic_search import EnhancedLegalCaseMatcher
+
+    corpus, topics = _synthetic_corpus(n_docs + queries, doc_length=doc_length, return_topics=True)
+    metadata = [{"topic": int(t)} for t in topics[:n_docs]]
+    query_texts = [" ".join(text.split()[:query_terms]) for text in corpus[n_docs:]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        matcher = EnhancedLegalCaseMatcher()
+        matcher.artifacts = None
+        matcher.fit(corpus[:n_docs], metadata, build_ann=False,
+                    embeddings_path=os.path.join(tmp, "case_embeddings.npy"))
+        matrix = matcher.case_matrix
+        results = {
+            "docs": n_docs,
+            "fit_s": round(time.perf_counter() - start, 2),
+            "tfidf_index_bytes": int(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes),
+            "lsa_index_bytes": int(matcher.lsa.nbytes())
+        }
+
+        for ranker in ("tfidf", "lsa"):
+            start = time.perf_counter()
+            hits = [matcher.find_similar_cases(q, top_k=top_k, exact=True, ranker=ranker) for q in query_texts]
+            results[f"{ranker}_ms"] = round((time.perf_counter() - start) / queries * 1000, 3)
+            precision = [
+                sum(hit["topic"] == topic for hit in result) / top_k
+                for result, topic in zip(hits, topics[n_docs:])
+            ]
+            results[f"{ranker}_precision_at_k"] = round(float(np.mean(precision)), 3)
+        del matcher
+    return results
+
+
+def _zipf_corpus(n_docs, vocab_size=50000, doc_length=120, exponent=1.05, seed=11):
+    """
+    Generate documents whose term frequencies follow a Zipf distribution,
+    like natural-language text: a few very common terms with long posting
+    lists and a long tail of rare ones.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, vocab_size + 1) ** exponent
+    weights /= weights.sum()
+    terms = rng.choice(vocab_size, size=(n_docs, doc_length), p=weights)
+    return [" ".join(f"w{term}" for term in row) for row in terms]
+
+
+def bench_bm25(n_docs=100000, queries=200, top_k=10, query_length=5):
+    """
+    Compare BM25 top-k retrieval with MaxScore early termination against
+    scoring every posting of every query term, on a Zipf-distributed corpus.
+
+    Returns:
+        dict: Build time, milliseconds per query for both strategies, and
+            whether they returned the same scores
+    """
+    import numpy as np
+    from bm25 import BM25FIndex
+
+    corpus = _zipf_corpus(n_docs)
+    rng = np.random.default_rng(3)
+    query_texts = [" ".join(rng.choice(corpus[i].split(), query_length)) for i in rng.integers(0, n_docs, queries)]
+
+    start = time.perf_counter()
+    index = BM25FIndex().build(corpus)
+    results = {"docs": n_docs, "build_s": round(time.perf_counter() - start, 2)}
+
+    outputs = {}
+    for name, exhaustive in (("maxscore", False), ("exhaustive", True)):
+        start = time.perf_counter()
+        outputs[name] = [index.search(q, top_k, exhaustive=exhaustive)[1] for q in query_texts]
+        results[f"{name}_ms"] = round((time.perf_counter() - start) / queries * 1000, 3)
+    results["identical"] = all(
+        np.allclose(a, b, atol=1e-5) for a, b in zip(outputs["maxscore"], outputs["exhaustive"])
+    )
+    return results
+
+
+def _write_synthetic_dump(path, n_records, duplicate_rate=0.05, seed=5):
+    """
+    Write a JSONL judgment dump of synthetic records, a fraction of which
+    repeat an earlier citation in a different reporter format.
+    """
+    import random
+
+    rng = random.Random(seed)
+    summaries = _synthetic_corpus(n_records, doc_length=50, seed=seed)
+    acts = ["IPC", "IT Act", "MV Act", "CrPC"]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_records):
+            original = rng.randrange(i) if i and rng.random() < duplicate_rate else i
+            year = 1950 + original % 74
+            citation = f"({year}) {original % 12 + 1} SCC {original}"
+            if original != i:
+                citation = citation.lower().replace("  ", " ")
+            record = {
+                "title": f"Appellant {original} v. State",
+                "citation": citation,
+                "court": "Supreme Court of India" if original % 3 else "High Court",
+                "year": year,
+                "act": acts[original % len(acts)],
+                "sections": [str(100 + original % 400)],
+                "headnote": summaries[original],
+                "key_points": [f"Point {original % 50}", f"Holding {original % 70}"]
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def bench_ingest(n_records=100000, chunk_size=10000):
+    """
+    Stream a synthetic JSONL dump through the ingestion pipeline.
+
+    Returns:
+        dict: The ingest report (throughput in docs/s, peak memory in MB,
+            duplicate counts) and milliseconds per search on the result
+    """
+    import os
+    import tempfile
+    from corpus_ingest import IngestedCorpus
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump_path = os.path.join(tmp, "dump.jsonl")
+        _write_synthetic_dump(dump_path, n_records)
+        corpus = IngestedCorpus(os.path.join(tmp, "store.jsonl"))
+        report = corpus.ingest(dump_path, chunk_size)
+        query = " ".join(_synthetic_corpus(1, doc_length=8, seed=99)[0].split())
+        report["search_ms"] = round(_time_ms(lambda: corpus.search(query, 10)), 3)
+    return report
+
+
+def bench_near_duplicates(n_docs=50000, duplicate_rate=0.1, edit_rate=0.02, doc_length=200, chunk_size=10000):
+    """
+    Measure MinHash/LSH near-duplicate detection throughput and accuracy on a
+    synthetic corpus where a fraction of documents are copies of earlier ones
+    with a small share of their words replaced.
+
+    Returns:
+        dict: Documents per second, canonical count, and precision and
+            recall of the detected duplicates
+    """
+    import numpy as np
+    from near_duplicates import NearDuplicateIndex
+
+    rng = np.random.default_rng(17)
+    base = _synthetic_corpus(n_docs, doc_length=doc_length, seed=17)
+    docs, originals = [], []
+    for i, text in enumerate(base):
+        if i and rng.random() < duplicate_rate:
+            original = int(rng.integers(i))
+            words = docs[original].split()
+            for position in rng.choice(len(words), max(1, int(len(words) * edit_rate)), replace=False):
+                words[position] = f"edit{rng.integers(1000000)}"
+            docs.append(" ".join(words))
+            originals.append(original)
+        else:
+            docs.append(text)
+            originals.append(-1)
+
+    index = NearDuplicateIndex()
+    start = time.perf_counter()
+    duplicate_of = np.concatenate([index.add(docs[i:i + chunk_size]) for i in range(0, n_docs, chunk_size)])
+    elapsed = time.perf_counter() - start
+
+    truth = np.array(originals) >= 0
+    detected = duplicate_of >= 0
+    true_positives = int((truth & detected).sum())
+    return {
+        "docs": n_docs,
+        "docs_per_s": round(n_docs / elapsed, 1),
+        "canonical": len(index),
+        "true_duplicates": int(truth.sum()),
+        "precision": round(true_positives / max(1, int(detected.sum())), 3),
+        "recall": round(true_positives / max(1, int(truth.sum())), 3)
+    }
+
+
+def bench_facets(n_docs=100000, queries=100, top_k=10):
+    """
+    Compare filtered TF-IDF search that selects documents with the facet
+    bitmaps before scoring against scoring every document and masking the
+    scores afterwards.
+
+    Returns:
+        dict: Milliseconds per query unfiltered, and for each filter the
+            selectivity, pre-filtered and post-filtered latency, and whether
+            both returned the same documents
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from ann_index import exact_search
+    from facets import FacetIndex
+
+    corpus = _synthetic_corpus(n_docs + queries)
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(corpus[:n_docs])
+    query_vectors = [vectorizer.transform([text]) for text in corpus[n_docs:]]
+
+    rng = np.random.default_rng(9)
+    records = [
+        {"act": act, "section": str(section), "court": court, "year": int(year), "bench_size": int(bench)}
+        for act, section, court, year, bench in zip(
+            rng.choice(["IPC", "CrPC", "IT Act", "NDPS Act"], n_docs, p=[0.6, 0.2, 0.1, 0.1]),
+            rng.integers(1, 512, n_docs),
+            rng.choice(["Supreme Court of India", "Delhi High Court", "Bombay High Court"], n_docs),
+            rng.integers(1950, 2025, n_docs),
+            rng.choice([1, 2, 3, 5, 7], n_docs, p=[0.4, 0.35, 0.15, 0.07, 0.03])
+        )
+    ]
+    start = time.perf_counter()
+    facets = FacetIndex().add(records)
+    results = {"docs": n_docs, "build_s": round(time.perf_counter() - start, 2)}
+
+    start = time.perf_counter()
+    for q in query_vectors:
+        exact_search(matrix, q, top_k)
+    results["unfiltered_ms"] = round((time.perf_counter() - start) / queries * 1000, 3)
+
+    filters = {
+        "act": {"act": "IPC"},
+        "act_year": {"act": "IPC", "year": (2000, None)},
+        "court_bench": {"court": "Supreme Court of India", "bench_size": (5, None)},
+        "sections": {"act": "IPC", "section": ["302", "304", "307"]}
+    }
+    for name, condition in filters.items():
+        start = time.perf_counter()
+        pre = []
+        for q in query_vectors:
+            ids = facets.ids(condition)
+            top, _ = exact_search(matrix[ids], q, top_k)
+            pre.append(ids[top])
+        pre_ms = (time.perf_counter() - start) / queries * 1000
+
+        start = time.perf_counter()
+        post = []
+        for q in query_vectors:
+            scores = (matrix @ q.T).toarray().ravel()
+            scores[~facets.mask(condition)] = -np.inf
+            k = min(top_k, int(np.isfinite(scores).sum()))
+            top = np.argpartition(-scores, k - 1)[:k]
+            post.append(top[np.argsort(-scores[top])])
+        post_ms = (time.perf_counter() - start) / queries * 1000
+
+        results[name] = {
+            "selected": round(len(facets.ids(condition)) / n_docs, 4),
+            "prefilter_ms": round(pre_ms, 3),
+            "postfilter_ms": round(post_ms, 3),
+            "identical": all(set(a.tolist()) == set(b.tolist()) for a, b in zip(pre, post))
+        }
+    return results
+
+
+def bench_pagination(n_docs=100000, queries=50, page_size=10, pages=10):
+    """
+    Compare serving "load more" pages from a cursor snapshot against
+    re-running the search with a larger top_k for every page.
+
+    Returns:
+        dict: Milliseconds for the first page and per later page with
+            each strategy, and whether they served the same documents
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from ann_index import exact_search
+    from search_cursors import CursorStore
+
+    corpus = _synthetic_corpus(n_docs + queries)
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(corpus[:n_docs])
+    query_vectors = [vectorizer.transform([text]) for text in corpus[n_docs:]]
+    results = {"docs": n_docs, "page_size": page_size, "pages": pages}
+
+    start = time.perf_counter()
+    rerun = []
+    for q in query_vectors:
+        served = []
+        for page in range(1, pages + 1):
+            ids, _ = exact_search(matrix, q, page * page_size)
+            served.extend(ids[(page - 1) * page_size:].tolist())
+        rerun.append(served)
+    results["rerun_page_ms"] = round((time.perf_counter() - start) / (queries * pages) * 1000, 3)
+
+    store = CursorStore()
+    first_ms, later_ms, cursor_served = 0.0, 0.0, []
+    for q in query_vectors:
+        start = time.perf_counter()
+        scores = np.asarray((matrix @ q.T).todense()).ravel()
+        cursor, _ = store.open(np.arange(n_docs), scores)
+        ids, _, _, cursor = store.page(cursor, page_size)
+        served = ids.tolist()
+        first_ms += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(pages - 1):
+            ids, _, _, cursor = store.page(cursor, page_size)
+            served.extend(ids.tolist())
+        later_ms += time.perf_counter() - start
+        cursor_served.append(served)
+    results["cursor_first_page_ms"] = round(first_ms / queries * 1000, 3)
+    results["cursor_next_page_ms"] = round(later_ms / (queries * (pages - 1)) * 1000, 3)
+    results["identical"] = all(set(a) == set(b) for a, b in zip(rerun, cursor_served))
+    return results
+
+
+def bench_snippets(n_docs=200, doc_words=20000):
+    """
+    Measure snippet generation for long judgments held as str and as
+    memory-mapped files, and the result payload against returning full text.
+
+    Returns:
+        dict: Milliseconds per result for str and mmap documents, and the
+            average payload per result in bytes with and without snippets
+    """
+    import mmap
+    import tempfile
+    from snippets import make_snippet
+
+    docs = _synthetic_corpus(n_docs, doc_length=doc_words)
+    terms = set(docs[0].split()[100:103])
+    results = {"docs": n_docs, "doc_words": doc_words}
+
+    start = time.perf_counter()
+    str_snippets = [make_snippet(doc, terms) for doc in docs]
+    results["str_ms"] = round((time.perf_counter() - start) / n_docs * 1000, 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        buffers = []
+        for i, doc in enumerate(docs):
+            path = f"{tmp}/{i}.txt"
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(doc)
+            with open(path, "rb") as handle:
+                buffers.append(mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ))
+        start = time.perf_counter()
+        mmap_snippets = [make_snippet(buffer, terms) for buffer in buffers]
+        results["mmap_ms"] = round((time.perf_counter() - start) / n_docs * 1000, 3)
+        for buffer in buffers:
+            buffer.close()
+
+    results["identical"] = all(a["text"] == b["text"] for a, b in zip(str_snippets, mmap_snippets))
+    results["full_text_bytes"] = int(sum(len(doc) for doc in docs) / n_docs)
+    results["snippet_bytes"] = int(sum(len(snippet["text"]) for snippet in str_snippets) / n_docs)
+    return results
+
+
+def bench_argument_cache(requests=200, renders=5):
+    """
+    Compare generating argument sets on every render against serving
+    repeated renders from the argument cache, and check that output is
+    reproducible.
+
+    Returns:
+        dict: Milliseconds per render for the first and repeated renders,
+            and whether a fresh generator gives the same arguments
+    """
+    from argument_generator import ArgumentGenerator
+    from legal_data import ipc_sections
+
+    sections = list(ipc_sections)
+    inputs = [
+        (sections[i % len(sections)], "IPC", f"The accused threatened the victim with a knife, case {i}", i % 2 == 0)
+        for i in range(requests)
+    ]
+
+    generator = ArgumentGenerator()
+    start = time.perf_counter()
+    first = [generator.generate_arguments(s, a, d, f) for s, a, d, f in inputs]
+    first_ms = (time.perf_counter() - start) / requests * 1000
+
+    start = time.perf_counter()
+    for _ in range(renders):
+        for s, a, d, f in inputs:
+            generator.generate_arguments(s, a, d, f)
+    cached_ms = (time.perf_counter() - start) / (requests * renders) * 1000
+
+    fresh = ArgumentGenerator()
+    return {
+        "first_render_ms": round(first_ms, 4),
+        "cached_render_ms": round(cached_ms, 4),
+        "reproducible": all(fresh.generate_arguments(s, a, d, f) == result
+                            for (s, a, d, f), result in zip(inputs, first))
+    }
+
+
+def bench_template_render(calls=200000):
+    """
+    Compare rendering precompiled argument templates against str.format
+    with a KeyError fallback on the raw template text.
+
+    Returns:
+        dict: Microseconds per argument for both approaches
+    """
+    from argument_generator import ArgumentGenerator
+
+    templates = [t for kind in ArgumentGenerator().argument_templates.values() for t in kind]
+    values = {"element": "premeditation", "right": "fair trial", "section": "302",
+              "precedent": "Bachan Singh v. State of Punjab", "argument": "death penalty in the rarest of rare cases"}
+
+    def formatted(text):
+        try:
+            return text.format(**values)
+        except KeyError:
+            return text
+
+    start = time.perf_counter()
+    for i in range(calls):
+        formatted(templates[i % len(templates)].text)
+    format_us = (time.perf_counter() - start) / calls * 1e6
+
+    start = time.perf_counter()
+    for i in range(calls):
+        templates[i % len(templates)].render(values)
+    render_us = (time.perf_counter() - start) / calls * 1e6
+    return {"format_us": round(format_us, 3), "render_us": round(render_us, 3)}
+
+
+def bench_argument_batch(n_cases=5000, n_sections=20):
+    """
+    Compare batch argument generation for a cause-list against one
+    generate_arguments call per case on a cold cache.
+
+    Returns:
+        dict: Milliseconds per case for both, and whether they agree
+    """
+    from argument_generator import ArgumentGenerator
+    from legal_data import ipc_sections
+
+    sections = list(ipc_sections)[:n_sections]
+    cases = [
+        {"case_id": i, "section": sections[i % len(sections)], "act": "IPC",
+         "case_description": f"The accused threatened the victim with a knife, case {i}", "favor": i % 3 != 0}
+        for i in range(n_cases)
+    ]
+
+    generator = ArgumentGenerator()
+    start = time.perf_counter()
+    single = [generator.generate_arguments(c["section"], c["act"], c["case_description"], c["favor"]) for c in cases]
+    single_ms = (time.perf_counter() - start) / n_cases * 1000
+
+    start = time.perf_counter()
+    batch = ArgumentGenerator().generate_batch(cases)
+    batch_ms = (time.perf_counter() - start) / n_cases * 1000
+
+    return {
+        "cases": n_cases,
+        "single_ms": round(single_ms, 4),
+        "batch_ms": round(batch_ms, 4),
+        "identical": all(a["arguments"] == b for a, b in zip(single, batch["arguments"]))
+    }
+
+
+def bench_fact_patterns(n_triggers=5000, n_elements=500, description_words=400, descriptions=200):
+    """
+    Compare the Aho-Corasick fact-pattern matcher against checking every
+    trigger phrase against the description's stemmed tokens one by one.
+
+    Returns:
+        dict: Milliseconds per description for both, and whether they
+            found the same elements
+    """
+    import numpy as np
+    from fact_patterns import FactPatternMatcher, stem_tokens
+
+    rng = np.random.default_rng(13)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    triggers = {}
+    for i in range(n_triggers):
+        words = rng.choice(vocabulary, size=int(rng.integers(1, 4)))
+        triggers.setdefault(f"element {i % n_elements}", []).append(" ".join(words))
+    texts = [" ".join(rng.choice(vocabulary, size=description_words)) for _ in range(descriptions)]
+
+    start = time.perf_counter()
+    matcher = FactPatternMatcher(triggers)
+    results = {"triggers": n_triggers, "build_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    start = time.perf_counter()
+    compiled = [matcher.find(text) for text in texts]
+    results["aho_corasick_ms"] = round((time.perf_counter() - start) / descriptions * 1000, 3)
+
+    stemmed_triggers = {element: [stem_tokens(phrase) for phrase in phrases] for element, phrases in triggers.items()}
+
+    def scan(text):
+        tokens = stem_tokens(text)
+        joined = " " + " ".join(tokens) + " "
+        return [element for element, phrases in stemmed_triggers.items()
+                if any(" " + " ".join(phrase) + " " in joined for phrase in phrases)]
+
+    start = time.perf_counter()
+    scanned = [scan(text) for text in texts]
+    results["scan_ms"] = round((time.perf_counter() - start) / descriptions * 1000, 3)
+    results["identical"] = all(sorted(a) == sorted(b) for a, b in zip(compiled, scanned))
+    return results
+
+
+def bench_bail_assessment(applications=2000, description_words=150):
+    """
+    Time batch bail triage with BailAssessor.assess_many against assessing
+    the same applications one call at a time.
+
+    Returns:
+        dict: Milliseconds per case for both, and whether they agree
+    """
+    import numpy as np
+    from legal_data import bail_factors, ipc_sections
+    from bail_assessment import BailAssessor
+
+    rng = np.random.default_rng(17)
+    phrases = [trigger for factor in bail_factors.values() for trigger in factor.get("triggers", [])]
+    filler = ("the accused was arrested after a complaint by the neighbour and the police recorded "
+              "statements of several persons at the station on the same night").split()
+    sections = list(ipc_sections)
+    batch = []
+    for _ in range(applications):
+        words = list(rng.choice(filler, size=description_words))
+        for phrase in rng.choice(phrases, size=int(rng.integers(0, 6))):
+            words.insert(int(rng.integers(0, len(words))), phrase)
+        batch.append({"section": str(rng.choice(sections)), "act": "IPC", "case_description": " ".join(words)})
+
+    assessor = BailAssessor()
+    start = time.perf_counter()
+    assessed = assessor.assess_many(batch)
+    results = {"applications": applications,
+               "batch_ms_per_case": round((time.perf_counter() - start) / applications * 1000, 3)}
+
+    start = time.perf_counter()
+    single = [assessor.assess(a["section"], a["act"], a["case_description"]) for a in batch]
+    results["single_ms_per_case"] = round((time.perf_counter() - start) / applications * 1000, 3)
+    results["identical"] = assessed == single
+    results["outlooks"] = {outlook: sum(r.get("outlook") == outlook for r in assessed)
+                           for outlook in ("likely", "uncertain", "unlikely")}
+    return results
+
+
+def bench_text_normalization(repeat=200):
+    """
+    Time the Hindi normalisation stage on English and Hindi documents, and
+    compare cross-script retrieval with and without it: each query (English,
+    Hindi or romanised Hindi) should rank its document first among the
+    precedent summaries.
+
+    Returns:
+        dict: Microseconds per document for both languages, and top-1
+            accuracy of TF-IDF retrieval on raw and normalised text
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from legal_data import legal_precedents
+    from text_normalization import normalize_batch, TOKEN_PATTERN
+
+    pairs = [
+        ("अभियुक्त पर धारा 302 के तहत हत्या का आरोप है", "murder charge under section 302"),
+        ("दहेज के लिए पत्नी के साथ क्रूरता, धारा 498A", "dahej krurta 498A"),
+        ("चोरी के मामले में आरोपी को ज़मानत मिली", "chori ke case mein zamanat"),
+        ("The accused cheated buyers in a property sale", "संपत्ति की बिक्री में धोखाधड़ी"),
+        ("Police arrested the accused and kept him in custody", "पुलिस ने गिरफ़्तारी के बाद हिरासत में रखा"),
+        ("अपहरण और फिरौती का मुक़दमा", "kidnapping case"),
+        ("गवाह के बयान में विरोधाभास और सबूत कमज़ोर", "witness evidence"),
+        ("Death of the wife over dowry demands", "दहेज हत्या")
+    ]
+    english = [" ".join([p["case_name"], p["summary"]] + p["key_points"]) for p in legal_precedents]
+    hindi = [document for document, _ in pairs if not document.isascii()]
+
+    results = {}
+    for name, texts in (("english", english), ("hindi", hindi)):
+        texts = texts * repeat
+        start = time.perf_counter()
+        normalize_batch(texts)
+        results[f"{name}_us_per_doc"] = round((time.perf_counter() - start) / len(texts) * 1e6, 2)
+
+    documents = [document for document, _ in pairs] + english
+    queries = [query for _, query in pairs]
+    for name, vectorizer, prepare in (
+        ("raw", TfidfVectorizer(), list),
+        ("normalized", TfidfVectorizer(token_pattern=TOKEN_PATTERN), normalize_batch)
+    ):
+        matrix = vectorizer.fit_transform(prepare(documents))
+        scores = (vectorizer.transform(prepare(queries)) @ matrix.T).toarray()
+        results[f"{name}_top1"] = round(float(np.mean(scores.argmax(axis=1) == np.arange(len(pairs)))), 3)
+    return results
+
+
+def bench_autocomplete(lookups=20000, synthetic_names=100000):
+    """
+    Time search-box suggestions on the legal_data index and on an index
+    padded with synthetic precedent names, with every prefix of a set of
+    typed queries, as they arrive keystroke by keystroke.
+
+    Returns:
+        dict: Build time, p50/p99/max lookup latency in microseconds and
+            memory usage for both indexes
+    """
+    import numpy as np
+    from autocomplete import AutocompleteIndex
+
+    typed = ["murder", "ipc 302", "section 438", "cheating", "bail", "bachan singh", "2 scc", "dowry death",
+             "order 39", "it act 66", "puttaswamy", "criminal intimidation", "evidence act 65b", "driving"]
+    prefixes = [query[:n] for query in typed for n in range(1, len(query) + 1)]
+    rng = np.random.default_rng(11)
+    base = AutocompleteIndex.from_legal_data()
+    names = [f"{first} v. {second}" for first, second in zip(
+        rng.choice(["State", "Union", "Ramesh", "Sunita", "Mohd.", "Lakshmi", "Arjun", "Kavita"], synthetic_names),
+        rng.choice(["Kumar", "Sharma", "Singh", "Reddy", "Iyer", "Khan", "Das", "Patel"], synthetic_names)
+    )]
+
+    results = {}
+    for name, build in (
+        ("legal_data", AutocompleteIndex.from_legal_data),
+        ("synthetic", lambda: AutocompleteIndex(base.suggestions + [
+            {"text": f"{text} {i}", "keys": [f"({1950 + i % 70}) {i % 12} SCC {i % 997}"],
+             "popularity": int(rng.integers(0, 50))}
+            for i, text in enumerate(names)
+        ]))
+    ):
+        start = time.perf_counter()
+        index = build()
+        build_ms = (time.perf_counter() - start) * 1000
+        times = []
+        for i in range(lookups):
+            prefix = prefixes[i % len(prefixes)]
+            start = time.perf_counter()
+            index.suggest(prefix)
+            times.append(time.perf_counter() - start)
+        times = np.array(times) * 1e6
+        results[name] = {
+            "build_ms": round(build_ms, 1),
+            "p50_us": round(float(np.percentile(times, 50)), 1),
+            "p99_us": round(float(np.percentile(times, 99)), 1),
+            "max_us": round(float(times.max()), 1),
+            "memory": index.memory_usage()
+        }
+    return results
+
+
+def bench_artifact_cache(n_docs=20000, queries=50, top_k=10, doc_length=300):
+    """
+    Time fitting the case matcher from scratch against loading its fitted
+    vectorizer, matrix, LSA embeddings and ANN index from the artifact cache,
+    as a restarted worker would.
+
+    Returns:
+        dict: Seconds for an uncached fit, a fit that fills the cache and a
+            fit served from it, and whether the warm matcher returns the
+            same results
+    """
+    import tempfile
+    from artifact_cache import ArtifactCache
+    from semantic_search import EnhancedLegalCaseMatcher
+
+    corpus = _synthetic_corpus(n_docs + queries, doc_length=doc_length)
+    query_texts = [" ".join(text.split()[:3]) for text in corpus[n_docs:]]
+    corpus = corpus[:n_docs]
+
+    def fit(artifacts):
+        matcher = EnhancedLegalCaseMatcher()
+        matcher.artifacts = artifacts
+        start = time.perf_counter()
+        matcher.fit(corpus, build_ann=True)
+        return matcher, round(time.perf_counter() - start, 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ArtifactCache(tmp)
+        fresh, uncached_s = fit(None)
+        _, cold_s = fit(cache)
+        warm, warm_s = fit(cache)
+        results = {"docs": n_docs, "uncached_fit_s": uncached_s, "cold_fit_s": cold_s, "warm_fit_s": warm_s}
+
+        start = time.perf_counter()
+        warm_hits = [warm.find_similar_cases(q, top_k=top_k) for q in query_texts]
+        results["warm_query_ms"] = round((time.perf_counter() - start) / queries * 1000, 3)
+        fresh_hits = [fresh.find_similar_cases(q, top_k=top_k) for q in query_texts]
+        results["identical"] = all(
+            [hit["text"] for hit in a] == [hit["text"] for hit in b] for a, b in zip(warm_hits, fresh_hits)
+        )
+        del warm
+    return results
+
+
+def _memory_workloads(n_docs=5000, adhoc_docs=2000, sentences=400):
+    """Set up the profiled search calls: name to a function making one call."""
+    from model import LegalPredictor
+    from semantic_search import EnhancedLegalCaseMatcher
+
+    corpus = _synthetic_corpus(n_docs + 1, doc_length=300)
+    query = " ".join(corpus[-1].split()[:5])
+    corpus = corpus[:n_docs]
+
+    matcher = EnhancedLegalCaseMatcher()
+    matcher.artifacts = None
+    matcher.fit(corpus, build_ann=False, lsa_components=64)
+    adhoc = EnhancedLegalCaseMatcher()
+
+    predictor = LegalPredictor()
+    predictor.artifacts = None
+    predictor.precedent_data = [
+        {"case_name": f"Case {i}", "citation": f"({2000 + i % 20}) {i} SCC 1", "section": "302", "act": "IPC",
+         "summary": text, "key_points": []}
+        for i, text in enumerate(corpus)
+    ]
+    predictor.build_precedent_index()
+
+    document = " ".join(f"{text}." for text in _synthetic_corpus(sentences, doc_length=25, seed=11))
+    return {
+        "find_similar_cases": lambda: matcher.find_similar_cases(query, top_k=10, exact=True),
+        "find_similar_cases_adhoc": lambda: adhoc.find_similar_cases(query, corpus[:adhoc_docs], top_k=10),
+        "find_similar_precedents": lambda: predictor.find_similar_precedents(query, top_k=10, exact=True),
+        "extract_key_sentences": lambda: adhoc.extract_key_sentences(document, top_n=5)
+    }
+
+
+def _profile_memory(workloads, repeat=3):
+    """
+    Run each workload with memory profiling on.
+
+    Returns:
+        dict: Peak KiB per workload and per "workload/stage", the highest
+            over ``repeat`` calls
+    """
+    import instrumentation
+
+    was_profiling = instrumentation.is_memory_profiling()
+    instrumentation.enable_memory_profiling()
+    peaks = {}
+    try:
+        for name, call in workloads.items():
+            for _ in range(repeat):
+                call()
+                # The workload's own span finishes last
+                trace = instrumentation.recent_traces(1)[0]
+                peaks[name] = max(peaks.get(name, 0.0), trace["peak_kb"])
+                for stage_name, peak_kb in trace["stage_peaks_kb"].items():
+                    key = f"{name}/{stage_name}"
+                    peaks[key] = max(peaks.get(key, 0.0), peak_kb)
+    finally:
+        instrumentation.enable_memory_profiling(was_profiling)
+    return {key: round(value, 1) for key, value in sorted(peaks.items())}
+
+
+def bench_memory_profile(baselines_path=MEMORY_BASELINES):
+    """
+    Profile the peak allocations of find_similar_cases (on a fitted corpus
+    and on ad hoc case texts), find_similar_precedents and
+    extract_key_sentences per stage, and flag regressions against the
+    stored baselines.
+
+    Returns:
+        dict: Peak KiB per workload and stage, and the regressions: entries
+            whose peak exceeds the baseline by more than MEMORY_TOLERANCE
+            plus MEMORY_SLACK_KB
+    """
+    peaks = _profile_memory(_memory_workloads())
+    results = {"peaks_kb": peaks, "regressions": []}
+    if not os.path.exists(baselines_path):
+        results["baselines"] = None
+        return results
+
+    with open(baselines_path, "r", encoding="utf-8") as f:
+        baselines = json.load(f)
+    results["baselines"] = os.path.basename(baselines_path)
+    for key, peak_kb in peaks.items():
+        baseline_kb = baselines.get(key)
+        if baseline_kb is not None and peak_kb > baseline_kb * (1 + MEMORY_TOLERANCE) + MEMORY_SLACK_KB:
+            results["regressions"].append({"stage": key, "peak_kb": peak_kb, "baseline_kb": baseline_kb})
+    return results
+
+
+def update_memory_baselines(baselines_path=MEMORY_BASELINES):
+    """Profile the memory workloads and store their peaks as the new baselines."""
+    peaks = _profile_memory(_memory_workloads())
+    tmp_path = f"{baselines_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(peaks, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, baselines_path)
+    return peaks
+
+
+BENCHMARKS = {
+    "engine_rerun": bench_engine_rerun,
+    "page_payload": bench_page_payload,
+    "tracing_overhead": bench_tracing_overhead,
+    "relevance_models": bench_relevance_models,
+    "ann_recall": bench_ann_recall,
+    "lsa_embeddings": bench_lsa_embeddings,
+    "bm25": bench_bm25,
+    "ingest": bench_ingest,
+    "near_duplicates": bench_near_duplicates,
+    "facets": bench_facets,
+    "pagination": bench_pagination,
+    "snippets": bench_snippets,
+    "argument_cache": bench_argument_cache,
+    "template_render": bench_template_render,
+    "argument_batch": bench_argument_batch,
+    "fact_patterns": bench_fact_patterns,
+    "bail_assessment": bench_bail_assessment,
+    "text_normalization": bench_text_normalization,
+    "autocomplete": bench_autocomplete,
+    "artifact_cache": bench_artifact_cache,
+    "memory_profile": bench_memory_profile,
+}
+
+
+def main(names=None):
+    """Run the named benchmarks (all by default) and print their results as JSON."""
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name}. Available: {', '.join(BENCHMARKS)}")
+            continue
+        results[name] = BENCHMARKS[name]()
+        print(f"{name}: {json.dumps(results[name])}")
+    return results
+
+
+if __name__ == "__main__":
+    if "--update-memory-baselines" in sys.argv[1:]:
+        print(json.dumps(update_memory_baselines()))
+    else:
+        main(sys.argv[1:])
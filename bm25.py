@@ -0,0 +1,285 @@
+"""
+BM25F Ranking
+
+A BM25F ranker over a precomputed inverted index. Each document has several
+fields (for precedents: case_name, summary, key_points) with their own weight
+and length normalisation. Term frequencies are combined across fields before
+saturation, as in BM25F:
+
+    tf~(t, d) = sum_f w_f * tf_f(t, d) / (1 - b_f + b_f * len_f(d) / avglen_f)
+    score(q, d) = sum_t idf(t) * tf~(t, d) / (k1 + tf~(t, d))
+
+Field lengths are kept in NumPy arrays, and every posting list stores its
+document ids and precomputed tf~ values as arrays, so scoring a posting list
+is a vectorised operation.
+
+Top-k queries use MaxScore early termination. Terms are processed from the
+highest score upper bound to the lowest. Once the k-th best score exceeds the
+sum of the upper bounds of the remaining terms, no unseen document can enter
+the top k. The remaining (usually long, low-idf) posting lists are then only
+probed for the surviving candidates instead of being scored in full. The
+result is identical to exhaustive scoring.
+"""
+
+import re
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+K1 = 1.2
+DEFAULT_B = 0.75
+
+# Field weights for precedent records
+PRECEDENT_FIELD_WEIGHTS = {"case_name": 2.0, "summary": 1.0, "key_points": 1.5}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+
+
+def default_tokenizer(text):
+    """Lowercase word tokens without English stopwords."""
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in ENGLISH_STOP_WORDS]
+
+
+def _field_text(value):
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value or "")
+
+
+class BM25FIndex:
+    """
+    Inverted index with BM25F scoring and MaxScore top-k retrieval.
+    """
+
+    def __init__(self, field_weights=None, k1=K1, b=None, tokenizer=None):
+        """
+        Args:
+            field_weights (dict): Weight per field name. Defaults to a single
+                "text" field.
+            k1 (float): Term frequency saturation
+            b (dict, optional): Length normalisation per field, default 0.75
+            tokenizer (callable, optional): Function from text to a token list
+        """
+        self.field_weights = dict(field_weights or {"text": 1.0})
+        self.fields = list(self.field_weights)
+        self.k1 = k1
+        self.b = {field: (b or {}).get(field, DEFAULT_B) for field in self.fields}
+        self.tokenizer = tokenizer or default_tokenizer
+        self.n_docs = 0
+        self.field_lengths = {}
+        self.avg_lengths = {}
+        self.postings = {}
+        self.idf = {}
+        self.upper_bounds = {}
+
+    def build(self, documents):
+        """
+        Build the index.
+
+        Args:
+            documents (list): One dict per document mapping field name to
+                text (or a list of strings). Plain strings are treated as the
+                first field.
+
+        Returns:
+            BM25FIndex: self
+        """
+        self.n_docs = len(documents)
+        field_counts = {field: [] for field in self.fields}
+        lengths = {field: np.zeros(self.n_docs, dtype=np.float32) for field in self.fields}
+
+        for doc_id, document in enumerate(documents):
+            if not isinstance(document, dict):
+                document = {self.fields[0]: document}
+            for field in self.fields:
+                tokens = self.tokenizer(_field_text(document.get(field, "")))
+                lengths[field][doc_id] = len(tokens)
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                field_counts[field].append(counts)
+
+        self.field_lengths = lengths
+        self.avg_lengths = {field: float(lengths[field].mean()) or 1.0 for field in self.fields}
+
+        # Accumulate length-normalised, weighted field frequencies per term
+        term_docs = {}
+        for field in self.fields:
+            weight = self.field_weights[field]
+            b = self.b[field]
+            norms = 1.0 - b + b * lengths[field] / self.avg_lengths[field]
+            for doc_id, counts in enumerate(field_counts[field]):
+                norm = norms[doc_id]
+                for term, count in counts.items():
+                    docs = term_docs.setdefault(term, {})
+                    docs[doc_id] = docs.get(doc_id, 0.0) + weight * count / norm
+
+        self.postings = {}
+        self.idf = {}
+        self.upper_bounds = {}
+        for term, docs in term_docs.items():
+            ids = np.fromiter(docs.keys(), dtype=np.int32, count=len(docs))
+            tf = np.fromiter(docs.values(), dtype=np.float32, count=len(docs))
+            order = np.argsort(ids)
+            ids, tf = ids[order], tf[order]
+            df = len(ids)
+            idf = float(np.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5)))
+            contributions = (idf * tf / (self.k1 + tf)).astype(np.float32)
+            self.postings[term] = (ids, contributions)
+            self.idf[term] = idf
+            self.upper_bounds[term] = float(contributions.max())
+        return self
+
+    def parts(self):
+        """
+        Get the built index as flat arrays, for storing it (see restore).
+
+        Returns:
+            dict: Terms, posting offsets, concatenated posting ids and
+                contributions, per-term idf and upper bounds, and the field
+                lengths (one row per field)
+        """
+        terms = list(self.postings)
+        lengths = [len(self.postings[term][0]) for term in terms]
+        empty_ids, empty_contributions = np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+        return {
+            "terms": np.array(terms, dtype=str),
+            "offsets": np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            "ids": np.concatenate([self.postings[term][0] for term in terms] or [empty_ids]),
+            "contributions": np.concatenate([self.postings[term][1] for term in terms] or [empty_contributions]),
+            "idf": np.array([self.idf[term] for term in terms], dtype=np.float64),
+            "upper_bounds": np.array([self.upper_bounds[term] for term in terms], dtype=np.float64),
+            "field_lengths": np.stack([self.field_lengths[field] for field in self.fields])
+            if self.fields else np.zeros((0, self.n_docs), dtype=np.float32)
+        }
+
+    def restore(self, parts):
+        """
+        Set up a built index from stored parts. Posting lists are views
+        into the stored arrays, so memory-mapped parts stay memory-mapped.
+
+        Returns:
+            BM25FIndex: self
+        """
+        field_lengths = parts["field_lengths"]
+        self.n_docs = field_lengths.shape[1]
+        self.field_lengths = {field: field_lengths[i] for i, field in enumerate(self.fields)}
+        self.avg_lengths = {field: float(self.field_lengths[field].mean()) or 1.0 if self.n_docs else 1.0
+                            for field in self.fields}
+
+        terms = parts["terms"].tolist()
+        offsets = parts["offsets"].tolist()
+        ids, contributions = parts["ids"], parts["contributions"]
+        self.postings = {
+            term: (ids[offsets[i]:offsets[i + 1]], contributions[offsets[i]:offsets[i + 1]])
+            for i, term in enumerate(terms)
+        }
+        self.idf = dict(zip(terms, parts["idf"].tolist()))
+        self.upper_bounds = dict(zip(terms, parts["upper_bounds"].tolist()))
+        return self
+
+    def _query_terms(self, query):
+        weights = {}
+        for token in self.tokenizer(query):
+            if token in self.postings:
+                weights[token] = weights.get(token, 0) + 1
+        # Highest upper bound first
+        return sorted(weights.items(), key=lambda item: self.upper_bounds[item[0]] * item[1], reverse=True)
+
+    def search(self, query, top_k=5, doc_mask=None, exhaustive=False):
+        """
+        Find the top-k documents for a query.
+
+        Args:
+            query (str): Query text
+            top_k (int): Number of results
+            doc_mask (numpy.ndarray, optional): Boolean array; only documents
+                where it is True are returned
+            exhaustive (bool): Score every posting of every query term
+                instead of using MaxScore (for testing and benchmarking)
+
+        Returns:
+            tuple: (document ids, BM25F scores), best first
+        """
+        terms = self._query_terms(query)
+        if not terms or top_k <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        if exhaustive:
+            return self._search_exhaustive(terms, top_k, doc_mask)
+
+        bounds = [self.upper_bounds[term] * qtf for term, qtf in terms]
+        remaining = sum(bounds)
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        seen = np.zeros(self.n_docs, dtype=bool)
+        candidates = np.array([], dtype=np.int32)
+        threshold = 0.0
+
+        # OR phase: score full posting lists while unseen documents can still make the top k
+        position = 0
+        while position < len(terms):
+            term, qtf = terms[position]
+            ids, contributions = self.postings[term]
+            if doc_mask is not None:
+                keep = doc_mask[ids]
+                ids, contributions = ids[keep], contributions[keep]
+            scores[ids] += qtf * contributions
+            unseen = ids[~seen[ids]]
+            seen[unseen] = True
+            candidates = np.concatenate([candidates, unseen])
+            remaining = max(remaining - bounds[position], 0.0)
+            position += 1
+
+            if len(candidates) >= top_k:
+                threshold = np.partition(scores[candidates], len(candidates) - top_k)[len(candidates) - top_k]
+                if threshold > remaining:
+                    break
+
+        # Probe phase: only candidates that can still reach the threshold are looked up
+        if position < len(terms):
+            candidates = candidates[scores[candidates] + remaining >= threshold]
+            for term, qtf in terms[position:]:
+                ids, contributions = self.postings[term]
+                slots = np.searchsorted(ids, candidates)
+                slots[slots >= len(ids)] = 0
+                found = ids[slots] == candidates
+                scores[candidates[found]] += qtf * contributions[slots[found]]
+                remaining = max(remaining - self.upper_bounds[term] * qtf, 0.0)
+
+                threshold = np.partition(scores[candidates], len(candidates) - top_k)[len(candidates) - top_k]
+                candidates = candidates[scores[candidates] + remaining >= threshold]
+
+        k = min(top_k, len(candidates))
+        if k == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        candidate_scores = scores[candidates]
+        best = np.argpartition(-candidate_scores, k - 1)[:k]
+        best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        return candidates[best].astype(np.int64), candidate_scores[best]
+
+    def score_all(self, query, doc_mask=None):
+        """
+        Score every document that matches at least one query term.
+
+        Returns:
+            tuple: (document ids, BM25F scores) in id order
+        """
+        return self._score_all(self._query_terms(query), doc_mask)
+
+    def _score_all(self, terms, doc_mask):
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term, qtf in terms:
+            ids, contributions = self.postings[term]
+            scores[ids] += qtf * contributions
+        candidates = np.flatnonzero(scores)
+        if doc_mask is not None:
+            candidates = candidates[doc_mask[candidates]]
+        return candidates, scores[candidates]
+
+    def _search_exhaustive(self, terms, top_k, doc_mask):
+        candidates, candidate_scores = self._score_all(terms, doc_mask)
+        k = min(top_k, len(candidates))
+        if k == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        best = np.argpartition(-candidate_scores, k - 1)[:k]
+        best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        return candidates[best].astype(np.int64), candidate_scores[best]
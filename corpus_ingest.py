@@ -0,0 +1,594 @@
+"""
+Corpus Ingestion Pipeline
+
+Streams precedent and judgment records from bulk JSONL, CSV or Parquet dumps
+into a searchable corpus without loading whole files or rebuilding indexes.
+
+Each chunk of records is normalised into the precedent schema used by
+legal_data.legal_precedents, deduplicated by normalised citation, checked
+for near-duplicate text (the same judgment from another reporter, see
+near_duplicates.py), appended to an on-disk JSONL record store, and added to
+the search index as a new segment. Near-duplicates are not stored again;
+their citations become alias citations of the canonical record. The index
+uses hashed term features, so it has no vocabulary to refit: document
+frequencies are updated per chunk and IDF weights are applied on the query
+side at search time.
+
+Run ``python corpus_ingest.py dump.jsonl [store.jsonl]`` to ingest a file
+and print throughput and peak memory.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import resource
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from near_duplicates import NearDuplicateIndex
+from text_normalization import TOKEN_PATTERN
+from facets import FacetIndex
+
+DEFAULT_CHUNK_SIZE = 10000
+
+# Hashed feature space of the ingested corpus index
+N_FEATURES = 2 ** 20
+
+# Number of newest segments merged at a time, and the size ratio between
+# merge tiers
+MERGE_FACTOR = 4
+
+# Tail segments are merged regardless of their sizes once there are more
+# than this many
+MAX_SEGMENTS = 16
+
+PRECEDENT_FIELDS = ("case_name", "citation", "court", "bench", "year", "act", "section", "summary", "key_points")
+
+# Alternative column names found in judgment dumps
+FIELD_ALIASES = {
+    "title": "case_name", "name": "case_name", "case_title": "case_name",
+    "headnote": "summary", "abstract": "summary", "text": "summary",
+    "court_name": "court", "coram": "bench", "judges": "bench",
+    "statute": "act", "sections": "section", "held": "key_points"
+}
+
+_YEAR_PATTERN = re.compile(r"\b(1[89]\d{2}|20\d{2})\b")
+_LIST_SEPARATOR = re.compile(r"\s*[;|]\s*")
+
+
+def normalize_citation(citation):
+    """
+    Normalise a citation for duplicate detection.
+
+    Collapses whitespace, drops dots from reporter abbreviations (A.I.R. and
+    AIR compare equal) and uppercases, e.g. " (2014) 8 scc  273" and
+    "(2014) 8 SCC 273" give the same key.
+    """
+    citation = str(citation or "").upper().replace(".", "")
+    citation = re.sub(r"\s*([()\[\]])\s*", r"\1", citation)
+    citation = re.sub(r"\)(?=\w)", ") ", citation)
+    return re.sub(r"\s+", " ", citation).strip()
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    if hasattr(value, "tolist"):
+        return _as_list(value.tolist())
+    text = str(value).strip()
+    if not text or text.lower() == "nan":
+        return []
+    if text.startswith("["):
+        try:
+            return _as_list(json.loads(text))
+        except ValueError:
+            pass
+    return [part for part in _LIST_SEPARATOR.split(text) if part]
+
+
+def _as_text(value):
+    if value is None:
+        return ""
+    text = str(value).strip()
+    return "" if text.lower() == "nan" else re.sub(r"\s+", " ", text)
+
+
+def normalize_record(raw):
+    """
+    Map a raw dump record onto the precedent schema.
+
+    Args:
+        raw (dict): Record as read from the dump
+
+    Returns:
+        dict: Record with every PRECEDENT_FIELDS key, or None if it has no
+            citation or no text to index
+    """
+    record = {}
+    for key, value in raw.items():
+        key = str(key).strip().lower()
+        key = FIELD_ALIASES.get(key, key)
+        if key in PRECEDENT_FIELDS and key not in record:
+            record[key] = value
+
+    normalized = {
+        "case_name": _as_text(record.get("case_name")),
+        "citation": _as_text(record.get("citation")),
+        "court": _as_text(record.get("court")),
+        "bench": _as_text(record.get("bench")),
+        "act": _as_text(record.get("act")),
+        "section": ", ".join(_as_list(record.get("section"))),
+        "summary": _as_text(record.get("summary")),
+        "key_points": _as_list(record.get("key_points"))
+    }
+
+    year = record.get("year")
+    match = _YEAR_PATTERN.search(str(year if year is not None else normalized["citation"]))
+    normalized["year"] = int(match.group(1)) if match else None
+
+    if not normalized["citation"] or not (normalized["summary"] or normalized["case_name"]):
+        return None
+    return normalized
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Read a JSONL, CSV or Parquet dump in chunks of raw records.
+
+    Args:
+        path (str): Dump file; the format is taken from the extension
+        chunk_size (int): Records per chunk
+
+    Yields:
+        list: Up to chunk_size raw record dicts
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in (".jsonl", ".json", ".ndjson"):
+        chunk = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    chunk.append(json.loads(line))
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+        if chunk:
+            yield chunk
+
+    elif extension in (".csv", ".tsv"):
+        import pandas as pd
+
+        reader = pd.read_csv(path, sep="\t" if extension == ".tsv" else ",", chunksize=chunk_size,
+                             dtype=str, keep_default_na=False)
+        for frame in reader:
+            yield frame.to_dict("records")
+
+    elif extension == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet dumps requires pyarrow (pip install pyarrow)")
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+
+    else:
+        raise ValueError(f"Unsupported dump format: {extension}")
+
+
+class CitationSet:
+    """
+    Set of normalised citations seen so far, stored as a sorted array of
+    64-bit hashes (8 bytes per record).
+    """
+
+    def __init__(self):
+        self.hashes = np.array([], dtype=np.uint64)
+
+    @staticmethod
+    def hash_citation(citation):
+        digest = hashlib.blake2b(normalize_citation(citation).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def add_new(self, citations):
+        """
+        Add a chunk of citations.
+
+        Returns:
+            numpy.ndarray: Boolean mask of citations not seen before (the
+                first occurrence within the chunk counts as new)
+        """
+        hashes = np.fromiter((self.hash_citation(c) for c in citations), dtype=np.uint64, count=len(citations))
+        _, first = np.unique(hashes, return_index=True)
+        new = np.zeros(len(hashes), dtype=bool)
+        new[first] = True
+        new &= ~np.isin(hashes, self.hashes)
+        self.hashes = np.union1d(self.hashes, hashes[new])
+        return new
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+class RecordStore:
+    """
+    Append-only JSONL file of normalised records with an in-memory array of
+    line offsets, so any record can be read back by id with one seek.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        offsets = []
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    offsets.append(offset)
+                    offset += len(line)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def append(self, records):
+        """Append records and return the id of the first one."""
+        first_id = len(self.offsets)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            new_offsets = []
+            for record in records:
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                new_offsets.append(offset)
+                f.write(line)
+                offset += len(line)
+        self.offsets = np.concatenate([self.offsets, np.array(new_offsets, dtype=np.int64)])
+        return first_id
+
+    def get(self, record_id):
+        """Read one record by id."""
+        with open(self.path, "rb") as f:
+            f.seek(int(self.offsets[record_id]))
+            return json.loads(f.readline())
+
+    def get_many(self, record_ids):
+        """Read several records by id, in the given order."""
+        records = []
+        with open(self.path, "rb") as f:
+            for record_id in record_ids:
+                f.seek(int(self.offsets[record_id]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+class IncrementalIndex:
+    """
+    Segmented hashed-feature index that grows without refitting.
+
+    Documents are stored as L2-normalised sublinear term frequencies. Each
+    added chunk becomes a segment, and document frequencies are updated by
+    the chunk's non-zero features. At query time the query's term weights are
+    multiplied by the current IDF, so newly added documents immediately
+    change the weighting without touching existing rows.
+
+    Segments are merged in tiers: once the newest MERGE_FACTOR segments are
+    of similar size they are stacked into one, which may in turn complete a
+    tier above. Only the small segments at the tail are copied, so each
+    document is copied about log(n) times over the life of the index rather
+    than on every merge.
+    """
+
+    def __init__(self, n_features=N_FEATURES):
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, stop_words="english", alternate_sign=False, norm=None,
+            token_pattern=TOKEN_PATTERN
+        )
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.segments = []
+        self.n_docs = 0
+
+    def _term_frequencies(self, texts):
+        matrix = self.vectorizer.transform(texts).astype(np.float32).tocsr()
+        matrix.data = 1.0 + np.log(matrix.data)
+        return matrix
+
+    def add(self, texts):
+        """Index a chunk of preprocessed texts as a new segment."""
+        matrix = self._term_frequencies(texts)
+        self.document_frequency += np.bincount(matrix.indices, minlength=len(self.document_frequency))
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix = sparse.diags((1.0 / norms).astype(np.float32)) @ matrix
+
+        self.segments.append(matrix.tocsr())
+        self.n_docs += matrix.shape[0]
+        self._merge_tail()
+
+    def _merge_tail(self):
+        """Merge the newest segments while they fill a tier, keeping document order."""
+        while len(self.segments) >= MERGE_FACTOR:
+            tail = self.segments[-MERGE_FACTOR:]
+            # The oldest segment of the tail is a tier above the newest one
+            if len(self.segments) <= MAX_SEGMENTS and tail[0].shape[0] >= MERGE_FACTOR * tail[-1].shape[0]:
+                break
+            self.segments[-MERGE_FACTOR:] = [sparse.vstack(tail, format="csr")]
+
+    def idf(self, indices):
+        """Smoothed IDF of the given feature indices."""
+        return np.log((1.0 + self.n_docs) / (1.0 + self.document_frequency[indices])) + 1.0
+
+    def query_vector(self, text):
+        """Vectorise a preprocessed query with the current IDF weights."""
+        query = self._term_frequencies([text])
+        query.data = (query.data * self.idf(query.indices)).astype(np.float32)
+        norm = np.sqrt(np.dot(query.data, query.data))
+        if norm:
+            query.data /= norm
+        return query
+
+    def search(self, text, top_k=5, doc_mask=None):
+        """
+        Find the top-k documents for a preprocessed query.
+
+        Args:
+            text (str): Preprocessed query text
+            top_k (int): Number of results
+            doc_mask (numpy.ndarray, optional): Boolean array over all
+                documents; only documents where it is True are returned
+
+        Returns:
+            tuple: (document ids, scores), best first
+        """
+        query = self._dense_query(text)
+        ids, scores = [], []
+        offset = 0
+        for segment in self.segments:
+            segment_scores = segment @ query
+            if doc_mask is not None:
+                segment_scores = np.where(doc_mask[offset:offset + len(segment_scores)], segment_scores, 0.0)
+            k = min(top_k, len(segment_scores))
+            best = np.argpartition(-segment_scores, k - 1)[:k]
+            ids.append(best + offset)
+            scores.append(segment_scores[best])
+            offset += segment.shape[0]
+
+        if not ids:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        keep = scores > 0
+        ids, scores = ids[keep], scores[keep]
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return ids[order], scores[order]
+
+    def score_all(self, text, doc_mask=None):
+        """
+        Score every document for a preprocessed query.
+
+        Returns:
+            tuple: (document ids, scores) of the documents scoring above 0,
+                in id order
+        """
+        if not self.segments:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        query = self._dense_query(text)
+        scores = np.concatenate([segment @ query for segment in self.segments])
+        if doc_mask is not None:
+            scores = np.where(doc_mask[:len(scores)], scores, 0.0)
+        ids = np.flatnonzero(scores > 0)
+        return ids, scores[ids]
+
+    def _dense_query(self, text):
+        query_vector = self.query_vector(text)
+        # A dense query makes each segment product a plain CSR mat-vec
+        query = np.zeros(len(self.document_frequency), dtype=np.float32)
+        query[query_vector.indices] = query_vector.data
+        return query
+
+
+def _peak_memory_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class IngestedCorpus:
+    """
+    Precedent corpus built by streaming ingestion: record store, citation
+    set and incremental index.
+    """
+
+    def __init__(self, store_path, detect_near_duplicates=True):
+        """
+        Args:
+            store_path (str): JSONL file holding the ingested records. An
+                existing store is re-indexed on load.
+            detect_near_duplicates (bool): Fold near-duplicate judgments into
+                their canonical record as alias citations
+        """
+        from semantic_search import legal_case_matcher
+
+        self.preprocess_text = legal_case_matcher.preprocess_text
+        self.store = RecordStore(store_path)
+        self.aliases_path = f"{store_path}.aliases.jsonl"
+        self.citations = CitationSet()
+        self.index = IncrementalIndex()
+        self.near_duplicates = NearDuplicateIndex() if detect_near_duplicates else None
+        self.facets = FacetIndex()
+        self.aliases = {}
+
+        if len(self.store):
+            for start in range(0, len(self.store), DEFAULT_CHUNK_SIZE):
+                records = self.store.get_many(range(start, min(start + DEFAULT_CHUNK_SIZE, len(self.store))))
+                self.citations.add_new([r["citation"] for r in records])
+                if self.near_duplicates is not None:
+                    self.near_duplicates.add([self.duplicate_text(r) for r in records], canonical=True)
+                self._index_records(start, records)
+
+        if os.path.exists(self.aliases_path):
+            with open(self.aliases_path, "r", encoding="utf-8") as f:
+                aliases = [json.loads(line) for line in f if line.strip()]
+            self.citations.add_new([alias["citation"] for alias in aliases])
+            for alias in aliases:
+                self.aliases.setdefault(alias["id"], []).append(alias["citation"])
+
+    def index_text(self, record):
+        """Preprocessed text indexed for a record: name, summary and key points."""
+        return self.preprocess_text(" ".join([record["case_name"], record["summary"]] + record["key_points"]))
+
+    def duplicate_text(self, record):
+        """Text compared for near-duplicate detection: summary and key points."""
+        return " ".join([record["summary"]] + record["key_points"])
+
+    def _add_aliases(self, aliases):
+        with open(self.aliases_path, "a", encoding="utf-8") as f:
+            for record_id, citation in aliases:
+                self.aliases.setdefault(record_id, []).append(citation)
+                f.write(json.dumps({"id": record_id, "citation": citation}, ensure_ascii=False) + "\n")
+
+    def _index_records(self, first_id, records):
+        self.index.add([self.index_text(record) for record in records])
+        self.facets.add(records, first_id)
+
+    def filter_mask(self, section=None, act=None, filters=None):
+        """
+        Get a document mask for an act and section filter and facet
+        conditions (see facets.py).
+
+        Returns:
+            numpy.ndarray: Boolean mask over the corpus, or None when no
+                filter is given
+        """
+        filters = dict(filters or {})
+        if section and act:
+            filters.setdefault("act", act)
+            filters.setdefault("section", section)
+        if not filters:
+            return None
+        return self.facets.mask(filters)
+
+    def add_records(self, raw_records):
+        """
+        Normalise, deduplicate, store and index one chunk of raw records.
+
+        Returns:
+            dict: Counts of ingested, duplicate (same citation),
+                near-duplicate (same judgment text) and invalid records
+        """
+        records = [normalize_record(raw) for raw in raw_records]
+        invalid = sum(record is None for record in records)
+        records = [record for record in records if record is not None]
+
+        new = self.citations.add_new([record["citation"] for record in records]) if records else []
+        records = [record for record, is_new in zip(records, new) if is_new]
+        duplicates = len(new) - len(records)
+
+        near_duplicates = 0
+        if records and self.near_duplicates is not None:
+            duplicate_of = self.near_duplicates.add([self.duplicate_text(record) for record in records])
+            aliases = [(int(original), record["citation"])
+                       for record, original in zip(records, duplicate_of) if original >= 0]
+            if aliases:
+                self._add_aliases(aliases)
+            near_duplicates = len(aliases)
+            records = [record for record, original in zip(records, duplicate_of) if original < 0]
+
+        if records:
+            self._index_records(self.store.append(records), records)
+
+        return {"ingested": len(records), "duplicates": duplicates, "near_duplicates": near_duplicates,
+                "invalid": invalid}
+
+    def ingest(self, path, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+        """
+        Stream a dump file into the corpus.
+
+        Args:
+            path (str): JSONL, CSV or Parquet dump
+            chunk_size (int): Records read, normalised and indexed at a time
+            progress (callable, optional): Called with the running report
+                after each chunk
+
+        Returns:
+            dict: Records read, ingested, duplicates, near-duplicates and
+                invalid, elapsed seconds, throughput in docs/s and peak
+                memory in MB
+        """
+        report = {"read": 0, "ingested": 0, "duplicates": 0, "near_duplicates": 0, "invalid": 0}
+        start = time.perf_counter()
+        for chunk in iter_chunks(path, chunk_size):
+            counts = self.add_records(chunk)
+            report["read"] += len(chunk)
+            for key, value in counts.items():
+                report[key] += value
+            if progress:
+                progress(dict(report))
+
+        elapsed = time.perf_counter() - start
+        report["seconds"] = round(elapsed, 2)
+        report["docs_per_s"] = round(report["read"] / elapsed, 1) if elapsed else None
+        report["peak_memory_mb"] = round(_peak_memory_mb(), 1)
+        report["corpus_size"] = len(self.store)
+        return report
+
+    def search(self, query, top_k=5, section=None, act=None, filters=None):
+        """
+        Find ingested precedents similar to a query.
+
+        Args:
+            query (str): Case description
+            top_k (int): Number of results
+            section (str, optional): Only precedents citing this section...
+            act (str, optional): ...of this act
+            filters (dict, optional): Facet conditions, see facets.py
+
+        Returns:
+            list: Precedent dicts with a similarity score and the citations
+                of near-duplicate reports (``alias_citations``), best first
+        """
+        ids, scores = self.index.search(self.preprocess_text(query), top_k, self.filter_mask(section, act, filters))
+        return self.records(ids, scores)
+
+    def score_all(self, query, section=None, act=None, filters=None):
+        """
+        Score every ingested precedent matching the filters, for paging
+        through results (see search_cursors.py).
+
+        Returns:
+            tuple: (record ids, scores) of the precedents scoring above 0
+        """
+        return self.index.score_all(self.preprocess_text(query), self.filter_mask(section, act, filters))
+
+    def records(self, ids, scores):
+        """
+        Load scored precedents from the record store.
+
+        Returns:
+            list: Precedent dicts with ``similarity`` and ``alias_citations``
+        """
+        results = []
+        for record_id, record, score in zip(ids, self.store.get_many(ids), scores):
+            record["similarity"] = float(score)
+            record["alias_citations"] = self.aliases.get(int(record_id), [])
+            results.append(record)
+        return results
+
+    def __len__(self):
+        return len(self.store)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python corpus_ingest.py dump.(jsonl|csv|parquet) [store.jsonl]")
+        sys.exit(1)
+
+    corpus = IngestedCorpus(sys.argv[2] if len(sys.argv) > 2 else "ingested_precedents.jsonl")
+    result = corpus.ingest(sys.argv[1], progress=lambda r: print(f"  {r['read']} read, {r['ingested']} ingested"))
+    print(json.dumps(result, indent=2))
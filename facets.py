@@ -0,0 +1,174 @@
+"""
+Structured Facet Filters
+
+Bitmap indexes over precedent metadata (act, section, court, year and bench
+size) for filtering searches before scoring. Each facet value keeps the ids
+of its documents, and a packed bitmap (one bit per document) is built from
+them on first use and cached. Filters combine bitmaps with bitwise AND/OR, so
+a filter costs N/8 bytes of work per value regardless of how it was written,
+and callers score only the selected documents.
+
+Filters are dicts of facet name to a value, a list of values (OR), or a
+(low, high) range for the numeric facets year and bench_size. Facets in one
+dict are ANDed; a list of dicts under the ``any_of`` key is ORed:
+
+    facets.where({"act": "IPC", "section": ["302", "304"], "year": (1990, None)})
+    facets.where({"any_of": [{"court": "Supreme Court of India"}, {"bench_size": (5, None)}]})
+"""
+
+import re
+import numpy as np
+
+FACETS = ("act", "section", "court", "year", "bench_size")
+RANGE_FACETS = ("year", "bench_size")
+
+_YEAR_PATTERN = re.compile(r"\b(1[89]\d{2}|20\d{2})\b")
+_BENCH_SEPARATOR = re.compile(r"\s*(?:,|;|\band\b|&)\s*", re.IGNORECASE)
+
+
+def record_year(record):
+    """Get a record's year from its ``year`` field or, failing that, its citation."""
+    year = record.get("year")
+    match = _YEAR_PATTERN.search(str(year if year else record.get("citation", "")))
+    return int(match.group(1)) if match else None
+
+
+def bench_size(record):
+    """Get the number of judges on the bench, 0 if unknown."""
+    if record.get("bench_size"):
+        return int(record["bench_size"])
+    bench = str(record.get("bench") or "").strip()
+    return len([judge for judge in _BENCH_SEPARATOR.split(bench) if judge]) if bench else 0
+
+
+def facet_values(record):
+    """
+    Get the facet values of a precedent record.
+
+    Returns:
+        dict: Facet name to a list of values
+    """
+    sections = [s.strip() for s in str(record.get("section") or "").replace(";", ",").split(",") if s.strip()]
+    year = record_year(record)
+    return {
+        "act": [record["act"]] if record.get("act") else [],
+        "section": sections,
+        "court": [str(record["court"]).strip().lower()] if record.get("court") else [],
+        "year": [year] if year else [],
+        "bench_size": [bench_size(record)] if bench_size(record) else []
+    }
+
+
+class FacetIndex:
+    """
+    Per-value document id lists with cached packed bitmaps.
+    """
+
+    def __init__(self):
+        self.n_docs = 0
+        self.postings = {facet: {} for facet in FACETS}
+        self._bitmaps = {}
+
+    def add(self, records, first_id=None):
+        """
+        Index a batch of records.
+
+        Args:
+            records (list): Precedent dicts
+            first_id (int, optional): Id of the first record; defaults to
+                the number of records already indexed
+
+        Returns:
+            FacetIndex: self
+        """
+        first_id = self.n_docs if first_id is None else first_id
+        for record_id, record in enumerate(records, first_id):
+            for facet, values in facet_values(record).items():
+                for value in values:
+                    self.postings[facet].setdefault(value, []).append(record_id)
+        self.n_docs = max(self.n_docs, first_id + len(records))
+        self._bitmaps.clear()
+        return self
+
+    def empty(self):
+        return np.zeros((self.n_docs + 7) // 8, dtype=np.uint8)
+
+    def full(self):
+        return np.packbits(np.ones(self.n_docs, dtype=bool))
+
+    def bitmap(self, facet, value):
+        """Get the packed bitmap of documents with a facet value."""
+        if facet == "court":
+            value = str(value).strip().lower()
+        key = (facet, value)
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            mask = np.zeros(self.n_docs, dtype=bool)
+            mask[self.postings[facet].get(value, [])] = True
+            bitmap = self._bitmaps[key] = np.packbits(mask)
+        return bitmap
+
+    def select(self, facet, condition):
+        """
+        Get the bitmap for one facet condition.
+
+        Args:
+            facet (str): Facet name
+            condition: A value, a list of values (ORed), or for year and
+                bench_size a (low, high) range with None for an open end
+        """
+        if facet not in self.postings:
+            raise ValueError(f"Unknown facet: {facet}. Available: {', '.join(FACETS)}")
+
+        if facet in RANGE_FACETS and isinstance(condition, tuple):
+            low, high = condition
+            values = [v for v in self.postings[facet]
+                      if (low is None or v >= low) and (high is None or v <= high)]
+        elif isinstance(condition, (list, set, frozenset, tuple)):
+            values = list(condition)
+        else:
+            values = [condition]
+        if facet == "section":
+            values = [str(v) for v in values]
+
+        result = self.empty()
+        for value in values:
+            result |= self.bitmap(facet, value)
+        return result
+
+    def where(self, filters=None, any_of=None):
+        """
+        Combine facet conditions into one bitmap.
+
+        Args:
+            filters (dict, optional): Facet conditions, all of which must hold.
+                An ``any_of`` key is treated like the ``any_of`` argument.
+            any_of (list, optional): Filter dicts, at least one of which must
+                hold (each dict is itself ANDed)
+
+        Returns:
+            numpy.ndarray: Packed bitmap of the matching documents
+        """
+        filters = dict(filters or {})
+        any_of = list(any_of or []) + list(filters.pop("any_of", []))
+        result = self.full()
+        for facet, condition in filters.items():
+            result &= self.select(facet, condition)
+        if any_of:
+            alternatives = self.empty()
+            for alternative in any_of:
+                alternatives |= self.where(alternative)
+            result &= alternatives
+        return result
+
+    def mask(self, filters=None, any_of=None):
+        """Get the matching documents as a boolean array over all documents."""
+        return np.unpackbits(self.where(filters, any_of), count=self.n_docs).astype(bool)
+
+    def ids(self, filters=None, any_of=None):
+        """Get the ids of the matching documents, in ascending order."""
+        return np.flatnonzero(np.unpackbits(self.where(filters, any_of), count=self.n_docs))
+
+    def counts(self, facet):
+        """Get the number of documents per value of a facet."""
+        return {value: len(ids) for value, ids in self.postings[facet].items()}
@@ -0,0 +1,154 @@
+"""
+Fact-Pattern Matching
+
+Finds fact-pattern elements (use of a weapon, threats, premeditation, ...)
+in case descriptions. Trigger phrases, from legal_data.fact_pattern_triggers
+by default, are stemmed and compiled once into an Aho-Corasick automaton
+over stemmed tokens. All triggers are then found in one linear pass over
+the description, however many there are, and inflected forms ("weapons",
+"planned", "threatened") match their trigger.
+
+A matcher built with ``negation=True`` drops matches that are negated: a
+trigger is negated when a negation cue ("no", "not", "never", "without",
+"n't", ...) comes at most NEGATION_WINDOW words before it in the same clause,
+so "has not absconded" does not match "absconded" and "no previous
+conviction" does not match "previous conviction". Clauses end at
+punctuation and at conjunctions such as "and" and "but". An element is found
+when at least one of its triggers is matched without negation.
+"""
+
+import re
+from functools import lru_cache
+from collections import deque
+from nltk.stem import PorterStemmer
+from text_normalization import normalize_text, WORD_PATTERN, INDIC_CHARS
+
+# Words a negation cue may come before the trigger it negates
+NEGATION_WINDOW = 3
+
+NEGATION_CUES = frozenset(["no", "not", "never", "without", "nor", "neither", "none", "nothing", "cannot"])
+
+# Words that end the scope of a negation cue
+SCOPE_TERMINATORS = frozenset(["and", "but", "however", "although", "though", "yet", "whereas", "while", "except"])
+
+# Words, and the punctuation that ends a clause
+_CLAUSE_TOKEN_PATTERN = re.compile(rf"[\w{INDIC_CHARS}]+|[.,;:!?]")
+_CONTRACTION = re.compile(r"n['\u2019]t\b")
+
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=65536)
+def stem(token):
+    """Stem a lowercase token, cached since descriptions reuse a small vocabulary."""
+    return _stemmer.stem(token)
+
+
+def stem_tokens(text):
+    """Get the stemmed lowercase word tokens of a text, with Hindi folded onto English terms."""
+    return [stem(token) for token in WORD_PATTERN.findall(normalize_text(text).lower())]
+
+
+def clause_tokens(text):
+    """
+    Get the lowercase word tokens of a text with "n't" split off as "not",
+    and None at each clause-ending punctuation mark.
+    """
+    text = _CONTRACTION.sub(" not", normalize_text(text).lower())
+    return [None if token in ".,;:!?" else token for token in _CLAUSE_TOKEN_PATTERN.findall(text)]
+
+
+class FactPatternMatcher:
+    """
+    Aho-Corasick automaton over stemmed trigger phrases.
+    """
+
+    def __init__(self, triggers, negation=False):
+        """
+        Args:
+            triggers (dict): Element name to a list of trigger words or
+                phrases
+            negation (bool): Ignore triggers under a negation cue
+        """
+        self.elements = list(triggers)
+        self.negation = negation
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [set()]
+        # (element index, phrase length in tokens) of each state's matches
+        self.matches = [set()]
+
+        for index, element in enumerate(self.elements):
+            for phrase in triggers[element]:
+                state = 0
+                tokens = stem_tokens(phrase)
+                for token in tokens:
+                    next_state = self.goto[state].get(token)
+                    if next_state is None:
+                        next_state = len(self.goto)
+                        self.goto[state][token] = next_state
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.outputs.append(set())
+                        self.matches.append(set())
+                    state = next_state
+                if state:
+                    self.outputs[state].add(index)
+                    self.matches[state].add((index, len(tokens)))
+
+        # Breadth-first failure links; each state inherits its fallback's outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                self.outputs[child] |= self.outputs[self.fail[child]]
+                self.matches[child] |= self.matches[self.fail[child]]
+                queue.append(child)
+
+    def find(self, text):
+        """
+        Find the elements whose triggers occur in a text.
+
+        Returns:
+            list: Element names, in the order of the trigger table
+        """
+        if self.negation:
+            return self._find_affirmed(text)
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found = set()
+        state = 0
+        for token in stem_tokens(text):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return [self.elements[index] for index in sorted(found)]
+
+    def _find_affirmed(self, text):
+        """Find the elements with at least one trigger that is not negated."""
+        goto, fail, matches = self.goto, self.fail, self.matches
+        found = set()
+        state = 0
+        # Position of the last negation cue still in scope
+        cue = None
+        for position, token in enumerate(clause_tokens(text)):
+            if token is None or token in SCOPE_TERMINATORS:
+                state, cue = 0, None
+                continue
+            if token in NEGATION_CUES:
+                cue = position
+            token = stem(token)
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for index, length in matches[state]:
+                start = position - length + 1
+                # A cue inside the trigger (as in "no prior record") is part of it
+                if cue is None or not start - NEGATION_WINDOW - 1 <= cue < start:
+                    found.add(index)
+        return [self.elements[index] for index in sorted(found)]
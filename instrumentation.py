@@ -0,0 +1,477 @@
+"""
+Request Timing Instrumentation
+
+Lightweight tracing for the predictor, matcher, generator and notification
+code. ``traced`` wraps a function in a span, and ``stage`` times a named
+step (preprocess, vectorise, score, format) inside the current span. Both
+use nanosecond timers and feed an in-process histogram registry that can be
+exposed in the Prometheus text format.
+
+Tracing is off unless the NYAYA_TRACING environment variable is set (or
+``enable()`` is called). When off, a traced call costs one global flag check
+and ``stage`` returns a shared no-op context manager.
+
+Memory profiling is a separate mode, turned on by the NYAYA_MEMORY_PROFILE
+environment variable or ``enable_memory_profiling()``. It runs tracemalloc
+and records the peak bytes allocated during every span and stage, above
+what was allocated when it started. tracemalloc's peak is process-wide, so
+the figures are exact for one request at a time; concurrent requests add
+to each other's peaks. Profiling slows every allocation down and is meant
+for benchmarks and investigations, not for serving.
+"""
+
+import os
+import time
+import bisect
+import tracemalloc
+import functools
+import threading
+import contextvars
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_enabled = os.environ.get("NYAYA_TRACING", "").lower() in ("1", "true", "yes", "on")
+_profile_memory = os.environ.get("NYAYA_MEMORY_PROFILE", "").lower() in ("1", "true", "yes", "on")
+_active = _enabled or _profile_memory
+_started_tracemalloc = False
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+# Histogram bucket upper bounds for peak allocations, in bytes
+MEMORY_BUCKETS = (
+    2 ** 14, 2 ** 16, 2 ** 18, 2 ** 20, 2 ** 22, 2 ** 24,
+    2 ** 26, 2 ** 28, 2 ** 30
+)
+
+# Number of finished request traces kept for inspection
+TRACE_HISTORY = 100
+
+DEFAULT_METRICS_PORT = 9464
+
+
+def enable(flag=True):
+    """Turn tracing on or off for the whole process."""
+    global _enabled, _active
+    _enabled = bool(flag)
+    _active = _enabled or _profile_memory
+
+
+def is_enabled():
+    """Check whether tracing is currently on."""
+    return _enabled
+
+
+def enable_memory_profiling(flag=True):
+    """
+    Turn memory profiling on or off for the whole process.
+
+    Starts tracemalloc if it is not running yet, and stops it again when
+    profiling is turned off if it was started here.
+    """
+    global _profile_memory, _active, _started_tracemalloc
+    _profile_memory = bool(flag)
+    _active = _enabled or _profile_memory
+    if _profile_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    elif not _profile_memory and _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+
+def is_memory_profiling():
+    """Check whether memory profiling is currently on."""
+    return _profile_memory
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds, safe to share between threads."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Record one observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self):
+        """Get a consistent copy of the bucket counts, sum and count."""
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class HistogramRegistry:
+    """Collection of labelled histograms, keyed by metric name and label values."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+        """
+        Record an observation in the histogram for a metric and label set.
+
+        Args:
+            name (str): Metric name
+            value (float): Observed value
+            help_text (str): Description shown in the exposition output
+            buckets (tuple): Bucket bounds, used when the histogram is created
+            **labels: Label names and values
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+                if help_text:
+                    self._help.setdefault(name, help_text)
+        histogram.observe(value)
+
+    def summary(self):
+        """
+        Get count, total, mean and maximum for every histogram.
+
+        Returns:
+            dict: Mapping of (name, labels) to count, sum, mean and max
+        """
+        result = {}
+        for (name, labels), histogram in list(self._histograms.items()):
+            _, total, count = histogram.snapshot()
+            result[(name, labels)] = {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "max": histogram.max
+            }
+        return result
+
+    def reset(self):
+        """Drop every recorded histogram."""
+        with self._lock:
+            self._histograms.clear()
+
+    def render_prometheus(self):
+        """
+        Render every histogram in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text (format version 0.0.4)
+        """
+        lines = []
+        by_name = {}
+        for (name, labels), histogram in sorted(list(self._histograms.items())):
+            by_name.setdefault(name, []).append((labels, histogram))
+
+        for name, series in by_name.items():
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series:
+                counts, total, count = histogram.snapshot()
+                label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+                prefix = label_text + "," if label_text else ""
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+                suffix = "{" + label_text + "}" if label_text else ""
+                lines.append(f"{name}_sum{suffix} {total}")
+                lines.append(f"{name}_count{suffix} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Shared registry for the whole process
+registry = HistogramRegistry()
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_recent_traces = deque(maxlen=TRACE_HISTORY)
+
+
+def _start_peak(holders):
+    """
+    Start measuring a peak allocation: fold the peak so far into the spans
+    and stages already being measured, then reset tracemalloc's peak.
+
+    Returns:
+        int: Bytes allocated at the start
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    for holder in holders:
+        holder.peak_bytes = max(holder.peak_bytes, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+def _end_peak(holders):
+    """Get the absolute peak allocation so far, folding it into the enclosing spans and stages."""
+    peak = tracemalloc.get_traced_memory()[1]
+    for holder in holders:
+        holder.peak_bytes = max(holder.peak_bytes, peak)
+    return peak
+
+
+def _measured(span):
+    """Get the span and its open stages, if its memory is being measured."""
+    if span is None or span.start_bytes is None:
+        return []
+    return [span] + span.open_stages
+
+
+class Span:
+    """
+    Timed request span. Use through ``span`` or ``traced``.
+    """
+
+    __slots__ = ("name", "start_ns", "stages", "start_bytes", "peak_bytes", "stage_peaks", "open_stages",
+                 "_outer", "_token")
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.start_ns = 0
+        self.start_bytes = None
+        self.peak_bytes = 0
+        self.stage_peaks = {}
+        self.open_stages = []
+        self._outer = []
+        self._token = None
+
+    def __enter__(self):
+        if _profile_memory and tracemalloc.is_tracing():
+            self._outer = _measured(_current_span.get())
+            self.start_bytes = _start_peak(self._outer)
+            self.peak_bytes = self.start_bytes
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ns = time.perf_counter_ns() - self.start_ns
+        _current_span.reset(self._token)
+        registry.observe(
+            "nyaya_span_duration_seconds", elapsed_ns / 1e9,
+            help_text="Duration of traced calls", span=self.name,
+            outcome="error" if exc_type else "ok"
+        )
+        trace = {
+            "span": self.name,
+            "duration_ms": elapsed_ns / 1e6,
+            "stages_ms": {stage: ns / 1e6 for stage, ns in self.stages.items()},
+            "error": exc_type.__name__ if exc_type else None
+        }
+        if self.start_bytes is not None and tracemalloc.is_tracing():
+            peak_bytes = max(self.peak_bytes, _end_peak(self._outer)) - self.start_bytes
+            registry.observe(
+                "nyaya_span_peak_bytes", peak_bytes, buckets=MEMORY_BUCKETS,
+                help_text="Peak bytes allocated during traced calls", span=self.name
+            )
+            trace["peak_kb"] = peak_bytes / 1024
+            trace["stage_peaks_kb"] = {stage: size / 1024 for stage, size in self.stage_peaks.items()}
+        _recent_traces.append(trace)
+        return False
+
+
+class _Stage:
+    __slots__ = ("name", "span", "start_ns", "start_bytes", "peak_bytes", "_outer")
+
+    def __init__(self, name, span):
+        self.name = name
+        self.span = span
+        self.start_ns = 0
+        self.start_bytes = None
+        self.peak_bytes = 0
+        self._outer = []
+
+    def __enter__(self):
+        if _profile_memory and tracemalloc.is_tracing() and (self.span is None or self.span.start_bytes is not None):
+            self._outer = _measured(self.span)
+            self.start_bytes = _start_peak(self._outer)
+            self.peak_bytes = self.start_bytes
+            if self.span is not None:
+                self.span.open_stages.append(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ns = time.perf_counter_ns() - self.start_ns
+        span_name = self.span.name if self.span else ""
+        if self.span is not None:
+            self.span.stages[self.name] = self.span.stages.get(self.name, 0) + elapsed_ns
+        registry.observe(
+            "nyaya_stage_duration_seconds", elapsed_ns / 1e9,
+            help_text="Duration of stages within traced calls", span=span_name, stage=self.name
+        )
+        if self.start_bytes is not None and tracemalloc.is_tracing():
+            if self.span is not None:
+                self.span.open_stages.remove(self)
+            peak_bytes = max(self.peak_bytes, _end_peak(self._outer)) - self.start_bytes
+            if self.span is not None:
+                self.span.stage_peaks[self.name] = max(self.span.stage_peaks.get(self.name, 0), peak_bytes)
+            registry.observe(
+                "nyaya_stage_peak_bytes", peak_bytes, buckets=MEMORY_BUCKETS,
+                help_text="Peak bytes allocated during stages of traced calls", span=span_name, stage=self.name
+            )
+        return False
+
+
+class _NoopContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopContext()
+
+
+def span(name):
+    """
+    Context manager that times a request span.
+
+    Args:
+        name (str): Span name, used as the ``span`` metric label
+    """
+    if not _active:
+        return _NOOP
+    return Span(name)
+
+
+def stage(name):
+    """
+    Context manager that times a stage of the current span.
+
+    Args:
+        name (str): Stage name (e.g. "preprocess", "vectorise", "score", "format")
+    """
+    if not _active:
+        return _NOOP
+    return _Stage(name, _current_span.get())
+
+
+def traced(name=None):
+    """
+    Decorator that runs a function inside a span.
+
+    Args:
+        name (str, optional): Span name. Defaults to the function's qualified name.
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _active:
+                return func(*args, **kwargs)
+            with Span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
+
+
+def memory_profile():
+    """
+    Get the peak allocations recorded while memory profiling, per span and
+    per stage.
+
+    Returns:
+        dict: "span" or "span/stage" to the call count and the mean and
+            maximum peak in KiB
+    """
+    profile = {}
+    for (name, labels), values in registry.summary().items():
+        if name not in ("nyaya_span_peak_bytes", "nyaya_stage_peak_bytes"):
+            continue
+        labels = dict(labels)
+        key = labels["span"] if name == "nyaya_span_peak_bytes" else f"{labels['span']}/{labels['stage']}"
+        profile[key] = {
+            "count": values["count"],
+            "mean_kb": round(values["mean"] / 1024, 1),
+            "max_kb": round(values["max"] / 1024, 1)
+        }
+    return dict(sorted(profile.items()))
+
+
+def recent_traces(limit=20):
+    """
+    Get the most recent finished spans with their stage breakdown.
+
+    Args:
+        limit (int): Maximum number of traces to return
+
+    Returns:
+        list: Traces, newest first
+    """
+    return list(_recent_traces)[-limit:][::-1]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host="0.0.0.0"):
+    """
+    Serve the histogram registry at ``/metrics`` from a background thread.
+
+    Safe to call on every rerun; the server is only started once per process.
+
+    Args:
+        port (int, optional): Port to listen on. Defaults to the
+            NYAYA_METRICS_PORT environment variable or 9464.
+        host (str): Interface to bind
+
+    Returns:
+        int: The port the server is listening on
+    """
+    global _metrics_server
+    with _metrics_lock:
+        if _metrics_server is None:
+            port = int(port or os.environ.get("NYAYA_METRICS_PORT", DEFAULT_METRICS_PORT))
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            thread = threading.Thread(target=_metrics_server.serve_forever, name="nyaya-metrics", daemon=True)
+            thread.start()
+        return _metrics_server.server_address[1]
+
+
+if _profile_memory:
+    enable_memory_profiling()
@@ -179,6 +179,72 @@ defendant_rights = {
     ]
 }
 
+# Defense options common to all cases and specific to particular sections
+defense_options = {
+    "common": [
+        "Challenge the admissibility of evidence",
+        "Question witness credibility",
+        "Establish alibi",
+        "Claim lack of intent (mens rea)",
+        "Procedural violations in investigation"
+    ],
+    "IPC": {
+        "302": [  # Murder
+            "Self-defense",
+            "Accident or misfortune without criminal intention",
+            "Sudden and grave provocation",
+            "Mental disability or insanity",
+            "Challenge cause of death"
+        ],
+        "376": [  # Rape
+            "Consent defense",
+            "Challenge identification",
+            "Medical evidence inconsistencies",
+            "Alibi defense",
+            "Delay in filing FIR"
+        ],
+        "420": [  # Cheating
+            "No fraudulent or dishonest intention",
+            "Civil dispute, not criminal matter",
+            "Legitimate business transaction",
+            "No inducement to deliver property",
+            "Lack of deception"
+        ]
+    },
+    "IT Act": {
+        "66": [  # Computer-related offenses
+            "Authorized access",
+            "Legitimate security testing",
+            "No damage or harm caused",
+            "Challenge technical evidence",
+            "Challenge chain of custody for electronic evidence"
+        ],
+        "67": [  # Obscene material
+            "Content not obscene by legal standards",
+            "Freedom of expression defense",
+            "No intent to publish/transmit",
+            "Account was hacked",
+            "Educational or scientific purpose"
+        ]
+    },
+    "MV Act": {
+        "184": [  # Dangerous driving
+            "Challenge speed measurement accuracy",
+            "Road conditions defense",
+            "Medical emergency",
+            "Vehicle mechanical failure",
+            "Necessary evasive action"
+        ],
+        "185": [  # Drunk driving
+            "Challenge breathalyzer calibration",
+            "Improper testing procedure",
+            "Medical condition affecting test",
+            "Consumption after driving (hip flask defense)",
+            "Necessity in emergency"
+        ]
+    }
+}
+
 # Sample legal precedents from Indian Supreme Court
 legal_precedents = [
     {
@@ -342,6 +408,201 @@ jurisdiction_types = {
     }
 }
 
+# Trigger words and phrases for fact-pattern elements in case descriptions.
+# Matching is on stemmed tokens (see fact_patterns.py), so inflected forms
+# such as "weapons", "planned" and "threatened" match their trigger.
+fact_pattern_triggers = {
+    "threat or intimidation": [
+        "threat", "threaten", "intimidate", "intimidation", "fear", "menace", "coerce", "coercion",
+        "blackmail", "extort", "extortion", "criminal intimidation", "dire consequences"
+    ],
+    "use of dangerous weapon": [
+        "weapon", "gun", "pistol", "revolver", "rifle", "firearm", "knife", "knives", "dagger",
+        "sword", "axe", "sickle", "iron rod", "lathi", "acid", "explosive", "deadly weapon"
+    ],
+    "premeditation": [
+        "plan", "premeditate", "premeditation", "conspire", "conspiracy", "prior planning",
+        "lay in wait", "lying in wait", "meeting of minds", "common intention"
+    ],
+    "confession or admission": [
+        "confess", "confession", "admit", "admission", "extra judicial confession",
+        "disclosure statement"
+    ],
+    "extent of injury or damage": [
+        "injury", "injured", "harm", "damage", "wound", "wounded", "fracture", "grievous hurt",
+        "bodily injury", "medical report", "post mortem", "loss of property"
+    ]
+}
+
+# Sections typically considered non-bailable, by act
+non_bailable_sections = {
+    "IPC": ["302", "304", "304B", "307", "326", "376", "377", "392", "395", "396", "498A"],
+    "IT Act": ["66F", "67", "67A", "67B"],
+    "MV Act": ["185", "187", "189"]
+}
+
+# Factors weighed in bail assessment (see bail_assessment.py). "source" says
+# where a factor is observed: the offense's bail class ("bail_class") or title
+# ("offense"), the section's precedents ("precedent"), or the case description
+# ("description"). Triggers are matched on stemmed tokens like
+# fact_pattern_triggers.
+bail_factors = {
+    "bailable_offense": {
+        "label": "The offense is bailable, so bail is a matter of right",
+        "direction": "favor", "weight": 2.5, "source": "bail_class", "bail_class": "bailable"
+    },
+    "non_bailable_offense": {
+        "label": "The offense is non-bailable and bail is at the court's discretion",
+        "direction": "against", "weight": 1.0, "source": "bail_class", "bail_class": "non_bailable"
+    },
+    "grave_offense": {
+        "label": "The offense is grave and carries a severe punishment",
+        "direction": "against", "weight": 1.5, "source": "offense",
+        "triggers": ["murder", "rape", "dacoity", "robbery", "dowry death", "terrorism", "grievous hurt",
+                     "culpable homicide", "children"]
+    },
+    "supporting_precedent": {
+        "label": "Precedents on the section protect personal liberty against arrest and detention",
+        "direction": "favor", "weight": 0.5, "source": "precedent",
+        "triggers": ["bail", "arrest", "personal liberty", "detention"]
+    },
+    "first_offender": {
+        "label": "The accused has no criminal antecedents",
+        "direction": "favor", "weight": 1.0, "source": "description",
+        "triggers": ["first offender", "first time offender", "no prior record", "no criminal record",
+                     "no criminal antecedents", "clean record", "no previous conviction"]
+    },
+    "community_roots": {
+        "label": "The accused has deep roots in the community",
+        "direction": "favor", "weight": 0.5, "source": "description",
+        "triggers": ["permanent resident", "roots in the community", "owns property", "government employee",
+                     "permanently employed", "local resident"]
+    },
+    "medical_grounds": {
+        "label": "The accused needs medical care that custody cannot provide",
+        "direction": "favor", "weight": 1.0, "source": "description",
+        "triggers": ["medical", "illness", "hospitalised", "hospitalized", "disease", "infirm", "surgery",
+                     "cancer", "disability"]
+    },
+    "vulnerable_accused": {
+        "label": "The accused is a woman, juvenile or elderly person with special protection",
+        "direction": "favor", "weight": 0.75, "source": "description",
+        "triggers": ["woman accused", "pregnant", "juvenile", "minor accused", "elderly", "senior citizen"]
+    },
+    "caregiver": {
+        "label": "The accused is the primary caregiver for dependents",
+        "direction": "favor", "weight": 0.5, "source": "description",
+        "triggers": ["caregiver", "dependents", "sole breadwinner", "only earning member", "young children"]
+    },
+    "long_custody": {
+        "label": "The accused has spent long in pre-trial custody",
+        "direction": "favor", "weight": 1.0, "source": "description",
+        "triggers": ["undertrial", "in custody since", "in custody for", "months in jail", "years in jail",
+                     "436a", "delay in trial"]
+    },
+    "investigation_complete": {
+        "label": "The investigation is complete and the charge sheet filed",
+        "direction": "favor", "weight": 0.75, "source": "description",
+        "triggers": ["chargesheet filed", "charge sheet filed", "charge sheet has been filed",
+                     "investigation complete", "investigation is complete", "investigation concluded"]
+    },
+    "cooperation": {
+        "label": "The accused has cooperated with the investigation and appeared when required",
+        "direction": "favor", "weight": 0.5, "source": "description",
+        "triggers": ["cooperated", "co operated", "surrendered", "appeared before", "joined investigation"]
+    },
+    "weak_evidence": {
+        "label": "The case against the accused is prima facie weak",
+        "direction": "favor", "weight": 0.75, "source": "description",
+        "triggers": ["circumstantial", "no recovery", "falsely implicated", "false implication",
+                     "no eyewitness", "no direct evidence", "delay in fir"]
+    },
+    "flight_risk": {
+        "label": "The accused poses a flight risk",
+        "direction": "against", "weight": 1.5, "source": "description",
+        "triggers": ["absconded", "abscond", "fled", "flight risk", "foreign national", "no fixed address",
+                     "proclaimed offender"]
+    },
+    "prior_record": {
+        "label": "The accused has prior convictions or pending cases",
+        "direction": "against", "weight": 1.0, "source": "description",
+        "triggers": ["prior conviction", "previous conviction", "history sheeter", "repeat offender",
+                     "habitual offender", "pending cases", "previously convicted"]
+    },
+    "witness_tampering": {
+        "label": "There is a risk of the accused influencing witnesses or tampering with evidence",
+        "direction": "against", "weight": 1.25, "source": "description",
+        "triggers": ["threatened witness", "threatened the witness", "threatened witnesses", "tamper",
+                     "tampering", "influence witnesses", "intimidate witnesses", "destroyed evidence"]
+    },
+    "bail_violation": {
+        "label": "The accused has violated bail conditions before",
+        "direction": "against", "weight": 1.25, "source": "description",
+        "triggers": ["violated bail", "jumped bail", "bail cancelled", "breach of bail", "non appearance",
+                     "skipped hearings"]
+    },
+    "investigation_pending": {
+        "label": "Custody is needed for the ongoing investigation",
+        "direction": "against", "weight": 0.5, "source": "description",
+        "triggers": ["investigation is ongoing", "investigation pending", "recovery pending",
+                     "custodial interrogation", "accomplices absconding"]
+    },
+    "organised_crime": {
+        "label": "The offense involves an organised gang or syndicate",
+        "direction": "against", "weight": 1.0, "source": "description",
+        "triggers": ["gang", "organised crime", "organized crime", "syndicate", "mafia"]
+    },
+    "strong_evidence": {
+        "label": "There is prima facie strong evidence against the accused",
+        "direction": "against", "weight": 1.0, "source": "description",
+        "triggers": ["red handed", "cctv footage", "recovered from the accused", "recovered from his",
+                     "recovered from her", "dna report", "dying declaration"]
+    },
+    "use_of_weapon": {
+        "label": "A dangerous weapon was used",
+        "direction": "against", "weight": 0.5, "source": "description",
+        "triggers": ["weapon", "gun", "pistol", "firearm", "knife", "knives", "acid", "explosive"]
+    }
+}
+
+# Hindi legal terms in Devanagari and common romanised spellings, by the
+# English term they are indexed as (see text_normalization.py). Spellings are
+# matched after folding, so nukta and long-vowel variants need not be listed.
+hindi_legal_terms = {
+    "section": ["धारा", "dhara", "dhaara"],
+    "act": ["अधिनियम", "adhiniyam"],
+    "law": ["क़ानून", "kanoon", "kanun", "qanoon", "qanun"],
+    "court": ["अदालत", "न्यायालय", "adalat", "adaalat", "nyayalay", "nyayalaya"],
+    "bail": ["ज़मानत", "zamanat", "jamanat", "zamaanat", "jamaanat"],
+    "anticipatory": ["अग्रिम", "agrim"],
+    "arrest": ["गिरफ़्तारी", "गिरफ़्तार", "giraftari", "giraftar", "griftar"],
+    "murder": ["हत्या", "क़त्ल", "hatya", "qatl", "katl"],
+    "theft": ["चोरी", "chori", "choree"],
+    "robbery": ["डकैती", "लूट", "dakaiti", "dakaity"],
+    "cheating": ["धोखाधड़ी", "धोखा", "dhokhadhadi", "dhokha"],
+    "fraud": ["जालसाज़ी", "jalsazi", "jaalsaazi"],
+    "rape": ["बलात्कार", "balatkar", "balaatkaar"],
+    "dowry": ["दहेज", "dahej", "dahez"],
+    "cruelty": ["क्रूरता", "krurta", "kroorta"],
+    "kidnapping": ["अपहरण", "apharan"],
+    "accused": ["अभियुक्त", "आरोपी", "abhiyukt", "aropi", "aaropi"],
+    "complainant": ["शिकायतकर्ता", "shikayatkarta"],
+    "complaint": ["शिकायत", "shikayat"],
+    "charge": ["आरोप", "arop", "aarop"],
+    "witness": ["गवाह", "साक्षी", "gawah", "gavah", "sakshi"],
+    "evidence": ["सबूत", "साक्ष्य", "saboot", "sabut", "sakshya"],
+    "victim": ["पीड़ित", "peedit", "pidit"],
+    "injury": ["चोट", "chot"],
+    "weapon": ["हथियार", "hathiyar", "hathiyaar"],
+    "police": ["पुलिस"],
+    "station": ["थाना", "thana", "thaana"],
+    "custody": ["हिरासत", "hirasat", "hiraasat"],
+    "case": ["मुक़दमा", "mukadma", "mukadama", "muqadma"],
+    "judgment": ["फ़ैसला", "निर्णय", "faisla", "faisala", "nirnay"],
+    "punishment": ["सज़ा", "दंड", "saza", "saja", "dand"],
+    "imprisonment": ["कारावास", "क़ैद", "karavas", "kaid", "qaid"]
+}
+
 def get_offense_details(section, act="IPC"):
     """
     Get details about a specific offense based on section number and act.
@@ -369,31 +630,26 @@ def get_offense_details(section, act="IPC"):
             "act": act,
             "title": sections_dict[section_str],
             "rights": defendant_rights["general"],
+            "bail_class": get_bail_class(section_str, act),
             "bail_info": get_bail_information(section_str, act)
         }
     return None
 
+def get_bail_class(section, act="IPC"):
+    """
+    Get the bail class of a section: "non_bailable" or "bailable".
+    """
+    # In a real system, this would be based on a comprehensive database
+    if str(section) in non_bailable_sections.get(act, []):
+        return "non_bailable"
+    return "bailable"
+
 def get_bail_information(section, act="IPC"):
     """
     Get bail information for a specific section.
     This is a simplified implementation.
     """
-    # In a real system, this would be based on a comprehensive database
-    # This is simplified for demonstration purposes
-    
-    # Sections typically considered non-bailable in IPC
-    ipc_non_bailable = ["302", "304", "304B", "307", "326", "376", "377", "392", "395", "396", "498A"]
-    it_non_bailable = ["66F", "67", "67A", "67B"]
-    mv_non_bailable = ["185", "187", "189"]
-    
-    if act == "IPC" and section in ipc_non_bailable:
-        return bail_guidelines["non_bailable"]
-    elif act == "IT Act" and section in it_non_bailable:
-        return bail_guidelines["non_bailable"]
-    elif act == "MV Act" and section in mv_non_bailable:
-        return bail_guidelines["non_bailable"]
-    else:
-        return bail_guidelines["bailable"]
+    return bail_guidelines[get_bail_class(section, act)]
 
 def get_precedents_for_section(section, act="IPC"):
     """
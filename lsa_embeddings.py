@@ -0,0 +1,119 @@
+"""
+Latent Semantic Embeddings
+
+Dense LSA embeddings for the case matcher. A TruncatedSVD is fitted once on
+the matcher's TF-IDF matrix; every document is stored as an L2-normalised
+float32 row, optionally in a memory-mapped .npy file so the embeddings are
+paged in on demand and shared between processes. A query is embedded with a
+single projection onto the SVD components, and similarity against the whole
+corpus is one BLAS matrix-vector product.
+
+Compared with the sparse bigram matrix, the embeddings match documents that
+share related terms rather than identical ones, and take a fixed
+``n_components * 4`` bytes per document.
+"""
+
+import os
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+DEFAULT_COMPONENTS = 256
+
+
+class LSAEmbeddings:
+    """
+    Document embeddings from a truncated SVD of a TF-IDF matrix.
+    """
+
+    def __init__(self, n_components=DEFAULT_COMPONENTS, random_state=42):
+        """
+        Args:
+            n_components (int): Embedding dimensions
+            random_state (int): Seed for the randomized SVD
+        """
+        self.n_components = n_components
+        self.random_state = random_state
+        self.svd = None
+        self.components = None
+        self.embeddings = None
+        self.path = None
+
+    def fit(self, matrix, path=None):
+        """
+        Fit the projection and embed every document.
+
+        Args:
+            matrix (scipy.sparse matrix): TF-IDF rows, one per document
+            path (str, optional): .npy file for the embeddings. When given,
+                the embeddings are written there and reopened read-only as a
+                memory map.
+
+        Returns:
+            LSAEmbeddings: self
+        """
+        n_components = max(1, min(self.n_components, matrix.shape[1] - 1, matrix.shape[0] - 1))
+        self.svd = TruncatedSVD(n_components=n_components, random_state=self.random_state)
+        embeddings = self.svd.fit_transform(matrix).astype(np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
+
+        # Projection matrix laid out for query_vector @ components
+        self.components = np.ascontiguousarray(self.svd.components_.T, dtype=np.float32)
+
+        if path:
+            self.embeddings = self._write_memmap(path, embeddings)
+            self.path = path
+        else:
+            self.embeddings = np.ascontiguousarray(embeddings)
+        return self
+
+    def restore(self, svd, embeddings):
+        """
+        Set up fitted embeddings from a stored SVD and embedding matrix.
+
+        Returns:
+            LSAEmbeddings: self
+        """
+        self.svd = svd
+        self.components = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+        self.embeddings = embeddings
+        return self
+
+    @staticmethod
+    def _write_memmap(path, embeddings):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, embeddings)
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r")
+
+    def embed(self, query_vector):
+        """
+        Embed TF-IDF query rows.
+
+        Args:
+            query_vector (scipy.sparse matrix): 1 x n_features query, from the
+                same vectorizer as the fitted matrix
+
+        Returns:
+            numpy.ndarray: L2-normalised float32 embedding
+        """
+        embedded = np.asarray(query_vector @ self.components, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedded)
+        return embedded / norm if norm else embedded
+
+    def similarities(self, query_vector, ids=None):
+        """
+        Cosine similarity between a query and every document, or only the
+        documents in ``ids``.
+
+        Returns:
+            numpy.ndarray: One float32 score per (selected) document
+        """
+        embeddings = self.embeddings if ids is None else self.embeddings[ids]
+        return embeddings @ self.embed(query_vector)
+
+    def nbytes(self):
+        """Size of the stored document embeddings in bytes."""
+        return self.embeddings.nbytes if self.embeddings is not None else 0
@@ -2,13 +2,19 @@ import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.ensemble import RandomForestClassifier
-import pickle
 import re
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
 import os
+from instrumentation import traced, stage
+from relevance_models import load_or_train
+from ann_index import IVFIndex, ANN_MIN_DOCUMENTS, DEFAULT_NPROBE
+from bm25 import BM25FIndex, PRECEDENT_FIELD_WEIGHTS
+from facets import FacetIndex
+from search_cursors import CursorStore, DEFAULT_PAGE_SIZE
+from artifact_cache import artifact_cache, source_digest
+from text_normalization import normalize_text, normalize_batch, NON_WORD_PATTERN, TOKEN_PATTERN
 
 # Ensure NLTK data is downloaded
 try:
@@ -28,13 +34,24 @@ class LegalPredictor:
         """
         Initialize the legal predictor with necessary models and data.
         """
-        self.tfidf_vectorizer = TfidfVectorizer(max_features=5000)
+        self.tfidf_vectorizer = TfidfVectorizer(max_features=5000, token_pattern=TOKEN_PATTERN)
+        self.relevance_models = None
         self.rights_classifier = None
         self.defense_classifier = None
+        self.relevance_models_loaded = False
         self.precedent_data = None
+        self.precedent_matrix = None
+        self.precedent_ann = None
+        self.precedent_bm25 = None
+        self.precedent_facets = None
+        self.cursors = CursorStore()
+        self.corpus = None
         self.legal_code_data = None
         self.sample_data_loaded = False
         
+        # Cache for the fitted precedent vectorizer, matrix and ANN index; None to always fit
+        self.artifacts = artifact_cache
+        
         # Load sample data for demonstration
         self.load_sample_data()
     
@@ -55,18 +72,139 @@ class LegalPredictor:
         }
         
         self.precedent_data = legal_precedents
+        self.precedent_matrix = None
+        self.precedent_ann = None
+        self.precedent_bm25 = None
+        self.precedent_facets = None
+        self.cursors = CursorStore()
         
         self.sample_data_loaded = True
+        
+        # Relevance models are loaded on the first prediction, not at import
+        self.relevance_models_loaded = False
+    
+    def load_relevance_models(self, train_if_missing=True):
+        """
+        Load the trained rights and defense relevance models.
+        
+        The models are read from the artifact cache under a key made from
+        their training records and code. On a miss they are trained from
+        records bootstrapped out of the rule-based scores and stored for
+        later runs. When neither works, predictions fall back to the
+        rule-based scores.
+        """
+        models = None
+        try:
+            models = load_or_train(self, cache=self.artifacts, train_if_missing=train_if_missing)
+        except Exception as e:
+            print(f"Relevance models unavailable, using rule-based scores: {str(e)}")
+        
+        self.relevance_models_loaded = True
+        self.relevance_models = models
+        self.rights_classifier = models.rights if models else None
+        self.defense_classifier = models.defenses if models else None
+    
+    def build_precedent_index(self, build_ann=None):
+        """
+        Fit the TF-IDF vectorizer on all precedent summaries once, so that
+        searches only need to vectorize the query.
+        
+        Args:
+            build_ann (bool, optional): Also build the approximate
+                nearest-neighbour index. Defaults to True once there are
+                ANN_MIN_DOCUMENTS precedents or more.
+        
+        Returns:
+            scipy.sparse.csr_matrix: Precedent vectors, one row per precedent
+        """
+        if build_ann is None:
+            build_ann = len(self.precedent_data) >= ANN_MIN_DOCUMENTS
+        if self.precedent_matrix is not None and (self.precedent_ann is not None or not build_ann):
+            return self.precedent_matrix
+        
+        # Normalised only when the index is loaded or built, not on every query
+        corpus = normalize_batch([p["summary"] for p in self.precedent_data])
+        
+        def build():
+            if self.precedent_matrix is None:
+                vectorizer, matrix = self.tfidf_vectorizer, self.tfidf_vectorizer.fit_transform(corpus)
+            else:
+                vectorizer, matrix = self.tfidf_vectorizer, self.precedent_matrix
+            parts = {"vectorizer": vectorizer, "matrix": matrix}
+            if build_ann:
+                ann = IVFIndex().fit(matrix)
+                parts.update({"ann_svd": ann.svd, "ann_embeddings": ann.embeddings})
+                parts.update({f"ann_{name}": value for name, value in ann.parts().items()})
+            return parts
+        
+        # Load the fitted parts for these precedents from the artifact cache, or fit them
+        if self.artifacts is not None:
+            config = {
+                "vectorizer": self.tfidf_vectorizer.get_params(),
+                "build_ann": build_ann,
+                "code": source_digest("model.py", "ann_index.py")
+            }
+            parts = self.artifacts.get_or_build("precedent_index", corpus, build, config)
+        else:
+            parts = build()
+        
+        self.tfidf_vectorizer = parts["vectorizer"]
+        self.precedent_matrix = parts["matrix"]
+        if "ann_centroids" in parts:
+            self.precedent_ann = IVFIndex().restore(
+                self.precedent_matrix, parts["ann_embeddings"], parts["ann_svd"],
+                parts["ann_centroids"], parts["ann_list_offsets"], parts["ann_list_members"]
+            )
+        return self.precedent_matrix
+    
+    def attach_corpus(self, corpus):
+        """
+        Search an ingested precedent corpus instead of the built-in precedents.
+        
+        Args:
+            corpus (corpus_ingest.IngestedCorpus): Corpus to search, or None
+                to go back to the built-in precedents
+        """
+        self.corpus = corpus
+    
+    def build_bm25_index(self):
+        """
+        Build the BM25F inverted index over precedent case names, summaries
+        and key points.
+        
+        Returns:
+            BM25FIndex: The precedent index
+        """
+        if self.precedent_bm25 is None:
+            self.precedent_bm25 = BM25FIndex(
+                PRECEDENT_FIELD_WEIGHTS, tokenizer=lambda text: self.preprocess_text(text).split()
+            ).build(self.precedent_data)
+        return self.precedent_bm25
+    
+    def build_facet_index(self):
+        """
+        Build the act, section, court, year and bench size bitmaps for the
+        precedents.
+        
+        Returns:
+            FacetIndex: The precedent facet index
+        """
+        if self.precedent_facets is None:
+            self.precedent_facets = FacetIndex().add(self.precedent_data)
+        return self.precedent_facets
     
     def preprocess_text(self, text):
         """
         Preprocess text for NLP tasks.
         """
+        # Fold Hindi and romanised Hindi onto English terms
+        text = normalize_text(text)
+        
         # Convert to lowercase
         text = text.lower()
         
         # Remove special characters and numbers
-        text = re.sub(r'[^\w\s]', '', text)
+        text = NON_WORD_PATTERN.sub('', text)
         text = re.sub(r'\d+', '', text)
         
         # Tokenize
@@ -79,6 +217,71 @@ class LegalPredictor:
         # Join tokens back into string
         return ' '.join(filtered_tokens)
     
+    def rule_based_rights(self, section, act):
+        """
+        Score defendant rights with the original keyword rules.
+        
+        Returns:
+            dict: Relevance per right, or an empty dict if the section is unknown
+        """
+        from legal_data import defendant_rights, get_offense_details
+        
+        offense_details = get_offense_details(section, act)
+        if not offense_details:
+            return {}
+        
+        bail_type = offense_details["bail_class"]
+        
+        all_rights = defendant_rights["general"] + defendant_rights["bail"] + defendant_rights["trial"]
+        
+        relevance_scores = {}
+        for right in all_rights:
+            if "bail" in right.lower() and bail_type == "non_bailable":
+                relevance_scores[right] = 0.9
+            elif "bail" in right.lower() and bail_type == "bailable":
+                relevance_scores[right] = 0.7
+            elif "appeal" in right.lower():
+                relevance_scores[right] = 0.8
+            elif "legal representation" in right.lower():
+                relevance_scores[right] = 1.0
+            else:
+                relevance_scores[right] = 0.6
+        return relevance_scores
+    
+    def _defense_candidates(self, section, act):
+        """Get the common and section-specific defense options for a case."""
+        from legal_data import defense_options
+        
+        common_options = defense_options["common"]
+        specific_options = defense_options.get(act, {}).get(section, [])
+        return common_options, specific_options
+    
+    def rule_based_defenses(self, section, act, case_description):
+        """
+        Score defense options with the original keyword rules.
+        
+        Returns:
+            dict: Relevance per candidate defense option
+        """
+        common_options, specific_options = self._defense_candidates(section, act)
+        description_terms = set(self.preprocess_text(case_description).split())
+        
+        relevance_scores = {}
+        for option in common_options + specific_options:
+            # Specific options are more relevant
+            relevance = 0.9 if option in specific_options else 0.7
+            
+            # Boost score if terms from the option appear in the case description
+            option_terms = set(self.preprocess_text(option).split())
+            common_terms = option_terms.intersection(description_terms)
+            if common_terms:
+                relevance += min(0.3, len(common_terms) * 0.1)  # Max boost of 0.3
+            
+            # Cap at 1.0
+            relevance_scores[option] = min(1.0, relevance)
+        return relevance_scores
+    
+    @traced("LegalPredictor.predict_rights")
     def predict_rights(self, section, act, case_description):
         """
         Predict the rights applicable to a defendant based on the section, act, and case description.
@@ -86,60 +289,35 @@ class LegalPredictor:
         if not self.sample_data_loaded:
             return {"error": "Model data not loaded"}
         
-        # In a real system, this would use the trained classifier
-        # For demonstration, use rule-based approach with sample data
-        
         from legal_data import defendant_rights, get_offense_details
         
-        # Get basic rights for all cases
-        basic_rights = defendant_rights["general"]
-        
         # Get offense details
         offense_details = get_offense_details(section, act)
         
         if offense_details:
-            # Add bail information
-            bail_info = offense_details.get("bail_info", {})
-            bail_type = "non_bailable" if "non_bailable" in str(bail_info) else "bailable"
-            
-            # Get additional rights based on bail type
-            bail_rights = defendant_rights["bail"]
-            
-            # Get trial rights
-            trial_rights = defendant_rights["trial"]
-            
-            # Combine all rights
-            all_rights = basic_rights + bail_rights + trial_rights
-            
-            # Calculate relevance score (simple heuristic for demo)
-            relevance_scores = {}
-            for right in all_rights:
-                # Simple relevance calculation
-                # In a real system, this would use ML model predictions
-                if "bail" in right.lower() and bail_type == "non_bailable":
-                    relevance_scores[right] = 0.9
-                elif "bail" in right.lower() and bail_type == "bailable":
-                    relevance_scores[right] = 0.7
-                elif "appeal" in right.lower():
-                    relevance_scores[right] = 0.8
-                elif "legal representation" in right.lower():
-                    relevance_scores[right] = 1.0
-                else:
-                    relevance_scores[right] = 0.6
+            if not self.relevance_models_loaded:
+                self.load_relevance_models()
+            if self.rights_classifier is not None:
+                with stage("score"):
+                    indices, values = self.relevance_models.featurize(section, act, case_description)
+                    relevance_scores = self.rights_classifier.score_labels(indices, values)
+            else:
+                relevance_scores = self.rule_based_rights(section, act)
             
             # Sort by relevance
             sorted_rights = sorted(relevance_scores.items(), key=lambda x: x[1], reverse=True)
             
             return {
-                "rights": [{"right": r[0], "relevance": r[1]} for r in sorted_rights],
+                "rights": [{"right": r[0], "relevance": round(r[1], 2)} for r in sorted_rights],
                 "section_info": offense_details
             }
         
         return {
-            "rights": [{"right": r, "relevance": 0.5} for r in basic_rights],
+            "rights": [{"right": r, "relevance": 0.5} for r in defendant_rights["general"]],
             "section_info": None
         }
     
+    @traced("LegalPredictor.suggest_defense_options")
     def suggest_defense_options(self, section, act, case_description):
         """
         Suggest defense options based on the section, act, and case description.
@@ -147,158 +325,197 @@ class LegalPredictor:
         if not self.sample_data_loaded:
             return {"error": "Model data not loaded"}
         
-        # For demonstration, use rule-based approach
-        
-        # Common defense options across various cases
-        common_options = [
-            "Challenge the admissibility of evidence",
-            "Question witness credibility",
-            "Establish alibi",
-            "Claim lack of intent (mens rea)",
-            "Procedural violations in investigation"
-        ]
-        
-        # Specific defenses based on acts and sections
-        specific_options = []
-        
-        if act == "IPC":
-            if section == "302":  # Murder
-                specific_options = [
-                    "Self-defense",
-                    "Accident or misfortune without criminal intention",
-                    "Sudden and grave provocation",
-                    "Mental disability or insanity",
-                    "Challenge cause of death"
-                ]
-            elif section == "376":  # Rape
-                specific_options = [
-                    "Consent defense",
-                    "Challenge identification",
-                    "Medical evidence inconsistencies",
-                    "Alibi defense",
-                    "Delay in filing FIR"
-                ]
-            elif section == "420":  # Cheating
-                specific_options = [
-                    "No fraudulent or dishonest intention",
-                    "Civil dispute, not criminal matter",
-                    "Legitimate business transaction",
-                    "No inducement to deliver property",
-                    "Lack of deception"
-                ]
-        elif act == "IT Act":
-            if section == "66":  # Computer-related offenses
-                specific_options = [
-                    "Authorized access",
-                    "Legitimate security testing",
-                    "No damage or harm caused",
-                    "Challenge technical evidence",
-                    "Challenge chain of custody for electronic evidence"
-                ]
-            elif section == "67":  # Obscene material
-                specific_options = [
-                    "Content not obscene by legal standards",
-                    "Freedom of expression defense",
-                    "No intent to publish/transmit",
-                    "Account was hacked",
-                    "Educational or scientific purpose"
-                ]
-        elif act == "MV Act":
-            if section == "184":  # Dangerous driving
-                specific_options = [
-                    "Challenge speed measurement accuracy",
-                    "Road conditions defense",
-                    "Medical emergency",
-                    "Vehicle mechanical failure",
-                    "Necessary evasive action"
-                ]
-            elif section == "185":  # Drunk driving
-                specific_options = [
-                    "Challenge breathalyzer calibration",
-                    "Improper testing procedure",
-                    "Medical condition affecting test",
-                    "Consumption after driving (hip flask defense)",
-                    "Necessity in emergency"
-                ]
-        
-        # Combine options and calculate relevance scores
-        all_options = common_options + specific_options
-        
-        # Calculate relevance (simplified for demo)
-        relevance_scores = {}
-        for option in all_options:
-            # Specific options are more relevant
-            if option in specific_options:
-                relevance_scores[option] = 0.9
-            else:
-                relevance_scores[option] = 0.7
-                
-            # Boost score if terms from the option appear in the case description
-            option_terms = set(self.preprocess_text(option).split())
-            description_terms = set(self.preprocess_text(case_description).split())
-            common_terms = option_terms.intersection(description_terms)
-            
-            if common_terms:
-                boost = min(0.3, len(common_terms) * 0.1)  # Max boost of 0.3
-                relevance_scores[option] += boost
-                
-            # Cap at 1.0
-            relevance_scores[option] = min(1.0, relevance_scores[option])
+        if not self.relevance_models_loaded:
+            self.load_relevance_models()
+        if self.defense_classifier is not None:
+            with stage("score"):
+                common_options, specific_options = self._defense_candidates(section, act)
+                indices, values = self.relevance_models.featurize(section, act, case_description)
+                scores = self.defense_classifier.score_labels(indices, values)
+                relevance_scores = {o: scores.get(o, 0.0) for o in common_options + specific_options}
+        else:
+            relevance_scores = self.rule_based_defenses(section, act, case_description)
         
         # Sort by relevance
         sorted_options = sorted(relevance_scores.items(), key=lambda x: x[1], reverse=True)
         
         return {
-            "defense_options": [{"option": o[0], "relevance": o[1]} for o in sorted_options]
+            "defense_options": [{"option": o[0], "relevance": round(o[1], 2)} for o in sorted_options]
         }
     
-    def find_similar_precedents(self, case_description, section=None, act=None, top_k=5):
+    @traced("LegalPredictor.find_similar_precedents")
+    def find_similar_precedents(self, case_description, section=None, act=None, top_k=5,
+                                exact=False, nprobe=DEFAULT_NPROBE, ranker="tfidf", filters=None):
         """
         Find similar legal precedents based on case description and optionally section and act.
+        
+        ``filters`` takes facet conditions (act, section, court, year range,
+        bench size; see facets.py), which are ANDed with the section and act.
+        Only the matching precedents are scored.
+        
+        The default "tfidf" ranker scores summaries by cosine similarity.
+        Unfiltered searches use the approximate nearest-neighbour index when
+        one has been built, unless ``exact`` is set; ``nprobe`` trades recall
+        for latency. The "bm25" ranker scores case name, summary and key
+        points with BM25F, and its similarity values are BM25F scores.
+        
+        With an ingested corpus attached (see attach_corpus), the corpus
+        index is searched instead and the ranker options do not apply.
         """
         if not self.sample_data_loaded or not self.precedent_data:
             return {"error": "Precedent data not loaded"}
         
-        # Filter precedents by section and act if provided
-        filtered_precedents = self.precedent_data
-        if section and act:
-            filtered_precedents = [p for p in self.precedent_data 
-                                 if p["act"] == act and section in p["section"]]
+        if self.corpus is not None:
+            with stage("score"):
+                results = self.corpus.search(case_description, top_k, section, act, filters)
+            return {"precedents": self._format_corpus_precedents(results)}
         
-        if not filtered_precedents:
+        filters = self._precedent_filters(section, act, filters)
+        indices = self.build_facet_index().ids(filters) if filters else None
+        if indices is not None and len(indices) == 0:
             return {"precedents": []}
         
-        # Create document corpus from precedent summaries
-        corpus = [p["summary"] for p in filtered_precedents]
-        corpus.append(case_description)  # Add the query case at the end
-        
-        # Vectorize
         try:
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
+            top_ids, top_scores = self._rank_precedents(
+                case_description, indices, filters, top_k, exact, nprobe, ranker
+            )
             
-            # Calculate similarity between query case and all precedents
-            query_idx = len(corpus) - 1
-            similarities = cosine_similarity(tfidf_matrix[query_idx], tfidf_matrix[:-1])[0]
-            
-            # Get top-k most similar precedents
-            top_indices = similarities.argsort()[-top_k:][::-1]
-            
-            similar_precedents = []
-            for idx in top_indices:
-                precedent = filtered_precedents[idx]
-                similar_precedents.append({
-                    "case_name": precedent["case_name"],
-                    "citation": precedent["citation"],
-                    "similarity": float(similarities[idx]),
-                    "summary": precedent["summary"],
-                    "key_points": precedent["key_points"]
-                })
+            with stage("format"):
+                similar_precedents = self._format_precedents(top_ids, top_scores)
             
             return {"precedents": similar_precedents}
         except Exception as e:
             # Fallback if vectorization fails
-            return {"precedents": filtered_precedents[:min(top_k, len(filtered_precedents))], 
+            fallback_ids = range(len(self.precedent_data)) if indices is None else indices
+            filtered_precedents = [self.precedent_data[i] for i in fallback_ids[:top_k]]
+            return {"precedents": filtered_precedents, 
                     "note": "Similarity calculation failed, showing relevant precedents without ranking"}
+    
+    @traced("LegalPredictor.search_precedents")
+    def search_precedents(self, case_description=None, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+                          section=None, act=None, ranker="tfidf", filters=None):
+        """
+        Page through the precedents matching a case description.
+        
+        The first call (with a description) scores every candidate exactly
+        once and keeps the matches as a snapshot; later calls pass the
+        returned cursor to get the next page without searching again.
+        
+        Args:
+            case_description (str, optional): The query, for the first page
+            cursor (str, optional): Cursor returned with the previous page
+            page_size (int): Number of precedents per page
+            section, act, ranker, filters: As for find_similar_precedents
+                (first page only)
+            
+        Returns:
+            dict: "precedents" (the page, formatted like
+                find_similar_precedents), "cursor" (for the next page, None
+                when there are no more matches) and "total"
+        """
+        if not self.sample_data_loaded or not self.precedent_data:
+            return {"error": "Precedent data not loaded"}
+        
+        if cursor is None:
+            if self.corpus is not None:
+                with stage("score"):
+                    ids, scores = self.corpus.score_all(case_description, section, act, filters)
+            else:
+                filters = self._precedent_filters(section, act, filters)
+                indices = self.build_facet_index().ids(filters) if filters else None
+                if indices is not None and len(indices) == 0:
+                    return {"precedents": [], "cursor": None, "total": 0}
+                ids, scores = self._rank_precedents(case_description, indices, filters, None, True,
+                                                    DEFAULT_NPROBE, ranker)
+            cursor, _ = self.cursors.open(ids, scores, self.corpus)
+        
+        with stage("score"):
+            page = self.cursors.page(cursor, page_size)
+        if page is None:
+            return {"error": "Search cursor expired"}
+        ids, scores, snapshot, next_cursor = page
+        
+        with stage("format"):
+            if snapshot.context is not None:
+                precedents = self._format_corpus_precedents(snapshot.context.records(ids, scores))
+            else:
+                precedents = self._format_precedents(ids, scores)
+        return {
+            "precedents": precedents,
+            "cursor": next_cursor,
+            "total": len(snapshot)
+        }
+    
+    @staticmethod
+    def _precedent_filters(section, act, filters):
+        # Section and act filter together, ANDed with the facet filters
+        filters = dict(filters or {})
+        if section and act:
+            filters.setdefault("act", act)
+            filters.setdefault("section", section)
+        return filters
+    
+    def _rank_precedents(self, case_description, indices, filters, top_k, exact, nprobe, ranker):
+        """
+        Score the precedents, or only those in ``indices``.
+        
+        With ``top_k`` set, returns the best top_k precedents, best first;
+        with top_k None, returns every scored precedent in no particular
+        order.
+        
+        Returns:
+            tuple: (precedent ids, scores)
+        """
+        if ranker == "bm25":
+            with stage("score"):
+                bm25 = self.build_bm25_index()
+                doc_mask = self.build_facet_index().mask(filters) if indices is not None else None
+                if top_k is None:
+                    return bm25.score_all(case_description, doc_mask)
+                return bm25.search(case_description, top_k, doc_mask)
+        
+        # Vectorize the query against the fitted precedent index
+        with stage("vectorise"):
+            precedent_matrix = self.build_precedent_index()
+            query_vector = self.tfidf_vectorizer.transform([normalize_text(case_description)])
+        
+        # Calculate similarity between query case and the filtered precedents
+        with stage("score"):
+            if self.precedent_ann is not None and not exact and indices is None and top_k is not None:
+                return self.precedent_ann.search(query_vector, top_k, nprobe=nprobe)
+            
+            # Only the filtered rows are scored
+            candidates = precedent_matrix if indices is None else precedent_matrix[indices]
+            similarities = cosine_similarity(query_vector, candidates)[0]
+            
+            if top_k is None:
+                top_indices = np.arange(len(similarities))
+            else:
+                # Get top-k most similar precedents
+                top_indices = similarities.argsort()[-top_k:][::-1]
+            top_ids = top_indices if indices is None else indices[top_indices]
+            return top_ids, similarities[top_indices]
+    
+    def _format_precedents(self, top_ids, top_scores):
+        similar_precedents = []
+        for idx, score in zip(top_ids, top_scores):
+            precedent = self.precedent_data[idx]
+            similar_precedents.append({
+                "case_name": precedent["case_name"],
+                "citation": precedent["citation"],
+                "similarity": float(score),
+                "summary": precedent["summary"],
+                "key_points": precedent["key_points"]
+            })
+        return similar_precedents
+    
+    @staticmethod
+    def _format_corpus_precedents(results):
+        return [
+            {key: precedent[key] for key in ("case_name", "citation", "alias_citations", "similarity",
+                                             "summary", "key_points")}
+            for precedent in results
+        ]
 
 # Initialize the legal predictor
 legal_predictor = LegalPredictor()
@@ -0,0 +1,219 @@
+"""
+Near-Duplicate Judgment Detection
+
+The same judgment is often reported several times (SCC, AIR, SCR) with small
+textual differences. This module finds such near-duplicates with MinHash
+signatures over word shingles and locality-sensitive hashing (LSH) over
+signature bands.
+
+Signatures are computed with a vectorised multiply-shift hash family. Only
+the low 16 bits of each MinHash value are kept for verification (b-bit
+MinHash), so a stored signature costs NUM_PERM * 2 bytes. LSH buckets are kept
+as sorted NumPy arrays of 64-bit band keys in segments, like the corpus
+index, rather than as Python dicts. Every LSH candidate is verified against
+its estimated Jaccard similarity before it is treated as a duplicate.
+"""
+
+import zlib
+import numpy as np
+from text_normalization import WORD_PATTERN
+
+NUM_PERM = 64
+BANDS = 8
+SHINGLE_SIZE = 3
+
+# Estimated Jaccard similarity from which two documents are duplicates
+THRESHOLD = 0.75
+
+MAX_SEGMENTS = 16
+
+_TOKEN_PATTERN = WORD_PATTERN
+_MASK_32 = np.uint64(0xFFFFFFFF)
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """
+    Hash the word shingles of a text.
+
+    Returns:
+        numpy.ndarray: Unique 32-bit shingle hashes as uint64
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < size:
+        shingles = [" ".join(tokens)] if tokens else []
+    else:
+        shingles = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return np.unique(np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    ))
+
+
+class MinHasher:
+    """
+    MinHash signatures with a multiply-shift hash family.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        # Odd multipliers make each multiply-shift hash a permutation of the 64-bit space
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, text):
+        """
+        Get the MinHash signature of a text.
+
+        Returns:
+            numpy.ndarray: num_perm uint32 MinHash values (all 0xFFFFFFFF
+                for empty text)
+        """
+        hashes = shingle_hashes(text)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        with np.errstate(over="ignore"):
+            permuted = (self.a[:, None] * hashes[None, :] + self.b[:, None]) >> np.uint64(32)
+        return (permuted & _MASK_32).min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts):
+        """Get the signatures of several texts as a (len(texts), num_perm) array."""
+        if not texts:
+            return np.zeros((0, self.num_perm), dtype=np.uint32)
+        return np.vstack([self.signature(text) for text in texts])
+
+
+def estimate_jaccard(signature_a, signature_b):
+    """Estimate Jaccard similarity from two signatures (full or 16-bit)."""
+    return float(np.mean(signature_a == signature_b))
+
+
+class NearDuplicateIndex:
+    """
+    Incremental LSH index of canonical documents.
+
+    Documents are added in chunks. Each one is either a new canonical
+    document, which gets the next canonical id, or a near-duplicate of an
+    existing canonical document.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed + 1)
+        self._band_multipliers = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salts = rng.integers(0, 2 ** 63, size=bands, dtype=np.uint64)
+        self.segments = []
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint16)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def band_keys(self, signatures):
+        """Hash each band of each signature to a 64-bit key, shape (n, bands)."""
+        banded = signatures.astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        with np.errstate(over="ignore"):
+            return (banded * self._band_multipliers).sum(axis=2, dtype=np.uint64) + self._band_salts
+
+    def _lookup(self, keys):
+        """Find the canonical owner of each key in the stored segments, -1 if none."""
+        owners = np.full(keys.shape, -1, dtype=np.int64)
+        flat_keys, flat_owners = keys.ravel(), owners.ravel()
+        for segment_keys, segment_owners in self.segments:
+            slots = np.searchsorted(segment_keys, flat_keys)
+            slots[slots >= len(segment_keys)] = 0
+            found = (segment_keys[slots] == flat_keys) & (flat_owners < 0)
+            flat_owners[found] = segment_owners[slots[found]]
+        return owners
+
+    def _add_segment(self, keys, owners):
+        order = np.argsort(keys, kind="stable")
+        self.segments.append((keys[order], owners[order]))
+        if len(self.segments) > MAX_SEGMENTS:
+            keys = np.concatenate([k for k, _ in self.segments])
+            owners = np.concatenate([o for _, o in self.segments])
+            order = np.argsort(keys, kind="stable")
+            self.segments = [(keys[order], owners[order])]
+
+    def add(self, texts, canonical=False):
+        """
+        Add a chunk of documents.
+
+        Args:
+            texts (list): Document texts
+            canonical (bool): Add every document as a new canonical document
+                without looking for duplicates (for reloading a stored corpus)
+
+        Returns:
+            numpy.ndarray: For each document, the canonical id of the
+                document it duplicates, or -1 if it is a new canonical
+                document. New canonical documents get consecutive ids in the
+                order given.
+        """
+        signatures = self.hasher.signatures(texts)
+        short = signatures.astype(np.uint16)
+        keys = self.band_keys(signatures)
+        stored_owners = self._lookup(keys) if not canonical else np.full(keys.shape, -1, dtype=np.int64)
+
+        duplicate_of = np.full(len(texts), -1, dtype=np.int64)
+        new_rows = []
+        chunk_buckets = {}
+        next_id = len(self.signatures)
+
+        for i in range(len(texts)):
+            candidates = set(stored_owners[i][stored_owners[i] >= 0].tolist())
+            for key in keys[i].tolist():
+                owner = chunk_buckets.get(key)
+                if owner is not None and not canonical:
+                    candidates.add(owner)
+
+            for candidate in sorted(candidates):
+                if candidate < len(self.signatures):
+                    candidate_signature = self.signatures[candidate]
+                else:
+                    candidate_signature = short[new_rows[candidate - len(self.signatures)]]
+                if estimate_jaccard(short[i], candidate_signature) >= self.threshold:
+                    duplicate_of[i] = candidate
+                    break
+
+            if duplicate_of[i] < 0:
+                canonical_id = next_id + len(new_rows)
+                new_rows.append(i)
+                for key in keys[i].tolist():
+                    chunk_buckets.setdefault(key, canonical_id)
+
+        if new_rows:
+            new_ids = np.arange(next_id, next_id + len(new_rows), dtype=np.int64)
+            self._add_segment(keys[new_rows].ravel(), np.repeat(new_ids, self.bands))
+            self.signatures = np.vstack([self.signatures, short[new_rows]])
+        return duplicate_of
+
+
+def cluster_records(records, text_fn, threshold=THRESHOLD):
+    """
+    Group near-duplicate records and keep one canonical record per group.
+
+    The first record of each group is canonical; the citations of the others
+    are collected in its ``alias_citations`` list.
+
+    Args:
+        records (list): Precedent dicts with a ``citation`` key
+        text_fn (callable): Function from a record to the text compared
+        threshold (float): Estimated Jaccard similarity for duplicates
+
+    Returns:
+        list: Canonical records (copies), each with ``alias_citations``
+    """
+    index = NearDuplicateIndex(threshold=threshold)
+    duplicate_of = index.add([text_fn(record) for record in records])
+
+    canonical = []
+    for record, original in zip(records, duplicate_of):
+        if original < 0:
+            canonical.append(dict(record, alias_citations=list(record.get("alias_citations", []))))
+        else:
+            canonical[original]["alias_citations"].append(record["citation"])
+    return canonical
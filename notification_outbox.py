@@ -0,0 +1,382 @@
+"""
+Notification Outbox
+
+Local, append-only record of every SMS notification sent through Twilio.
+Each send is keyed by an idempotency key built from the recipient, case
+reference, notification type and date (and, for free-form messages, a
+digest of the message text), so retried requests and Streamlit reruns do
+not deliver the same reminder twice.
+
+A key is reserved ("pending") while its message is being sent. Reservations
+hold a lease: if the process dies before recording the result, the pending
+row expires after PENDING_LEASE and the key can be claimed again.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+# Statuses after which a message counts as delivered (or on its way) and
+# must not be sent again for the same idempotency key
+ACTIVE_STATUSES = ("pending", "queued", "accepted", "sending", "sent", "delivered", "read")
+
+# Statuses Twilio will not change any more, plus expired reservations
+FINAL_STATUSES = ("delivered", "read", "undelivered", "failed", "canceled", "expired")
+
+# How long a pending reservation blocks its key before it can be reclaimed
+PENDING_LEASE = timedelta(seconds=int(os.environ.get("NOTIFICATION_PENDING_LEASE_SECONDS", 600)))
+
+# Twilio returns at most 1000 records per page
+RECONCILE_PAGE_SIZE = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    case_ref TEXT,
+    notification_type TEXT NOT NULL,
+    notification_date TEXT NOT NULL,
+    body TEXT,
+    message_sid TEXT,
+    status TEXT NOT NULL,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_outbox_idempotency_key ON outbox (idempotency_key);
+CREATE INDEX IF NOT EXISTS idx_outbox_message_sid ON outbox (message_sid);
+CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status);
+CREATE TABLE IF NOT EXISTS status_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    outbox_id INTEGER NOT NULL REFERENCES outbox (id),
+    status TEXT NOT NULL,
+    error TEXT,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_status_log_outbox_id ON status_log (outbox_id);
+"""
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _lease_cutoff():
+    """Timestamp before which a pending reservation has expired."""
+    return (datetime.now(timezone.utc) - PENDING_LEASE).isoformat(timespec="seconds")
+
+
+def make_idempotency_key(recipient, case_ref, notification_type, notification_date, content=None):
+    """
+    Build the idempotency key for a notification.
+
+    Args:
+        recipient (str): Formatted recipient phone number
+        case_ref (str): Case reference, or None for notifications not tied to a case
+        notification_type (str): Kind of notification (e.g. "hearing_reminder")
+        notification_date (str): Date the notification refers to
+        content (str, optional): Message text, for notifications that may
+            legitimately differ on the same date; a different text gives a
+            different key
+
+    Returns:
+        str: Hex digest identifying the notification
+    """
+    parts = [
+        str(recipient or "").strip(),
+        str(case_ref or "").strip().upper(),
+        str(notification_type or "").strip().lower(),
+        str(notification_date or "").strip(),
+    ]
+    if content is not None:
+        parts.append(hashlib.sha256(content.encode("utf-8")).hexdigest())
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class NotificationOutbox:
+    """
+    SQLite-backed outbox of sent notifications.
+
+    Rows are never deleted. Every status change is appended to the
+    status log, and the latest status is mirrored on the outbox row so
+    duplicate checks stay a single lookup on the unique key index.
+    """
+
+    def __init__(self, db_path=None):
+        """
+        Open (or create) the outbox database.
+
+        Args:
+            db_path (str, optional): Path of the SQLite file. Defaults to the
+                NOTIFICATION_OUTBOX_PATH environment variable or
+                ``notification_outbox.db`` in the working directory.
+        """
+        self.db_path = db_path or os.environ.get("NOTIFICATION_OUTBOX_PATH", "notification_outbox.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _append_status(self, outbox_id, status, error, now):
+        self._conn.execute(
+            "INSERT INTO status_log (outbox_id, status, error, recorded_at) VALUES (?, ?, ?, ?)",
+            (outbox_id, status, error, now)
+        )
+
+    def lookup(self, idempotency_key):
+        """
+        Get the outbox record for an idempotency key.
+
+        Returns:
+            dict: The outbox record, or None if nothing was sent under this key
+        """
+        with self._lock:
+            return self._lookup(idempotency_key)
+
+    def _lookup(self, idempotency_key):
+        row = self._conn.execute(
+            "SELECT * FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def reserve(self, idempotency_key, recipient, case_ref, notification_type, notification_date, body=None):
+        """
+        Claim an idempotency key before sending.
+
+        A key whose previous attempt failed, or whose pending reservation
+        has outlived PENDING_LEASE, can be claimed again; a key with a live
+        reservation or a successful send cannot.
+
+        Returns:
+            tuple: (reserved, record) where ``reserved`` is True if the caller
+                should go ahead and send, and ``record`` is the outbox record
+        """
+        now = _utcnow()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO outbox (idempotency_key, recipient, case_ref, notification_type, "
+                    "notification_date, body, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)",
+                    (idempotency_key, recipient, case_ref, notification_type, notification_date, body, now, now)
+                )
+                if cursor.rowcount:
+                    self._append_status(cursor.lastrowid, "pending", None, now)
+                    reserved = True
+                else:
+                    existing = self._conn.execute(
+                        "SELECT id, status, updated_at FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+                    ).fetchone()
+                    reserved = existing["status"] not in ACTIVE_STATUSES
+                    if existing["status"] == "pending" and existing["updated_at"] < _lease_cutoff():
+                        # The previous sender died before recording a result
+                        self._append_status(existing["id"], "expired", "reservation lease expired", now)
+                        reserved = True
+                    if reserved:
+                        self._conn.execute(
+                            "UPDATE outbox SET status = 'pending', body = ?, message_sid = NULL, error = NULL, "
+                            "updated_at = ? WHERE id = ?",
+                            (body, now, existing["id"])
+                        )
+                        self._append_status(existing["id"], "pending", None, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            # Read the record under the same lock, before another caller can change it
+            return reserved, self._lookup(idempotency_key)
+
+    def record_result(self, idempotency_key, message_sid=None, status="sent", error=None):
+        """
+        Record the outcome of a send attempt for a reserved key.
+
+        Args:
+            idempotency_key (str): Key passed to ``reserve``
+            message_sid (str, optional): SID returned by Twilio
+            status (str): Status to record (e.g. "sent", "failed")
+            error (str, optional): Error message if the attempt failed
+        """
+        now = _utcnow()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM outbox WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE outbox SET message_sid = COALESCE(?, message_sid), status = ?, error = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (message_sid, status, error, now, row["id"])
+                    )
+                    self._append_status(row["id"], status, error, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def expire_pending(self):
+        """
+        Mark pending reservations older than PENDING_LEASE as expired, so
+        their keys can be claimed again.
+
+        Returns:
+            int: Number of reservations expired
+        """
+        now = _utcnow()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id FROM outbox WHERE status = 'pending' AND updated_at < ?", (_lease_cutoff(),)
+                ).fetchall()
+                for row in rows:
+                    self._conn.execute(
+                        "UPDATE outbox SET status = 'expired', error = 'reservation lease expired', "
+                        "updated_at = ? WHERE id = ?",
+                        (now, row["id"])
+                    )
+                    self._append_status(row["id"], "expired", "reservation lease expired", now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def pending_sids(self):
+        """
+        Get records that have a message SID but no final delivery status.
+
+        Returns:
+            list: Outbox records awaiting reconciliation, with ``reserved_at``
+                (when the key was last claimed, so a reclaimed row does not
+                date from its first attempt), oldest first
+        """
+        placeholders = ", ".join("?" for _ in FINAL_STATUSES)
+        rows = self._conn.execute(
+            "SELECT outbox.*, (SELECT MAX(recorded_at) FROM status_log WHERE status_log.outbox_id = outbox.id "
+            "AND status_log.status = 'pending') AS reserved_at "
+            f"FROM outbox WHERE message_sid IS NOT NULL AND status NOT IN ({placeholders}) "
+            "ORDER BY reserved_at",
+            FINAL_STATUSES
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def apply_statuses(self, statuses):
+        """
+        Store delivery statuses fetched from Twilio.
+
+        Args:
+            statuses (dict): Mapping of message SID to (status, error) tuples
+
+        Returns:
+            int: Number of records whose status changed
+        """
+        if not statuses:
+            return 0
+        now = _utcnow()
+        changed = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sid, (status, error) in statuses.items():
+                    row = self._conn.execute(
+                        "SELECT id, status FROM outbox WHERE message_sid = ?", (sid,)
+                    ).fetchone()
+                    if not row or row["status"] == status:
+                        continue
+                    self._conn.execute(
+                        "UPDATE outbox SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                        (status, error, now, row["id"])
+                    )
+                    self._append_status(row["id"], status, error, now)
+                    changed += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return changed
+
+    def reconcile(self, client, from_number=None):
+        """
+        Refresh delivery statuses for all unsettled messages.
+
+        Rather than fetching each message by SID, this lists every message
+        sent since the oldest unsettled record, up to 1000 per API round
+        trip, and matches them against the outbox.
+
+        Args:
+            client: Twilio REST client
+            from_number (str, optional): Sending number, used to narrow the listing
+
+        Returns:
+            dict: Counts of checked, updated, unmatched and expired messages
+        """
+        # Stuck reservations would otherwise hold the listing window open
+        expired = self.expire_pending()
+        pending = self.pending_sids()
+        if not pending:
+            return {"checked": 0, "updated": 0, "unmatched": 0, "expired": expired}
+
+        wanted = {record["message_sid"] for record in pending}
+        oldest = datetime.fromisoformat(pending[0]["reserved_at"] or pending[0]["created_at"]) - timedelta(days=1)
+
+        filters = {"date_sent_after": oldest, "page_size": RECONCILE_PAGE_SIZE}
+        if from_number:
+            filters["from_"] = from_number
+
+        statuses = {}
+        for message in client.messages.stream(**filters):
+            if message.sid in wanted:
+                error = message.error_message or (str(message.error_code) if message.error_code else None)
+                statuses[message.sid] = (message.status, error)
+                if len(statuses) == len(wanted):
+                    break
+
+        updated = self.apply_statuses(statuses)
+        return {
+            "checked": len(wanted),
+            "updated": updated,
+            "unmatched": len(wanted) - len(statuses),
+            "expired": expired
+        }
+
+    def history(self, idempotency_key):
+        """
+        Get the full status history for an idempotency key.
+
+        Returns:
+            list: Status log entries, oldest first
+        """
+        rows = self._conn.execute(
+            "SELECT status_log.status, status_log.error, status_log.recorded_at FROM status_log "
+            "JOIN outbox ON outbox.id = status_log.outbox_id "
+            "WHERE outbox.idempotency_key = ? ORDER BY status_log.id",
+            (idempotency_key,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Get the shared outbox, opening it on first use."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = NotificationOutbox()
+    return _outbox
@@ -1,6 +1,10 @@
 import os
+import re
+from datetime import datetime, date as date_cls
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
+from notification_outbox import get_outbox, make_idempotency_key
+from instrumentation import traced, stage
 
 def format_phone_number(phone_number):
     """Format the phone number to ensure it has the correct international format."""
@@ -35,6 +39,106 @@ def format_phone_number(phone_number):
             # Default to adding Indian country code
             return f"+91{digits_only}"
 
+def _send_once(client, from_number, formatted_number, message_body, case_ref, notification_type, notification_date,
+               key_on_body=False):
+    """
+    Send an SMS at most once per idempotency key, recording it in the outbox.
+
+    Args:
+        client: Twilio REST client
+        from_number (str): Sending Twilio phone number
+        formatted_number (str): Recipient phone number in international format
+        message_body (str): Message text
+        case_ref (str): Case reference, or None
+        notification_type (str): Kind of notification
+        notification_date (str): Date the notification refers to
+        key_on_body (bool): Include the message text in the idempotency key,
+            so a different message on the same date is sent rather than
+            treated as a duplicate
+
+    Returns:
+        tuple: (message_sid, state) where ``state`` is "sent", "duplicate"
+            if the notification had already been sent, or "in_progress" if
+            another attempt holds the key and has not sent it yet (the SID
+            is then None)
+    """
+    outbox = get_outbox()
+    key = make_idempotency_key(formatted_number, case_ref, notification_type, notification_date,
+                               content=message_body if key_on_body else None)
+    reserved, record = outbox.reserve(
+        key, formatted_number, case_ref, notification_type, notification_date, body=message_body
+    )
+    if not reserved:
+        return record["message_sid"], "in_progress" if record["status"] == "pending" else "duplicate"
+
+    try:
+        with stage("send"):
+            message = client.messages.create(
+                body=message_body,
+                from_=from_number,
+                to=formatted_number
+            )
+    except Exception as e:
+        outbox.record_result(key, status="failed", error=str(e))
+        raise
+
+    outbox.record_result(key, message_sid=message.sid, status=message.status or "sent")
+    return message.sid, "sent"
+
+def _send_response(message_sid, state, what, formatted_number):
+    """
+    Build the result of a notification sent through _send_once.
+
+    A send still in progress elsewhere is reported as "in_progress" rather
+    than "success", since the message has not gone out yet.
+    """
+    messages = {
+        "sent": f"{what} sent successfully to {formatted_number}",
+        "duplicate": f"{what} already sent to {formatted_number}",
+        "in_progress": f"{what} to {formatted_number} is already being sent; check again shortly"
+    }
+    return {
+        "status": "in_progress" if state == "in_progress" else "success",
+        "message_sid": message_sid,
+        "duplicate": state != "sent",
+        "message": messages[state]
+    }
+
+def reconcile_delivery_statuses():
+    """
+    Refresh the delivery status of every unsettled message in the outbox.
+
+    Returns:
+        dict: Status of the reconciliation and counts of checked and updated messages
+    """
+    account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
+    auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
+    from_number = os.environ.get("TWILIO_PHONE_NUMBER")
+
+    if not account_sid or not auth_token:
+        return {
+            "status": "error",
+            "message": "Missing Twilio credentials. Please configure TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN."
+        }
+
+    try:
+        client = Client(account_sid, auth_token)
+        counts = get_outbox().reconcile(client, from_number=from_number)
+    except TwilioRestException as e:
+        return {
+            "status": "error",
+            "message": f"Failed to fetch delivery statuses: {str(e)}",
+            "error_code": e.code
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Unexpected error while fetching delivery statuses: {str(e)}"
+        }
+
+    return {"status": "success", **counts}
+
+@traced("notification.send_case_update")
 def send_case_update(to_phone_number, case_ref, update_message, notes=None):
     """
     Send an SMS notification about a case update.
@@ -57,10 +161,10 @@ def send_case_update(to_phone_number, case_ref, update_message, notes=None):
         "Hearing Scheduled": "📅 Hearing Alert - {case}: {message}",
         "Case Transferred": "🔁 Transfer Notice - {case}: {message}"
     }
-    if not all([to_phone_number, case_ref, date, time, court]):
+    if not all([to_phone_number, case_ref, update_message]):
         return {
             "status": "error",
-            "message": "Phone number, case reference, date, time, and court location are required"
+            "message": "Phone number, case reference, and update message are required"
         }
 
     try:
@@ -145,18 +249,14 @@ def send_case_update(to_phone_number, case_ref, update_message, notes=None):
             }
 
         try:
-            # Send the message
-            message = client.messages.create(
-                body=message_body,
-                from_=from_number,
-                to=formatted_number
+            # Send the message unless this exact update already went out today
+            message_sid, state = _send_once(
+                client, from_number, formatted_number, message_body,
+                case_ref, f"case_update:{message_type or 'general'}", date_cls.today().isoformat(),
+                key_on_body=True
             )
             
-            return {
-                "status": "success",
-                "message_sid": message.sid,
-                "message": f"SMS notification sent successfully to {formatted_number}"
-            }
+            return _send_response(message_sid, state, "SMS notification", formatted_number)
         except TwilioRestException as te:
             error_msg = "Failed to send message: "
             if te.code == 21610:
@@ -197,6 +297,7 @@ def send_case_update(to_phone_number, case_ref, update_message, notes=None):
             "message": f"Unexpected error while sending SMS: {str(e)}"
         }
 
+@traced("notification.send_rights_reminder")
 def send_rights_reminder(to_phone_number, rights_list, notes=None):
     """
     Send an SMS reminder about key legal rights.
@@ -267,18 +368,14 @@ def send_rights_reminder(to_phone_number, rights_list, notes=None):
                 "message": "Message is too long. Please reduce the number of rights or shorten the notes."
             }
 
-        # Send the message
-        message = client.messages.create(
-            body=message_body,
-            from_=from_number,
-            to=formatted_number
+        # Send the message unless the same reminder already went out today
+        message_sid, state = _send_once(
+            client, from_number, formatted_number, message_body,
+            None, "rights_reminder", date_cls.today().isoformat(),
+            key_on_body=True
         )
 
-        return {
-            "status": "success",
-            "message_sid": message.sid,
-            "message": f"Rights reminder sent successfully to {formatted_number}"
-        }
+        return _send_response(message_sid, state, "Rights reminder", formatted_number)
 
     except TwilioRestException as e:
         error_message = "Failed to send rights reminder: "
@@ -369,6 +466,7 @@ def send_rights_reminder(to_phone_number, rights_list, notes=None):
             "message": f"Failed to send rights reminder: {str(e)}"
         }
 
+@traced("notification.send_hearing_reminder")
 def send_hearing_reminder(to_phone_number, case_ref, date, time, court, notes=None):
     """Send an SMS reminder about an upcoming court hearing.
     
@@ -456,18 +554,13 @@ def send_hearing_reminder(to_phone_number, case_ref, date, time, court, notes=No
             except Exception as e:
                 pass  # Continue without scheduling if format is invalid
 
-        # Send the message
-        message = client.messages.create(
-            body=message_body,
-            from_=from_number,
-            to=formatted_number
+        # Send the message unless a reminder for this hearing already went out
+        message_sid, state = _send_once(
+            client, from_number, formatted_number, message_body,
+            case_ref, "hearing_reminder", str(date)
         )
         
-        return {
-            "status": "success",
-            "message_sid": message.sid,
-            "message": f"Hearing reminder sent successfully to {formatted_number}"
-        }
+        return _send_response(message_sid, state, "Hearing reminder", formatted_number)
         
     except TwilioRestException as e:
         error_message = "Failed to send hearing reminder: "
@@ -504,4 +597,34 @@ def check_twilio_credentials():
     auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
     from_number = os.environ.get("TWILIO_PHONE_NUMBER")
     
-    return all([account_sid, auth_token, from_number])
\ No newline at end of file
+    return all([account_sid, auth_token, from_number])
+
+def send_bulk_hearing_reminders(reminders):
+    """
+    Send hearing reminders for many cases, checking Twilio health first.
+    
+    Args:
+        reminders (list): Dictionaries with the keyword arguments of
+            send_hearing_reminder (to_phone_number, case_ref, date, time, court, notes)
+    
+    Returns:
+        dict: Overall status and the individual result for each reminder
+    """
+    from twilio_test import probe_twilio_health
+    
+    health = probe_twilio_health()
+    if not health["healthy"]:
+        return {
+            "status": "error",
+            "message": f"Twilio is not ready for sending: {health['error']}",
+            "results": []
+        }
+    
+    results = [send_hearing_reminder(**reminder) for reminder in reminders]
+    sent = sum(1 for result in results if result["status"] == "success")
+    
+    return {
+        "status": "success" if sent == len(results) else "partial",
+        "message": f"Sent {sent} of {len(results)} hearing reminders",
+        "results": results
+    }
@@ -0,0 +1,370 @@
+"""
+Rights and Defense Relevance Models
+
+Linear models that score how relevant each defendant right and each defense
+option is to a case. Features are hashed unigrams and bigrams of the case
+description plus the act and section, so no vocabulary has to be stored or
+loaded. The weights are fitted with dual-form ridge regression and only the
+rows of features seen in training are kept, which makes the saved artifact
+small and inference a single sparse product over the query's features.
+
+Models are trained from labelled case records, given by the
+LEGAL_RELEVANCE_RECORDS environment variable or ``python relevance_models.py
+[records.jsonl]``. Each record is a JSON object with ``section``, ``act``,
+``description``, and ``rights`` / ``defenses`` mappings of label to
+relevance (0-1). Without a records file, labelled records are bootstrapped
+from the legal data tables and the rule-based scores in model.py, so the
+models reproduce the current behaviour until annotated cases are available.
+
+The trained models are stored in the artifact cache, keyed by the model
+version and parameters, the label catalogue, a digest of the legal data and
+the featurizer and rule code (which bootstrapped records derive from) and a
+digest of the records file if one is given. Editing any of them trains new
+models on the next load instead of serving stale ones, and a cache hit reads
+no records at all.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import random
+import numpy as np
+from scipy import sparse
+from sklearn.utils import murmurhash3_32
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from text_normalization import normalize_text
+from artifact_cache import artifact_cache, source_digest
+
+MODEL_VERSION = 1
+
+# Labelled case records to train on; bootstrapped from the rules when unset
+RECORDS_PATH = os.environ.get("LEGAL_RELEVANCE_RECORDS")
+
+# Files the models' features and bootstrapped labels are derived from
+SOURCE_FILES = ("relevance_models.py", "model.py", "text_normalization.py", "legal_data.py")
+
+# Size of the hashed feature space
+N_FEATURES = 2 ** 18
+
+# Ridge regularisation strength
+ALPHA = 0.1
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def featurize(section, act, description, n_features=N_FEATURES):
+    """
+    Turn a case into hashed feature indices and values.
+
+    The description's unigrams and bigrams are L2-normalised; the act and
+    section indicator features always carry weight 1.
+
+    Args:
+        section (str): Section number
+        act (str): Act name
+        description (str): Case description
+
+    Returns:
+        tuple: (indices, values) numpy arrays, indices sorted and unique
+    """
+    words = [w for w in _TOKEN_PATTERN.findall(normalize_text(description or "").lower()) if w not in ENGLISH_STOP_WORDS]
+    terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    counts = {}
+    for term in terms:
+        index = murmurhash3_32(term, positive=True) % n_features
+        counts[index] = counts.get(index, 0.0) + 1.0
+    norm = np.sqrt(sum(c * c for c in counts.values())) or 1.0
+    for index in counts:
+        counts[index] /= norm
+
+    act_key = (act or "").lower().replace(" ", "_")
+    for term in (f"act={act_key}", f"section={act_key}:{str(section or '').lower()}"):
+        index = murmurhash3_32(term, positive=True) % n_features
+        counts[index] = counts.get(index, 0.0) + 1.0
+
+    indices = np.fromiter(sorted(counts), dtype=np.int64, count=len(counts))
+    values = np.array([counts[i] for i in indices], dtype=np.float32)
+    return indices, values
+
+
+class LinearRelevanceHead:
+    """
+    One linear model scoring a fixed list of labels.
+
+    Only the weight rows of features seen during training are stored:
+    ``features`` holds their hashed indices (sorted) and ``weights`` the
+    matching rows, one column per label.
+    """
+
+    def __init__(self, labels, features, weights, intercept):
+        self.labels = list(labels)
+        self.features = features
+        self.weights = weights
+        self.intercept = intercept
+
+    def score(self, indices, values):
+        """
+        Score every label for one featurized case.
+
+        Returns:
+            numpy.ndarray: Relevance per label, clipped to [0, 1]
+        """
+        rows = np.searchsorted(self.features, indices)
+        rows[rows >= len(self.features)] = 0
+        found = self.features[rows] == indices if len(self.features) else np.zeros(len(indices), dtype=bool)
+        scores = self.intercept + values[found] @ self.weights[rows[found]]
+        return np.clip(scores, 0.0, 1.0)
+
+    def score_labels(self, indices, values):
+        """Score every label and return a mapping of label to relevance."""
+        return dict(zip(self.labels, self.score(indices, values).tolist()))
+
+
+class RelevanceModels:
+    """
+    Rights and defense relevance heads sharing one featurizer.
+    """
+
+    def __init__(self, rights, defenses, metadata=None):
+        self.rights = rights
+        self.defenses = defenses
+        self.metadata = metadata or {}
+
+    def featurize(self, section, act, description):
+        return featurize(section, act, description, self.metadata.get("n_features", N_FEATURES))
+
+    def parts(self):
+        """Get the models as artifact parts: metadata and one set of arrays per head."""
+        parts = {"metadata": np.array(json.dumps(self.metadata))}
+        for name, head in (("rights", self.rights), ("defenses", self.defenses)):
+            parts[f"{name}_labels"] = np.array(head.labels)
+            parts[f"{name}_features"] = head.features
+            parts[f"{name}_weights"] = head.weights
+            parts[f"{name}_intercept"] = head.intercept
+        return parts
+
+    @classmethod
+    def from_parts(cls, parts):
+        """
+        Rebuild models from the parts returned by ``parts``.
+
+        Args:
+            parts (dict or artifact_cache.Artifact): The stored parts
+
+        Returns:
+            RelevanceModels: The models
+        """
+        heads = {}
+        for name in ("rights", "defenses"):
+            heads[name] = LinearRelevanceHead(
+                parts[f"{name}_labels"].tolist(),
+                np.asarray(parts[f"{name}_features"]),
+                np.asarray(parts[f"{name}_weights"]),
+                np.asarray(parts[f"{name}_intercept"])
+            )
+        return cls(heads["rights"], heads["defenses"], json.loads(str(parts["metadata"])))
+
+
+def _fit_head(X_rows, targets, labels, alpha=ALPHA):
+    """
+    Fit one head with dual-form ridge regression.
+
+    Args:
+        X_rows (list): (indices, values) per record
+        targets (numpy.ndarray): Relevance per record and label
+        labels (list): Label names, one per target column
+    """
+    features = np.unique(np.concatenate([indices for indices, _ in X_rows]))
+    X = sparse.csr_matrix(
+        (np.concatenate([values for _, values in X_rows]).astype(np.float64),
+         np.searchsorted(features, np.concatenate([indices for indices, _ in X_rows])),
+         np.cumsum([0] + [len(indices) for indices, _ in X_rows])),
+        shape=(len(X_rows), len(features))
+    )
+
+    # The dual system is records x records, independent of the feature count
+    intercept = targets.mean(axis=0)
+    gram = (X @ X.T).toarray()
+    gram[np.diag_indices_from(gram)] += alpha
+    dual = np.linalg.solve(gram, targets - intercept)
+    weights = np.asarray(X.T @ dual)
+
+    # Drop feature rows whose weights are negligible for every label
+    keep = np.abs(weights).max(axis=1) > 1e-6
+    return LinearRelevanceHead(
+        labels,
+        features[keep].astype(np.int64),
+        weights[keep].astype(np.float32),
+        intercept.astype(np.float32)
+    )
+
+
+def train_relevance_models(records, rights_labels, defense_labels, alpha=ALPHA):
+    """
+    Train rights and defense relevance models on labelled case records.
+
+    Args:
+        records (list): Dicts with section, act, description and
+            ``rights`` / ``defenses`` mappings of label to relevance
+        rights_labels (list): Every right the model should score
+        defense_labels (list): Every defense option the model should score
+        alpha (float): Ridge regularisation strength
+
+    Returns:
+        RelevanceModels: The trained models
+    """
+    X_rows = [featurize(r["section"], r["act"], r["description"]) for r in records]
+
+    rights_targets = np.array(
+        [[r.get("rights", {}).get(label, 0.0) for label in rights_labels] for r in records], dtype=np.float64
+    )
+    defense_targets = np.array(
+        [[r.get("defenses", {}).get(label, 0.0) for label in defense_labels] for r in records], dtype=np.float64
+    )
+
+    metadata = {
+        "version": MODEL_VERSION,
+        "n_features": N_FEATURES,
+        "alpha": alpha,
+        "records": len(records),
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+    return RelevanceModels(
+        _fit_head(X_rows, rights_targets, rights_labels, alpha),
+        _fit_head(X_rows, defense_targets, defense_labels, alpha),
+        metadata
+    )
+
+
+def catalogue_labels():
+    """
+    Get the full lists of rights and defense options the models score.
+
+    Returns:
+        tuple: (rights_labels, defense_labels)
+    """
+    from legal_data import defendant_rights, defense_options
+
+    rights_labels = defendant_rights["general"] + defendant_rights["bail"] + defendant_rights["trial"]
+    defense_labels = list(defense_options["common"])
+    for act_options in (v for k, v in defense_options.items() if k != "common"):
+        for options in act_options.values():
+            defense_labels.extend(o for o in options if o not in defense_labels)
+    return list(dict.fromkeys(rights_labels)), defense_labels
+
+
+def bootstrap_records(predictor, per_section=20, seed=13):
+    """
+    Derive labelled records from the legal data tables and the predictor's
+    rule-based scores.
+
+    Descriptions are built from section titles, defense option wording and
+    common fact phrases, so that the description-dependent parts of the
+    rules are represented in the training data.
+
+    Args:
+        predictor: LegalPredictor providing the rule-based scores
+        per_section (int): Records generated per section
+        seed (int): Random seed for reproducible records
+
+    Returns:
+        list: Labelled case records
+    """
+    from legal_data import ipc_sections, it_act_sections, mv_act_sections
+
+    rng = random.Random(seed)
+    _, defense_labels = catalogue_labels()
+    facts = [
+        "the accused was arrested", "the police filed a charge sheet", "witnesses gave statements",
+        "the complainant alleges", "the incident occurred at night", "evidence was seized",
+        "the accused denies the allegations", "an FIR was registered"
+    ]
+
+    records = []
+    for act, sections in (("IPC", ipc_sections), ("IT Act", it_act_sections), ("MV Act", mv_act_sections)):
+        for section, title in sections.items():
+            for _ in range(per_section):
+                phrases = [title] + rng.sample(facts, 2) + rng.sample(defense_labels, rng.randint(0, 3))
+                rng.shuffle(phrases)
+                description = ". ".join(phrases)
+                records.append({
+                    "section": section,
+                    "act": act,
+                    "description": description,
+                    "rights": predictor.rule_based_rights(section, act),
+                    "defenses": predictor.rule_based_defenses(section, act, description)
+                })
+    return records
+
+
+def load_records(path):
+    """Read labelled case records from a JSON Lines file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _file_digest(path):
+    """Digest of a records file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_or_train(predictor, records_path=RECORDS_PATH, cache=artifact_cache, train_if_missing=True):
+    """
+    Load the relevance models for the current records and code from the
+    artifact cache, training and storing them on a miss.
+
+    Args:
+        predictor: LegalPredictor used to bootstrap records when no file is given
+        records_path (str, optional): JSON Lines file of labelled case records
+        cache (artifact_cache.ArtifactCache, optional): Cache to use; None
+            to always train in memory
+        train_if_missing (bool): Train on a cache miss; otherwise return None
+
+    Returns:
+        RelevanceModels: The models, or None when they are not cached and
+            ``train_if_missing`` is False
+    """
+    rights_labels, defense_labels = catalogue_labels()
+
+    def build():
+        # Records are only read or generated on a miss; the key does not need them
+        records = load_records(records_path) if records_path else bootstrap_records(predictor)
+        return train_relevance_models(records, rights_labels, defense_labels).parts()
+
+    if cache is None:
+        return RelevanceModels.from_parts(build())
+    # Bootstrapped records are a function of legal_data and the rule code, both in the code digest
+    data = {"records_file": _file_digest(records_path)} if records_path else {"records": "bootstrap"}
+    config = {
+        "version": MODEL_VERSION,
+        "n_features": N_FEATURES,
+        "alpha": ALPHA,
+        "labels": {"rights": rights_labels, "defenses": defense_labels},
+        "code": source_digest(*SOURCE_FILES)
+    }
+    if train_if_missing:
+        parts = cache.get_or_build("relevance_models", data, build, config)
+    else:
+        parts = cache.load("relevance_models", data, config)
+        if parts is None:
+            return None
+    return RelevanceModels.from_parts(parts)
+
+
+if __name__ == "__main__":
+    from model import legal_predictor
+
+    start = time.perf_counter()
+    trained = load_or_train(legal_predictor, sys.argv[1] if len(sys.argv) > 1 else RECORDS_PATH)
+    print(f"Models trained on {trained.metadata['records']} records, ready in {time.perf_counter() - start:.2f}s")
+    print(f"Rights head: {len(trained.rights.features)} features, {len(trained.rights.labels)} labels")
+    print(f"Defense head: {len(trained.defenses.features)} features, {len(trained.defenses.labels)} labels")
+    print(f"Stored in {artifact_cache.directory}")
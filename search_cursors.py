@@ -0,0 +1,172 @@
+"""
+Search Result Cursors
+
+Cursor-based paging for the case and precedent searches. The first page of a
+query scores every candidate once and keeps a compact snapshot of the result:
+the ids and float32 scores of the documents that scored above zero, keyed by
+a random query id. Later pages are served from the snapshot without running
+the search again. Ranking is extended one argpartition over the documents
+not yet ranked at a time, so "load more" costs a pass over the remaining
+scores instead of a fresh search with a larger k.
+
+A cursor is "<query id>:<offset>" and names the page starting at that rank,
+so paging does not change what a cursor refers to: a rerun or a double
+click that sends the same cursor again gets the same page back.
+
+Snapshots are kept in a bounded LRU store; a cursor expires once
+MAX_CURSORS newer queries have been opened.
+"""
+
+import uuid
+import threading
+from collections import OrderedDict
+import numpy as np
+
+MAX_CURSORS = 256
+DEFAULT_PAGE_SIZE = 10
+
+
+def make_cursor(query_id, offset):
+    """Get the cursor for the page of a query starting at ``offset``."""
+    return f"{query_id}:{offset}"
+
+
+def parse_cursor(cursor):
+    """
+    Split a cursor into its query id and offset.
+
+    Returns:
+        tuple: (query id, offset), or None if the cursor is malformed
+    """
+    query_id, _, offset = str(cursor).partition(":")
+    if not offset:
+        return query_id, 0
+    if not offset.isdigit():
+        return None
+    return query_id, int(offset)
+
+
+class ScoreSnapshot:
+    """
+    Ids and scores of one query's matches, with the ranked prefix first.
+    """
+
+    def __init__(self, ids, scores, context=None):
+        """
+        Args:
+            ids (array-like): Document ids
+            scores (array-like): Score of each document; documents scoring
+                0 or less are dropped
+            context: Anything the caller needs to format later pages (for
+                example the texts the ids refer to)
+        """
+        scores = np.asarray(scores, dtype=np.float32)
+        keep = scores > 0
+        self.ids = np.asarray(ids, dtype=np.int64)[keep]
+        self.scores = scores[keep]
+        self.context = context
+        self.ranked = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rank_to(self, end):
+        """
+        Extend the ranked prefix to the best ``end`` matches.
+
+        The next best matches are moved to the front of the unranked range,
+        so the ranked prefix is always in rank order and never moves again.
+        """
+        start = self.ranked
+        k = end - start
+        if k <= 0:
+            return
+        rest = self.scores[start:]
+        order = np.argpartition(-rest, k - 1) if k < len(rest) else np.arange(len(rest))
+        page = order[:k]
+        order[:k] = page[np.argsort(-rest[page], kind="stable")]
+        self.ids[start:] = self.ids[start:][order]
+        self.scores[start:] = rest[order]
+        self.ranked = end
+
+    def page(self, offset, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Get the matches ranked ``offset`` to ``offset + page_size``.
+
+        Returns:
+            tuple: (document ids, scores), best first
+        """
+        end = min(offset + page_size, len(self.ids))
+        if end <= offset:
+            return self.ids[:0], self.scores[:0]
+        self._rank_to(end)
+        return self.ids[offset:end], self.scores[offset:end]
+
+
+class CursorStore:
+    """
+    Thread-safe LRU store of score snapshots keyed by query id.
+    """
+
+    def __init__(self, max_cursors=MAX_CURSORS):
+        self.max_cursors = max_cursors
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def open(self, ids, scores, context=None):
+        """
+        Store a snapshot for a new query.
+
+        Returns:
+            tuple: (cursor of the first page, ScoreSnapshot)
+        """
+        snapshot = ScoreSnapshot(ids, scores, context)
+        query_id = uuid.uuid4().hex
+        with self._lock:
+            self._snapshots[query_id] = snapshot
+            while len(self._snapshots) > self.max_cursors:
+                self._snapshots.popitem(last=False)
+        return make_cursor(query_id, 0), snapshot
+
+    def get(self, query_id):
+        """Get the snapshot for a query id, or None if it expired."""
+        with self._lock:
+            snapshot = self._snapshots.get(query_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(query_id)
+            return snapshot
+
+    def close(self, cursor):
+        """Drop a query's snapshot once the caller has finished paging."""
+        parsed = parse_cursor(cursor)
+        if parsed is not None:
+            with self._lock:
+                self._snapshots.pop(parsed[0], None)
+
+    def page(self, cursor, page_size=DEFAULT_PAGE_SIZE):
+        """
+        Serve the page a cursor names.
+
+        Serving a page does not advance any state, so the same cursor always
+        gets the same page.
+
+        Returns:
+            tuple: (document ids, scores, snapshot, cursor of the next page
+                or None after the last one), or None if the cursor expired
+                or is malformed
+        """
+        parsed = parse_cursor(cursor)
+        if parsed is None:
+            return None
+        query_id, offset = parsed
+        snapshot = self.get(query_id)
+        if snapshot is None:
+            return None
+        with self._lock:
+            ids, scores = snapshot.page(offset, page_size)
+        end = offset + len(ids)
+        next_cursor = make_cursor(query_id, end) if end < len(snapshot) else None
+        return ids, scores, snapshot, next_cursor
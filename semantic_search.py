@@ -3,16 +3,28 @@ Advanced Case Law Retrieval System Using Semantic Search
 
 This module implements advanced text embedding and semantic search 
 capabilities for legal case retrieval. Since we cannot use sentence-transformers,
-we'll implement a robust alternative using our existing scikit-learn and NLTK libraries.
+we'll implement a robust alternative using our existing scikit-learn and NLTK libraries:
+enhanced TF-IDF for lexical matching, and LSA embeddings of a fitted corpus
+(see lsa_embeddings.py) for semantic matching.
 """
 
 import nltk
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.base import clone
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize, sent_tokenize
 import re
+from instrumentation import traced, stage
+from ann_index import IVFIndex, exact_search, ANN_MIN_DOCUMENTS, DEFAULT_NPROBE
+from lsa_embeddings import LSAEmbeddings, DEFAULT_COMPONENTS
+from bm25 import BM25FIndex, PRECEDENT_FIELD_WEIGHTS
+from facets import FacetIndex
+from search_cursors import CursorStore, DEFAULT_PAGE_SIZE
+from snippets import make_snippet, query_terms
+from artifact_cache import artifact_cache, source_digest
+from text_normalization import normalize_text, NON_WORD_PATTERN, TOKEN_PATTERN
 
 # Ensure NLTK data is downloaded
 try:
@@ -37,11 +49,27 @@ class EnhancedLegalCaseMatcher:
             stop_words='english',  # Remove stopwords
             use_idf=True,
             smooth_idf=True,
-            sublinear_tf=True  # Apply sublinear tf scaling
+            sublinear_tf=True,  # Apply sublinear tf scaling
+            token_pattern=TOKEN_PATTERN  # Keep Indic vowel signs inside words
         )
         self.stop_words = set(stopwords.words('english'))
         self.legal_keywords_boost = self._load_legal_keywords()
         
+        # Fitted case corpus, see fit()
+        self.corpus_vectorizer = None
+        self.case_texts = None
+        self.case_metadata = None
+        self.case_matrix = None
+        self.keyword_weights = None
+        self.facets = None
+        self.cursors = CursorStore()
+        self.lsa = None
+        self.bm25 = None
+        self.ann_index = None
+        
+        # Cache for the fitted vectorizer, matrix, embeddings and ANN index; None to always fit
+        self.artifacts = artifact_cache
+        
     def _load_legal_keywords(self):
         """
         Load legal keywords to boost in the matching process.
@@ -103,6 +131,9 @@ class EnhancedLegalCaseMatcher:
         """
         if not text:
             return ""
+        
+        # Fold Hindi and romanised Hindi onto English terms (see text_normalization)
+        text = normalize_text(text)
             
         # Convert to lowercase
         text = text.lower()
@@ -123,7 +154,7 @@ class EnhancedLegalCaseMatcher:
                 text = text.replace(phrase, phrase.replace(" ", "_"))
         
         # Remove special characters while preserving underscores
-        text = re.sub(r'[^\w\s_]', ' ', text)
+        text = NON_WORD_PATTERN.sub(' ', text)
         
         # Remove extra whitespace
         text = re.sub(r'\s+', ' ', text).strip()
@@ -134,86 +165,395 @@ class EnhancedLegalCaseMatcher:
         """
         Enhance the query with contextual legal information.
         
+        Keyword boosting is not done here; it is applied to the query vector
+        by apply_keyword_weights, so the query text is not lengthened.
+        
         Args:
             query (str): The original query string
             
         Returns:
             str: Enhanced query for better legal semantic matching
         """
-        # Preprocess the query
-        processed_query = self.preprocess_text(query)
+        return self.preprocess_text(query)
+    
+    def compile_keyword_weights(self, vectorizer):
+        """
+        Compile legal_keywords_boost into one weight per feature of a fitted
+        vectorizer.
+        
+        Each keyword goes through the same preprocessing and analyzer as the
+        documents. Multi-word keywords map to their highest-order n-grams, so
+        "charge sheet" boosts the "charge sheet" bigram rather than "charge"
+        and "sheet" separately. Phrases that lose a word to stopword removal
+        (e.g. "it act") have no matching feature and are skipped. Features
+        matched by several keywords take the largest boost.
         
-        # Split into tokens
-        tokens = processed_query.split()
+        Args:
+            vectorizer (TfidfVectorizer): Fitted vectorizer
+            
+        Returns:
+            numpy.ndarray: float32 weight per feature, 1.0 for unboosted features
+        """
+        analyzer = vectorizer.build_analyzer()
+        vocabulary = vectorizer.vocabulary_
+        max_order = vectorizer.ngram_range[1]
+        weights = np.ones(len(vocabulary), dtype=np.float32)
+        
+        for keyword, boost in self.legal_keywords_boost.items():
+            processed = self.preprocess_text(keyword)
+            order = min(max_order, len(processed.split()))
+            for term in analyzer(processed):
+                index = vocabulary.get(term)
+                if index is not None and len(term.split()) == order:
+                    weights[index] = max(weights[index], boost)
+        return weights
+    
+    @staticmethod
+    def apply_keyword_weights(query_vector, weights):
+        """
+        Boost legal keyword features of a TF-IDF query vector.
+        
+        Args:
+            query_vector (scipy.sparse matrix): 1 x n_features query
+            weights (numpy.ndarray): Weights from compile_keyword_weights
+            
+        Returns:
+            scipy.sparse.csr_matrix: Re-normalised boosted query vector
+        """
+        query_vector = query_vector.tocsr(copy=True)
+        query_vector.data *= weights[query_vector.indices]
+        norm = np.sqrt(np.dot(query_vector.data, query_vector.data))
+        if norm:
+            query_vector.data /= norm
+        return query_vector
+    
+    def fit(self, case_texts, case_metadata=None, build_ann=None,
+            lsa_components=DEFAULT_COMPONENTS, embeddings_path=None):
+        """
+        Fit the matcher on a fixed case corpus, so that searches only need to
+        vectorize the query.
         
-        # Apply keyword boosting by duplicating important legal terms
-        enhanced_tokens = []
-        for token in tokens:
-            enhanced_tokens.append(token)
+        Args:
+            case_texts (list): Case texts to index
+            case_metadata (list, optional): Metadata dictionary for each case
+            build_ann (bool, optional): Build the approximate nearest-neighbour
+                index. Defaults to True for corpora of ANN_MIN_DOCUMENTS or more.
+            lsa_components (int): LSA embedding dimensions, or 0 to skip the
+                embeddings (and the "lsa" ranker)
+            embeddings_path (str, optional): .npy file to store the LSA
+                embeddings in as a memory map when they are fitted; cached
+                embeddings are memory-mapped from the artifact cache instead
             
-            # If token is a legal keyword, add it again to boost its weight
-            if token in self.legal_keywords_boost:
-                boost_factor = int(self.legal_keywords_boost[token])
-                for _ in range(boost_factor - 1):
-                    enhanced_tokens.append(token)
+        Returns:
+            EnhancedLegalCaseMatcher: self
+        """
+        self.case_texts = list(case_texts)
+        self.case_metadata = case_metadata
+        if build_ann is None:
+            build_ann = len(self.case_texts) >= ANN_MIN_DOCUMENTS
         
-        return ' '.join(enhanced_tokens)
+        # Load the fitted parts for this corpus from the artifact cache, or fit them
+        build = lambda: self._fit_parts(lsa_components, build_ann, embeddings_path)
+        if self.artifacts is not None:
+            config = {
+                "vectorizer": self.tfidf_vectorizer.get_params(),
+                "lsa_components": lsa_components,
+                "build_ann": build_ann,
+                "code": source_digest("semantic_search.py", "text_normalization.py", "legal_data.py",
+                                      "lsa_embeddings.py", "ann_index.py")
+            }
+            parts = self.artifacts.get_or_build("case_matcher", self.case_texts, build, config)
+        else:
+            parts = build()
+        
+        self.corpus_vectorizer = parts["vectorizer"]
+        self.case_matrix = parts["matrix"]
+        self.keyword_weights = self.compile_keyword_weights(self.corpus_vectorizer)
+        self.facets = FacetIndex().add(case_metadata) if case_metadata else None
+        
+        # BM25F fields: the case text is the summary; name and key points come from metadata
+        bm25_documents = []
+        for i, text in enumerate(self.case_texts):
+            metadata = case_metadata[i] if case_metadata and i < len(case_metadata) else {}
+            bm25_documents.append({
+                "case_name": metadata.get("case_name", ""),
+                "summary": text,
+                "key_points": metadata.get("key_points", [])
+            })
+        self.bm25 = BM25FIndex(PRECEDENT_FIELD_WEIGHTS, tokenizer=self._bm25_tokens)
+        if self.artifacts is not None:
+            config = {
+                "field_weights": PRECEDENT_FIELD_WEIGHTS,
+                "stop_words": sorted(self.stop_words),
+                "code": source_digest("semantic_search.py", "text_normalization.py", "legal_data.py", "bm25.py")
+            }
+            self.bm25.restore(self.artifacts.get_or_build(
+                "case_bm25", bm25_documents, lambda: self.bm25.build(bm25_documents).parts(), config
+            ))
+        else:
+            self.bm25.build(bm25_documents)
+        
+        self.lsa = None
+        if "lsa_svd" in parts:
+            self.lsa = LSAEmbeddings(lsa_components).restore(parts["lsa_svd"], parts["lsa_embeddings"])
+        
+        self.ann_index = None
+        if "ann_centroids" in parts:
+            # The ANN index partitions the LSA embeddings when there are any
+            svd, embeddings = (self.lsa.svd, self.lsa.embeddings) if self.lsa is not None \
+                else (parts["ann_svd"], parts["ann_embeddings"])
+            self.ann_index = IVFIndex().restore(
+                self.case_matrix, embeddings, svd,
+                parts["ann_centroids"], parts["ann_list_offsets"], parts["ann_list_members"]
+            )
+        return self
     
-    def find_similar_cases(self, query, case_texts, case_metadata=None, top_k=5):
+    def _fit_parts(self, lsa_components, build_ann, embeddings_path):
+        """
+        Fit the vectorizer, LSA embeddings and ANN index on self.case_texts.
+        
+        Returns:
+            dict: Artifact parts, see fit()
+        """
+        # A separate vectorizer, since extract_key_sentences refits the shared one
+        vectorizer = clone(self.tfidf_vectorizer)
+        matrix = vectorizer.fit_transform([self.preprocess_text(text) for text in self.case_texts])
+        parts = {"vectorizer": vectorizer, "matrix": matrix}
+        
+        lsa = None
+        if lsa_components:
+            lsa = LSAEmbeddings(lsa_components).fit(matrix, embeddings_path)
+            parts["lsa_svd"] = lsa.svd
+            parts["lsa_embeddings"] = lsa.embeddings
+        
+        if build_ann:
+            # Partition the LSA embeddings instead of fitting a second SVD
+            if lsa is not None:
+                ann = IVFIndex().fit(matrix, lsa.embeddings, lsa.svd)
+            else:
+                ann = IVFIndex().fit(matrix)
+                parts["ann_svd"] = ann.svd
+                parts["ann_embeddings"] = ann.embeddings
+            parts.update({f"ann_{name}": value for name, value in ann.parts().items()})
+        return parts
+    
+    def _bm25_tokens(self, text):
+        return [token for token in self.preprocess_text(text).split() if token not in self.stop_words]
+    
+    @traced("EnhancedLegalCaseMatcher.find_similar_cases")
+    def find_similar_cases(self, query, case_texts=None, case_metadata=None, top_k=5,
+                           exact=False, nprobe=DEFAULT_NPROBE, ranker="tfidf", filters=None,
+                           snippets=False):
         """
         Find similar cases using enhanced semantic search.
         
         Args:
             query (str): The query text describing the case scenario
-            case_texts (list): List of case texts to search within
+            case_texts (list, optional): List of case texts to search within.
+                Defaults to the corpus given to fit().
             case_metadata (list, optional): List of dictionaries containing metadata for each case
             top_k (int): Number of top matches to return
+            exact (bool): Skip the approximate index and score every fitted case
+            nprobe (int): Number of index partitions searched by the approximate index
+            ranker (str): "tfidf" for lexical cosine similarity, "lsa" for
+                cosine similarity of LSA embeddings, or "bm25" for BM25F scores
+                over case name, text and key points (fitted corpus only)
+            filters (dict, optional): Facet conditions on the case metadata
+                (act, section, court, year range, bench size; see facets.py).
+                Only matching cases are scored.
+            snippets (bool): Return a highlighted ``snippet`` of each case
+                (see snippets.py) instead of its full ``text``
             
         Returns:
             list: Top matching cases with similarity scores
         """
-        if not case_texts:
-            return []
+        try:
+            ranked = self._rank(query, case_texts, case_metadata, top_k, exact, nprobe, ranker, filters)
+            if ranked is None:
+                return []
+            top_indices, top_scores, case_texts, case_metadata = ranked
             
-        # Enhance the query for better matching
-        enhanced_query = self.enhance_query(query)
+            with stage("format"):
+                terms = query_terms(query, self.stop_words) if snippets else None
+                return self._format_cases(top_indices, top_scores, case_texts, case_metadata, terms)
+        except Exception as e:
+            print(f"Error in finding similar cases: {str(e)}")
+            # Fallback to basic matching if vectorization fails
+            case_texts = self.case_texts if case_texts is None else case_texts
+            return [{'text': text, 'similarity': 0.5} for text in case_texts[:min(top_k, len(case_texts))]]
+    
+    @traced("EnhancedLegalCaseMatcher.search_cases")
+    def search_cases(self, query=None, cursor=None, page_size=DEFAULT_PAGE_SIZE, case_texts=None,
+                     case_metadata=None, ranker="tfidf", filters=None, snippets=False):
+        """
+        Page through the cases matching a query.
         
-        # Create corpus by combining case texts with the query
-        corpus = [self.preprocess_text(text) for text in case_texts]
-        corpus.append(enhanced_query)
+        The first call (with a query) scores every candidate exactly once and
+        keeps the matches as a snapshot; later calls pass the returned cursor
+        to get the next page from the snapshot without searching again.
         
-        # Vectorize the corpus
-        try:
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
+        Args:
+            query (str, optional): The query text, for the first page
+            cursor (str, optional): Cursor returned with the previous page
+            page_size (int): Number of cases per page
+            case_texts, case_metadata, ranker, filters, snippets: As for
+                find_similar_cases (first page only)
+            
+        Returns:
+            dict: "results" (the page, formatted like find_similar_cases),
+                "cursor" (for the next page, None when there are no more
+                matches) and "total" (number of matching cases)
+        """
+        if cursor is None:
+            ranked = self._rank(query, case_texts, case_metadata, None, True, DEFAULT_NPROBE, ranker, filters)
+            if ranked is None:
+                return {"results": [], "cursor": None, "total": 0}
+            ids, scores, case_texts, case_metadata = ranked
+            terms = query_terms(query, self.stop_words) if snippets else None
+            cursor, _ = self.cursors.open(ids, scores, (case_texts, case_metadata, terms))
+        
+        with stage("score"):
+            page = self.cursors.page(cursor, page_size)
+        if page is None:
+            return {"results": [], "cursor": None, "total": 0, "error": "Search cursor expired"}
+        ids, scores, snapshot, next_cursor = page
+        case_texts, case_metadata, terms = snapshot.context
+        
+        with stage("format"):
+            results = self._format_cases(ids, scores, case_texts, case_metadata, terms)
+        return {
+            "results": results,
+            "cursor": next_cursor,
+            "total": len(snapshot)
+        }
+    
+    def _rank(self, query, case_texts, case_metadata, top_k, exact, nprobe, ranker, filters):
+        """
+        Score the cases for a query.
+        
+        With ``top_k`` set, returns the best top_k cases, best first; with
+        top_k None, returns every scored case in no particular order.
+        
+        Returns:
+            tuple: (case indices, scores, case texts, case metadata), where
+                the indices refer to the returned texts and metadata, or None
+                if there is nothing to search
+        """
+        fitted = case_texts is None
+        if fitted:
+            if self.case_matrix is None:
+                return None
+            case_texts = self.case_texts
+            case_metadata = self.case_metadata
+        
+        if not case_texts:
+            return None
+        
+        # Select the cases matching the facet filters before scoring
+        selected = None
+        if filters:
+            facets = self.facets if fitted else FacetIndex().add(case_metadata or [])
+            if facets is None:
+                return None
+            selected = facets.ids(filters)
+            if len(selected) == 0:
+                return None
+            if not fitted:
+                case_texts = [case_texts[i] for i in selected]
+                case_metadata = [case_metadata[i] for i in selected]
+                selected = None
             
-            # Calculate similarity between query and all cases
-            query_idx = len(corpus) - 1
-            similarities = cosine_similarity(tfidf_matrix[query_idx], tfidf_matrix[:-1])[0]
+        with stage("preprocess"):
+            # Enhance the query for better matching
+            enhanced_query = self.enhance_query(query)
             
-            # Get indices of top-k matches
-            top_indices = similarities.argsort()[-top_k:][::-1]
+            if not fitted:
+                # Create corpus by combining case texts with the query
+                corpus = [self.preprocess_text(text) for text in case_texts]
+                corpus.append(enhanced_query)
+        
+        if fitted and ranker == "bm25":
+            with stage("score"):
+                doc_mask = self.facets.mask(filters) if selected is not None else None
+                if top_k is None:
+                    top_indices, top_scores = self.bm25.score_all(query, doc_mask)
+                else:
+                    top_indices, top_scores = self.bm25.search(query, top_k, doc_mask)
+        elif fitted:
+            with stage("vectorise"):
+                query_vector = self.apply_keyword_weights(
+                    self.corpus_vectorizer.transform([enhanced_query]), self.keyword_weights
+                )
+            
+            with stage("score"):
+                if ranker == "lsa" and self.lsa is not None:
+                    similarities = self.lsa.similarities(query_vector, selected)
+                    top_indices, top_scores = self._top(similarities, top_k)
+                elif self.ann_index is not None and not exact and selected is None and top_k is not None:
+                    top_indices, top_scores = self.ann_index.search(query_vector, top_k, nprobe=nprobe)
+                else:
+                    candidates = self.case_matrix if selected is None else self.case_matrix[selected]
+                    if top_k is None:
+                        top_indices, top_scores = self._top((candidates @ query_vector.T).toarray().ravel(), None)
+                    else:
+                        top_indices, top_scores = exact_search(candidates, query_vector, top_k)
+                
+                # Map positions within the selection back to case ids
+                if selected is not None:
+                    top_indices = selected[top_indices]
+        else:
+            with stage("vectorise"):
+                tfidf_matrix = self.tfidf_vectorizer.fit_transform(corpus)
+                query_vector = self.apply_keyword_weights(
+                    tfidf_matrix[len(corpus) - 1], self.compile_keyword_weights(self.tfidf_vectorizer)
+                )
             
-            # Prepare results with metadata if available
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0:  # Only include if there's some similarity
+            with stage("score"):
+                # Calculate similarity between query and all cases
+                similarities = cosine_similarity(query_vector, tfidf_matrix[:-1])[0]
+                
+                # Get indices of top-k matches
+                top_indices, top_scores = self._top(similarities, top_k)
+        
+        return top_indices, top_scores, case_texts, case_metadata
+    
+    @staticmethod
+    def _top(similarities, top_k):
+        """Get the top_k (indices, scores) best first, or all of them when top_k is None."""
+        if top_k is None:
+            return np.arange(len(similarities)), similarities
+        k = min(top_k, len(similarities))
+        if k <= 0:
+            return np.array([], dtype=np.int64), similarities[:0]
+        top_indices = np.argpartition(-similarities, k - 1)[:k]
+        top_indices = top_indices[np.argsort(-similarities[top_indices], kind="stable")]
+        return top_indices, similarities[top_indices]
+    
+    @staticmethod
+    def _format_cases(top_indices, top_scores, case_texts, case_metadata, terms=None):
+        # Prepare results with metadata if available
+        results = []
+        for idx, score in zip(top_indices, top_scores):
+            if score > 0:  # Only include if there's some similarity
+                if terms is not None:
+                    case_result = {
+                        'snippet': make_snippet(case_texts[idx], terms),
+                        'similarity': float(score)
+                    }
+                else:
                     case_result = {
                         'text': case_texts[idx],
-                        'similarity': float(similarities[idx])
+                        'similarity': float(score)
                     }
-                    
-                    # Add metadata if available
-                    if case_metadata and idx < len(case_metadata):
-                        case_result.update(case_metadata[idx])
-                    
-                    results.append(case_result)
-            
-            return results
-        except Exception as e:
-            print(f"Error in finding similar cases: {str(e)}")
-            # Fallback to basic matching if vectorization fails
-            return [{'text': text, 'similarity': 0.5} for text in case_texts[:min(top_k, len(case_texts))]]
+                
+                # Add metadata if available
+                if case_metadata and idx < len(case_metadata):
+                    case_result.update(case_metadata[idx])
+                
+                results.append(case_result)
+        return results
     
+    @traced("EnhancedLegalCaseMatcher.extract_key_sentences")
     def extract_key_sentences(self, text, top_n=3):
         """
         Extract the most important sentences from a legal text.
@@ -225,23 +565,26 @@ class EnhancedLegalCaseMatcher:
         Returns:
             list: Key sentences extracted from the text
         """
-        # Split text into sentences
-        sentences = sent_tokenize(text)
-        if len(sentences) <= top_n:
-            return sentences
-            
-        # Preprocess sentences
-        preprocessed_sentences = [self.preprocess_text(s) for s in sentences]
+        with stage("preprocess"):
+            # Split text into sentences
+            sentences = sent_tokenize(text)
+            if len(sentences) <= top_n:
+                return sentences
+                
+            # Preprocess sentences
+            preprocessed_sentences = [self.preprocess_text(s) for s in sentences]
         
         # Create sentence vectors
-        sentence_vectors = self.tfidf_vectorizer.fit_transform(preprocessed_sentences)
+        with stage("vectorise"):
+            sentence_vectors = self.tfidf_vectorizer.fit_transform(preprocessed_sentences)
         
-        # Calculate sentence importance using centrality
-        similarity_matrix = cosine_similarity(sentence_vectors)
-        scores = np.sum(similarity_matrix, axis=1)
-        
-        # Get indices of top sentences
-        top_indices = scores.argsort()[-top_n:][::-1]
+        with stage("score"):
+            # Calculate sentence importance using centrality
+            similarity_matrix = cosine_similarity(sentence_vectors)
+            scores = np.sum(similarity_matrix, axis=1)
+            
+            # Get indices of top sentences
+            top_indices = scores.argsort()[-top_n:][::-1]
         
         # Return original sentences in document order
         sorted_indices = sorted(top_indices)
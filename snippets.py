@@ -0,0 +1,197 @@
+"""
+Search Result Snippets
+
+Short highlighted snippets for search results, so the UI does not have to
+render whole judgments. Query terms are matched as whole lowercase words, the
+same tokens EnhancedLegalCaseMatcher.preprocess_text produces, with one
+compiled regex per query; each match is a hit with its offsets. The span of
+at most ``max_chars`` with the best hit score is cut out together with the
+highlight spans of its hits.
+
+A document can be a str or any bytes-like buffer of UTF-8 text, such as an
+mmap.mmap of a judgment file. Buffers are scanned in place with a bytes
+regex and only the snippet itself is decoded, so a long memory-mapped
+document is never copied. For buffers, offsets and ``max_chars`` are in
+bytes.
+"""
+
+import re
+from functools import lru_cache
+from text_normalization import normalize_text, WORD_PATTERN, INDIC_CHARS
+
+SNIPPET_CHARS = 300
+
+# Extra score per repeated hit; distinct query terms count fully
+REPEAT_WEIGHT = 0.1
+
+_WORD = WORD_PATTERN
+_SPACE = re.compile(r"\s")
+_SPACE_BYTES = re.compile(rb"\s")
+
+
+def query_terms(query, stop_words=frozenset()):
+    """
+    Get the terms to highlight for a query.
+
+    Joined phrases such as "section_302" are split back into their words.
+    A Hindi or romanised query is normalised the way the indexed texts are
+    (see text_normalization), and both its own words and the English terms
+    they fold onto are highlighted, so "zamanat" highlights "bail" as well
+    as "zamanat".
+
+    Returns:
+        frozenset: Lowercase query words without stopwords
+    """
+    words = _WORD.findall(query.lower().replace("_", " "))
+    normalized = normalize_text(query)
+    if normalized != query:
+        words += _WORD.findall(normalized.lower().replace("_", " "))
+    return frozenset(word for word in words if word not in stop_words)
+
+
+@lru_cache(maxsize=256)
+def _term_pattern(terms, binary):
+    alternatives = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+    if binary:
+        # Only ASCII boundaries here; non-ASCII neighbours are checked per hit
+        return re.compile(rb"(?<![A-Za-z0-9_])(?:" + alternatives.encode("utf-8") + rb")(?![A-Za-z0-9_])",
+                          re.IGNORECASE)
+    return re.compile(rf"(?<![\w{INDIC_CHARS}])(?:" + alternatives + rf")(?![\w{INDIC_CHARS}])", re.IGNORECASE)
+
+
+def _is_word_byte(document, position, before):
+    """Whether the UTF-8 character ending (before) or starting at a position is a word character."""
+    if before:
+        start = position - 1
+        while start > 0 and position - start < 4 and 0x80 <= document[start] < 0xC0:
+            start -= 1
+        end = position
+    else:
+        start, end = position, position + 1
+        while end < len(document) and end - position < 4 and 0x80 <= document[end] < 0xC0:
+            end += 1
+    return _WORD.match(bytes(document[start:end]).decode("utf-8", errors="ignore")) is not None
+
+
+def find_hits(document, terms):
+    """
+    Find the query terms in a document.
+
+    Returns:
+        list: (start offset, end offset, term) per hit, in document order
+    """
+    if not terms:
+        return []
+    binary = not isinstance(document, str)
+    pattern = _term_pattern(frozenset(terms), binary)
+    if binary:
+        length = len(document)
+        hits = []
+        for match in pattern.finditer(document):
+            start, end = match.span()
+            if start > 0 and document[start - 1] >= 0x80 and _is_word_byte(document, start, True):
+                continue
+            if end < length and document[end] >= 0x80 and _is_word_byte(document, end, False):
+                continue
+            hits.append((start, end, match.group().decode("utf-8").lower()))
+        return hits
+    return [(m.start(), m.end(), m.group().lower()) for m in pattern.finditer(document)]
+
+
+def best_window(hits, width=SNIPPET_CHARS, term_weights=None):
+    """
+    Find the run of hits spanning at most ``width`` with the best score.
+
+    A window scores the weights of the distinct terms in it plus
+    REPEAT_WEIGHT for each repeated hit.
+
+    Returns:
+        tuple: (first hit index, last hit index), or None without hits
+    """
+    if not hits:
+        return None
+    weight = (lambda term: term_weights.get(term, 1.0)) if term_weights else (lambda term: 1.0)
+
+    counts = {}
+    score = 0.0
+    best, best_score = (0, 0), -1.0
+    first = 0
+    for last, (_, end, term) in enumerate(hits):
+        counts[term] = counts.get(term, 0) + 1
+        score += weight(term) if counts[term] == 1 else REPEAT_WEIGHT
+        while end - hits[first][0] > width and first < last:
+            dropped = hits[first][2]
+            counts[dropped] -= 1
+            score -= weight(dropped) if counts[dropped] == 0 else REPEAT_WEIGHT
+            first += 1
+        if score > best_score + 1e-9:
+            best, best_score = (first, last), score
+    return best
+
+
+def _slice_text(document, start, end):
+    piece = document[start:end]
+    return piece if isinstance(piece, str) else bytes(piece).decode("utf-8", errors="ignore")
+
+
+def _snap(document, start, end, lower, upper):
+    """Widen [start, end) towards [lower, upper) without cutting words."""
+    space = _SPACE if isinstance(document, str) else _SPACE_BYTES
+    if lower < start:
+        match = space.search(document[lower:start])
+        lower = lower + match.end() if match else start
+    if end < upper:
+        tail = document[end:upper]
+        matches = list(space.finditer(tail))
+        upper = end + matches[-1].start() if matches else end
+    return lower, upper
+
+
+def make_snippet(document, terms, max_chars=SNIPPET_CHARS, term_weights=None):
+    """
+    Cut a highlighted snippet out of a document.
+
+    Args:
+        document (str or bytes-like): Document text, or a UTF-8 buffer such
+            as an mmap
+        terms (set): Query terms, see query_terms()
+        max_chars (int): Maximum snippet length
+        term_weights (dict, optional): Weight per term, 1 by default
+
+    Returns:
+        dict: ``text`` (the snippet), ``highlights`` ([start, end] spans of
+            the hits within the snippet text), and ``start`` and ``end``
+            (offsets of the snippet in the document)
+    """
+    length = len(document)
+    hits = find_hits(document, terms)
+    window = best_window(hits, max_chars, term_weights)
+
+    if window is None:
+        # No hits: the opening of the document
+        end = length if length <= max_chars else (_snap(document, 0, 0, 0, max_chars)[1] or max_chars)
+        return {"text": _slice_text(document, 0, end), "highlights": [], "start": 0, "end": end}
+
+    first, last = window
+    window_hits = hits[first:last + 1]
+    start, end = window_hits[0][0], window_hits[-1][1]
+
+    # Spend the remaining length on context, mostly after the hits
+    slack = max(max_chars - (end - start), 0)
+    lower = max(start - slack // 3, 0)
+    upper = min(end + slack - (start - lower), length)
+    start, end = _snap(document, start, end, lower, upper)
+    if lower == 0:
+        start = 0
+    if upper == length:
+        end = length
+
+    text = _slice_text(document, start, end)
+    highlights = []
+    for hit_start, hit_end, _ in window_hits:
+        if isinstance(document, str):
+            highlights.append([hit_start - start, hit_end - start])
+        else:
+            offset = len(_slice_text(document, start, hit_start))
+            highlights.append([offset, offset + len(_slice_text(document, hit_start, hit_end))])
+    return {"text": text, "highlights": highlights, "start": start, "end": end}
@@ -0,0 +1,194 @@
+"""
+Static Asset Bundle
+
+Builds the application stylesheet and the static footer and sidebar markup
+from the files in ``assets/`` once per server process. The stylesheet is
+minified and content-hashed. When Streamlit static file serving is enabled
+(``server.enableStaticServing``), the hashed stylesheet is written to
+``static/`` and each rerun only sends a short <link> tag; the browser
+fetches the file once and caches it. Otherwise the minified stylesheet is
+sent inline in a single element.
+
+Every HTML block sent through ``emit_html`` is counted, so the payload of a
+rerun can be reported with ``payload_report``.
+"""
+
+import os
+import re
+import hashlib
+import streamlit as st
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+STYLESHEET = "styles.css"
+FOOTER = "footer.html"
+SIDEBAR_RESOURCES = "sidebar_resources.md"
+
+
+def minify_css(css):
+    """Strip comments and redundant whitespace from a stylesheet."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,>])\s*', r'\1', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+
+def minify_html(html):
+    """Collapse whitespace between and inside HTML tags."""
+    html = re.sub(r'>\s+<', '><', html)
+    html = re.sub(r'\s+', ' ', html)
+    return html.strip()
+
+
+def _read_asset(name):
+    with open(os.path.join(ASSETS_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _assets_version():
+    parts = []
+    for name in (STYLESHEET, FOOTER, SIDEBAR_RESOURCES):
+        try:
+            stat = os.stat(os.path.join(ASSETS_DIR, name))
+            parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            parts.append(f"{name}:missing")
+    return "|".join(parts)
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _build_bundle(version):
+    raw_css = _read_asset(STYLESHEET)
+    raw_footer = _read_asset(FOOTER)
+    css = minify_css(raw_css)
+    content_hash = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+    return {
+        "css": css,
+        "hash": content_hash,
+        "css_filename": f"styles.{content_hash}.css",
+        "footer": minify_html(raw_footer),
+        # Markdown is whitespace-sensitive, so the sidebar block is cached but not minified
+        "sidebar_resources": _read_asset(SIDEBAR_RESOURCES),
+        "raw_css_bytes": len(raw_css.encode('utf-8')),
+        "raw_footer_bytes": len(raw_footer.encode('utf-8'))
+    }
+
+
+def get_bundle():
+    """
+    Get the built asset bundle, rebuilding it if a file in ``assets/`` changed.
+
+    Returns:
+        dict: Minified stylesheet and its hash, footer and sidebar markup,
+            and the unminified sizes for reporting
+    """
+    return _build_bundle(_assets_version())
+
+
+def _publish_stylesheet(bundle):
+    """Write the hashed stylesheet to ``static/`` if it is not there yet."""
+    path = os.path.join(STATIC_DIR, bundle["css_filename"])
+    if not os.path.exists(path):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(bundle["css"])
+        os.replace(tmp_path, path)
+    return f"app/static/{bundle['css_filename']}"
+
+
+def _static_serving_enabled():
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+def emit_html(html, container=None):
+    """
+    Render an HTML block and count its size towards this rerun's payload.
+
+    Args:
+        html (str): Markup to render
+        container: Streamlit container to render into (defaults to the main area)
+    """
+    (container or st).markdown(html, unsafe_allow_html=True)
+    payload = st.session_state.setdefault("asset_payload", {"bytes": 0, "calls": 0})
+    payload["bytes"] += len(html.encode('utf-8'))
+    payload["calls"] += 1
+
+
+def inject_styles():
+    """
+    Send the application stylesheet for this rerun.
+
+    Call once near the top of the script, after st.set_page_config. This
+    also starts a new payload count for the rerun.
+    """
+    st.session_state["asset_payload"] = {"bytes": 0, "calls": 0}
+    bundle = get_bundle()
+    if _static_serving_enabled():
+        href = _publish_stylesheet(bundle)
+        emit_html(f'<link rel="stylesheet" href="{href}">')
+    else:
+        emit_html(f"<style>{bundle['css']}</style>")
+
+
+def render_footer():
+    """Render the static page footer."""
+    emit_html(get_bundle()["footer"])
+
+
+def render_sidebar_resources():
+    """Render the static external resources block in the sidebar."""
+    emit_html(get_bundle()["sidebar_resources"], container=st.sidebar)
+
+
+def render_section_grid(title, sections):
+    """
+    Render a grid of section cards in a single element.
+
+    Args:
+        title (str): Heading shown above the grid
+        sections (dict): Mapping of "ACT NUMBER: Name" labels to page paths
+    """
+    cards = []
+    for section, page in sections.items():
+        section_code, section_name = (part.strip() for part in section.split(":", 1))
+        act, number = section_code.rsplit(" ", 1)
+        cards.append(
+            f"<div class='section-card' onclick='handleSectionClick(\"{act}\", \"{number}\", \"{page}\")'>"
+            f"<div class='section-code'>{section_code}</div>"
+            f"<div class='section-name'>{section_name}</div></div>"
+        )
+    emit_html(
+        "<div class='popular-sections-container'>"
+        f"<h3 class='section-title'>{title}</h3>"
+        f"<div class='section-grid'>{''.join(cards)}</div></div>"
+        "<script>function handleSectionClick(act, number, page) {"
+        "window.dispatchEvent(new CustomEvent('section_selected', "
+        "{detail: {act: act, number: number, page: page}}));}</script>"
+    )
+
+
+def payload_report():
+    """
+    Get the number of HTML bytes and elements sent through this module
+    during the current rerun.
+
+    Returns:
+        dict: Payload bytes and element count for this rerun, plus the
+            minified and unminified stylesheet sizes
+    """
+    bundle = get_bundle()
+    payload = st.session_state.get("asset_payload", {"bytes": 0, "calls": 0})
+    return {
+        "payload_bytes": payload["bytes"],
+        "html_elements": payload["calls"],
+        "css_bytes": len(bundle["css"].encode('utf-8')),
+        "raw_css_bytes": bundle["raw_css_bytes"],
+        "css_hash": bundle["hash"]
+    }
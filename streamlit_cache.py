@@ -0,0 +1,217 @@
+"""
+Streamlit Resource Cache
+
+Streamlit re-executes every page from top to bottom on each widget
+interaction. This module gives the prediction, search and argument engines
+an explicit lifecycle: they are built once per server process with
+st.cache_resource, the static legal tables are served through
+st.cache_data, and everything is keyed on a data version so that editing
+the legal data files rebuilds the engines on the next rerun.
+
+Pages should use the getters here instead of importing the module-level
+singletons directly.
+"""
+
+import os
+import time
+import hashlib
+import importlib
+import streamlit as st
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Files whose contents the cached engines and tables are built from
+DATA_FILES = ("legal_data.py",)
+
+# Number of rerun timings kept per session
+RERUN_HISTORY = 50
+
+
+def data_version():
+    """
+    Get a version string for the legal data files.
+
+    Uses file size and modification time, so it costs one stat call per file.
+
+    Returns:
+        str: Short hex digest that changes whenever a data file changes
+    """
+    digest = hashlib.sha256()
+    for name in DATA_FILES:
+        try:
+            stat = os.stat(os.path.join(BASE_DIR, name))
+            digest.update(f"{name}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+        except OSError:
+            digest.update(f"{name}:missing".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _engine_modules(version):
+    """
+    Import the engine modules for a data version.
+
+    The first version seen by the process uses the modules as already
+    imported. Any later version reloads legal_data and every module that
+    copied names out of it.
+    """
+    import legal_data
+    import text_normalization
+    import fact_patterns
+    import bail_assessment
+    import relevance_models
+    import model
+    import semantic_search
+    import argument_generator
+    import autocomplete
+
+    # In import order, so each reloaded module picks up the reloaded names it imports
+    modules = [legal_data, text_normalization, fact_patterns, bail_assessment, relevance_models, model,
+               semantic_search, argument_generator, autocomplete]
+    loaded_version = getattr(legal_data, "_cache_data_version", None)
+    if loaded_version is not None and loaded_version != version:
+        modules = [importlib.reload(module) for module in modules]
+    modules[0]._cache_data_version = version
+
+    return {module.__name__: module for module in modules}
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _legal_predictor(version):
+    return _engine_modules(version)["model"].legal_predictor
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _case_matcher(version):
+    return _engine_modules(version)["semantic_search"].legal_case_matcher
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _argument_generator(version):
+    return _engine_modules(version)["argument_generator"].argument_generator
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _autocomplete(version):
+    return _engine_modules(version)["autocomplete"].autocomplete_index
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _precedent_index(version):
+    return _legal_predictor(version).build_precedent_index()
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _legal_tables(version):
+    legal_data = _engine_modules(version)["legal_data"]
+    return {
+        "IPC": legal_data.ipc_sections,
+        "CrPC": legal_data.crpc_sections,
+        "CPC": legal_data.cpc_sections,
+        "Evidence Act": legal_data.evidence_act_sections,
+        "IT Act": legal_data.it_act_sections,
+        "MV Act": legal_data.mv_act_sections,
+        "defendant_rights": legal_data.defendant_rights,
+        "legal_precedents": legal_data.legal_precedents,
+        "bail_guidelines": legal_data.bail_guidelines,
+        "jurisdiction_types": legal_data.jurisdiction_types
+    }
+
+
+def get_legal_predictor():
+    """Get the shared LegalPredictor for the current data version."""
+    return _legal_predictor(data_version())
+
+
+def get_case_matcher():
+    """Get the shared EnhancedLegalCaseMatcher for the current data version."""
+    return _case_matcher(data_version())
+
+
+def get_argument_generator():
+    """Get the shared ArgumentGenerator for the current data version."""
+    return _argument_generator(data_version())
+
+
+def get_autocomplete():
+    """Get the shared AutocompleteIndex for the current data version."""
+    return _autocomplete(data_version())
+
+
+def get_precedent_index():
+    """Get the fitted precedent TF-IDF matrix for the current data version."""
+    return _precedent_index(data_version())
+
+
+def get_legal_tables():
+    """
+    Get the static legal tables (sections, rights, precedents, bail and
+    jurisdiction guidelines) for the current data version.
+
+    Returns:
+        dict: Tables keyed by act name or table name
+    """
+    return _legal_tables(data_version())
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _warm_up(version):
+    start = time.perf_counter()
+    timings = {}
+    for name, loader in (
+        ("engine_modules", _engine_modules),
+        ("legal_predictor", _legal_predictor),
+        ("case_matcher", _case_matcher),
+        ("argument_generator", _argument_generator),
+        ("autocomplete", _autocomplete),
+        ("precedent_index", _precedent_index),
+        ("legal_tables", _legal_tables),
+    ):
+        step_start = time.perf_counter()
+        loader(version)
+        timings[name] = (time.perf_counter() - step_start) * 1000
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def warm_up():
+    """
+    Build every cached engine, index and table for the current data version.
+
+    Call this at the top of the main script. The work runs once per server
+    process (and again after the data files change); every later call is a
+    cache hit.
+
+    Returns:
+        dict: Milliseconds spent building each resource during the warm-up
+    """
+    return _warm_up(data_version())
+
+
+def clear_caches():
+    """Drop every cached engine, index and table."""
+    for cached in (_engine_modules, _legal_predictor, _case_matcher, _argument_generator,
+                   _autocomplete, _precedent_index, _legal_tables, _warm_up):
+        cached.clear()
+
+
+def record_rerun_latency(start):
+    """
+    Record how long the current script run took.
+
+    Args:
+        start (float): time.perf_counter() value taken at the top of the script
+
+    Returns:
+        dict: Last, mean and max rerun latency in milliseconds for this session
+    """
+    elapsed = (time.perf_counter() - start) * 1000
+    history = st.session_state.setdefault("rerun_latency_ms", [])
+    history.append(elapsed)
+    del history[:-RERUN_HISTORY]
+    return {
+        "last": elapsed,
+        "mean": sum(history) / len(history),
+        "max": max(history),
+        "runs": len(history)
+    }
@@ -0,0 +1,73 @@
+"""
+Tests for negated bail factor triggers in case descriptions.
+"""
+
+import pytest
+from bail_assessment import BailAssessor
+from fact_patterns import FactPatternMatcher
+
+
+@pytest.fixture(scope="module")
+def assessor():
+    return BailAssessor()
+
+
+def factors(assessment):
+    return {f["factor"] for f in assessment["favor"]} | {f["factor"] for f in assessment["against"]}
+
+
+def test_no_previous_conviction_is_a_first_offender(assessor):
+    found = factors(assessor.assess("323", "IPC", "The accused has no previous conviction."))
+    assert "first_offender" in found
+    assert "prior_record" not in found
+
+
+def test_denied_absconding_and_tampering_are_not_risks(assessor):
+    description = "The accused has not absconded and has never tampered with evidence."
+    assessment = assessor.assess("323", "IPC", description)
+    found = factors(assessment)
+    assert "flight_risk" not in found
+    assert "witness_tampering" not in found
+    assert assessment["score"] == assessor.assess("323", "IPC", "The accused was arrested.")["score"]
+
+
+def test_contraction_negates(assessor):
+    found = factors(assessor.assess("323", "IPC", "He didn't abscond."))
+    assert "flight_risk" not in found
+
+
+def test_negation_ends_at_conjunction(assessor):
+    found = factors(assessor.assess("323", "IPC", "The accused did not abscond and threatened witnesses."))
+    assert "flight_risk" not in found
+    assert "witness_tampering" in found
+
+
+def test_negation_ends_at_punctuation(assessor):
+    found = factors(assessor.assess("323", "IPC", "No bail was sought earlier; the accused absconded."))
+    assert "flight_risk" in found
+
+
+def test_affirmed_trigger_elsewhere_keeps_factor(assessor):
+    description = "There is no previous conviction in this state, but he is a history sheeter."
+    assert "prior_record" in factors(assessor.assess("323", "IPC", description))
+
+
+def test_negation_is_off_by_default():
+    triggers = {"flight_risk": ["absconded"]}
+    assert FactPatternMatcher(triggers).find("has not absconded") == ["flight_risk"]
+    assert FactPatternMatcher(triggers, negation=True).find("has not absconded") == []
+
+
+@pytest.mark.parametrize("description", [
+    "He did not flee; gun recovered from him.",
+    "He did not flee; gun recovered from him at the thana."
+])
+def test_negation_does_not_cross_semicolon(assessor, description):
+    found = factors(assessor.assess("420", "IPC", description))
+    assert "use_of_weapon" in found
+    assert "flight_risk" not in found
+
+
+def test_romanised_hindi_keeps_clause_breaks(assessor):
+    description = "accused ko police ne pakda, vah bhaga nahi; uske paas se gun mila"
+    assert "use_of_weapon" in factors(assessor.assess("420", "IPC", description))
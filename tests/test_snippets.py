@@ -0,0 +1,19 @@
+"""
+Tests for query term highlighting with Hindi and romanised queries.
+"""
+
+from snippets import make_snippet, query_terms
+
+
+def test_romanised_query_highlights_english_term():
+    snippet = make_snippet("The court granted bail to the accused.", query_terms("zamanat"))
+    assert snippet["highlights"] == [[18, 22]]
+
+
+def test_devanagari_query_keeps_its_own_words():
+    terms = query_terms("धारा 302")
+    assert {"section", "302", "धारा"} <= terms
+
+
+def test_english_query_is_unchanged():
+    assert query_terms("bail under section 302") == {"bail", "under", "section", "302"}
@@ -0,0 +1,36 @@
+"""
+Tests for Hindi detection and normalisation of mixed-script text.
+"""
+
+import pytest
+from text_normalization import is_hindi, normalize_text
+
+
+@pytest.mark.parametrize("text", [
+    "Appeal from Ki Moon v. State. Bad faith was not shown.",
+    "The matter was settled in the Lok Adalat; see Indian Kanoon.",
+    "He did not flee; gun recovered from him at the police thana."
+])
+def test_english_with_stray_markers_is_unchanged(text):
+    assert not is_hindi(text)
+    assert normalize_text(text) == text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("zamanat", "bail"),
+    ("dhara 302", "section 302"),
+    ("chori ke case mein zamanat", "theft case bail")
+])
+def test_romanised_queries_fold_onto_english_terms(text, expected):
+    assert normalize_text(text) == expected
+
+
+def test_hindi_keeps_punctuation():
+    normalized = normalize_text("आरोपी को धारा 302 में ज़मानत मिली। पुलिस ने गिरफ़्तार किया, फिर छोड़ा।")
+    assert normalized.count(".") == 2
+    assert "," in normalized
+    assert "section 302" in normalized
+
+
+def test_english_words_in_hindi_text_are_not_dropped_as_stopwords():
+    assert "the police" in normalize_text("accused ko bail nahi mili, the police ne giraftar kiya")
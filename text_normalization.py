@@ -0,0 +1,281 @@
+"""
+Text Normalisation for Hindi and Mixed-Script Text
+
+Case descriptions and judgments arrive in English, Hindi (Devanagari),
+romanised Hindi or a mix of them. This stage runs before the English
+preprocessing and folds Hindi text onto the ASCII tokens that preprocessing
+expects:
+
+- Devanagari is normalised the way Lucene's Hindi normaliser does it: the
+  nukta, chandrabindu and zero-width joiners are dropped, candra vowels and
+  long i/u are folded onto their plain forms, Devanagari digits become ASCII
+  and the danda is punctuation.
+- Devanagari words are transliterated to a romanised key (धारा -> "dhara"),
+  and romanised spellings are folded the same way (aa -> a, ee -> i, oo -> u,
+  z -> j, q -> k), so "zamanat", "jamanat" and "ज़मानत" share a key.
+- Keys of Hindi stopwords are dropped, and keys of the legal terms in
+  legal_data.hindi_legal_terms become their English term, so "धारा 302" is
+  indexed like "section 302".
+
+Python's \\w does not match Devanagari vowel signs, so the word and
+punctuation patterns here keep Indic combining marks; the vectorizers and
+snippets use them too. Other Indian scripts keep their words intact but are
+not transliterated.
+
+Latin-script text counts as romanised Hindi only when Hindi function words
+make up a share of it (MIN_MARKERS of them and MARKER_RATIO of its words),
+or when most of its words are romanised legal terms, as in a short query
+like "dhara 302 zamanat". A stray "Ki" or "ne", or "Lok Adalat" and "police
+thana" in English legal prose, leave the text alone. English text is
+returned unchanged after an isascii() check and a set lookup of its words,
+a few microseconds per document. Hindi text keeps its punctuation, so
+sentence and clause boundaries survive normalisation. Token folding is
+cached per distinct token.
+"""
+
+import re
+import string
+import unicodedata
+from functools import lru_cache
+from legal_data import hindi_legal_terms
+
+# Indic blocks (Devanagari to Sinhala) without the danda and double danda
+INDIC_CHARS = "\u0900-\u0963\u0966-\u0DFF"
+
+# A word: word characters and Indic letters, vowel signs and marks
+WORD_PATTERN = re.compile(rf"[\w{INDIC_CHARS}]+")
+
+# Anything that is not part of a word or whitespace
+NON_WORD_PATTERN = re.compile(rf"[^\w\s{INDIC_CHARS}]")
+
+# sklearn token_pattern matching words of two or more characters
+TOKEN_PATTERN = rf"(?u)[\w{INDIC_CHARS}][\w{INDIC_CHARS}]+"
+
+_DEVANAGARI = re.compile("[\u0900-\u097F]")
+_LATIN = re.compile(r"[A-Za-z]")
+_OTHER_INDIC = re.compile("[\u0980-\u0DFF]")
+
+# Devanagari folding, applied with str.translate
+_FOLD_TABLE = str.maketrans({
+    # Precomposed nukta letters to their base letters
+    "\u0958": "\u0915", "\u0959": "\u0916", "\u095a": "\u0917", "\u095b": "\u091c",
+    "\u095c": "\u0921", "\u095d": "\u0922", "\u095e": "\u092b", "\u095f": "\u092f",
+    "\u0929": "\u0928", "\u0931": "\u0930", "\u0934": "\u0933",
+    # Nukta and zero-width (non-)joiners
+    "\u093c": None, "\u200c": None, "\u200d": None,
+    # Chandrabindu to anusvara
+    "\u0901": "\u0902",
+    # Candra vowels to plain vowels
+    "ऍ": "ए", "ऑ": "ओ", "\u0945": "\u0947", "\u0949": "\u094b",
+    # Long i and u to short
+    "ई": "इ", "ऊ": "उ", "\u0940": "\u093f", "\u0942": "\u0941",
+    # Danda and double danda end a sentence; the abbreviation sign is a space
+    "\u0964": ".", "\u0965": ".", "\u0970": " ",
+    # Devanagari digits
+    **{chr(0x0966 + digit): str(digit) for digit in range(10)}
+})
+
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h"
+}
+_VOWELS = {
+    "अ": "a", "आ": "a", "इ": "i", "उ": "u", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au"
+}
+_VOWEL_SIGNS = {
+    "\u093e": "a", "\u093f": "i", "\u0941": "u", "\u0943": "ri", "\u0947": "e", "\u0948": "ai",
+    "\u094b": "o", "\u094c": "au"
+}
+_VIRAMA = "\u094d"
+_FINAL_SIGNS = {"\u0902": "n", "\u0903": "h"}
+
+# Spelling folds for romanised keys, in order
+_LATIN_FOLDS = [("aa", "a"), ("ee", "i"), ("oo", "u"), ("ph", "f"), ("w", "v"), ("z", "j"), ("q", "k")]
+
+# Common Hindi function words, in Devanagari and romanised
+HINDI_STOPWORDS = [
+    "का", "की", "के", "को", "में", "है", "हैं", "और", "से", "पर", "था", "थी", "थे", "ने",
+    "यह", "वह", "ये", "वे", "एक", "इस", "उस", "इन", "उन", "कि", "जो", "तो", "भी", "हो",
+    "ही", "लिए", "गया", "गई", "गए", "किया", "कर", "करने", "रहा", "रही", "रहे", "नहीं",
+    "अपने", "अपना", "साथ", "द्वारा", "तथा", "या", "एवं", "जब", "तक", "बाद", "अब", "कुछ",
+    "सब", "कोई", "किसी", "होता", "होती", "होने", "वाले", "वाली", "वाला", "हुआ", "हुई",
+    "हुए", "दिया", "दी", "जा", "जाता", "जाती", "अगर", "यदि", "तरह", "ओर", "बहुत",
+    "ka", "ki", "ke", "ko", "mein", "hai", "hain", "aur", "se", "tha", "thi", "ne", "yeh",
+    "yah", "woh", "vah", "ye", "ek", "kya", "jo", "bhi", "ho", "hi", "liye", "gaya", "gayi",
+    "kiya", "kar", "karne", "raha", "rahi", "rahe", "nahi", "nahin", "apne", "apna", "saath",
+    "dwara", "tatha", "ya", "evam", "jab", "tak", "baad", "ab", "kuch", "koi", "kisi",
+    "hota", "hoti", "hone", "wale", "wali", "wala", "hua", "hui", "diya", "agar", "yadi"
+]
+
+# Romanised Hindi function words that rarely occur in English
+_HINGLISH_MARKERS = [
+    "ka", "ki", "ke", "ko", "mein", "hai", "hain", "aur", "tha", "thi", "ne", "yeh", "woh",
+    "kya", "nahi", "nahin", "liye", "gaya", "gayi", "kiya", "dwara", "tatha", "evam"
+]
+
+# Marker words a Latin-script text needs, both as a count and as a share of
+# its words, to be treated as romanised Hindi
+MIN_MARKERS = 2
+MARKER_RATIO = 0.1
+
+
+def _fold_latin(key):
+    for spelling, folded in _LATIN_FOLDS:
+        key = key.replace(spelling, folded)
+    return key
+
+
+def transliterate(word):
+    """
+    Transliterate a folded Devanagari word to a romanised key.
+
+    Consonants carry an inherent "a" unless a vowel sign or virama follows;
+    the word-final one is dropped, as in speech (कानून -> "kanun").
+
+    Returns:
+        str: Lowercase ASCII key; characters outside Devanagari pass through
+    """
+    out = []
+    pending = False
+    for char in word:
+        if char in _CONSONANTS:
+            if pending:
+                out.append("a")
+            out.append(_CONSONANTS[char])
+            pending = True
+            continue
+        if char in _VOWEL_SIGNS:
+            out.append(_VOWEL_SIGNS[char])
+        elif char == _VIRAMA:
+            pass
+        else:
+            if pending:
+                out.append("a")
+            out.append(_VOWELS.get(char) or _FINAL_SIGNS.get(char) or char)
+        pending = False
+    if pending and len(out) == 1:
+        out.append("a")
+    return _fold_latin("".join(out))
+
+
+def _key(word):
+    """Romanised key of a Devanagari or Latin word."""
+    word = word.lower().translate(_FOLD_TABLE)
+    return transliterate(word) if _DEVANAGARI.search(word) else _fold_latin(word)
+
+
+_STOPWORD_KEYS = frozenset(_key(word) for word in HINDI_STOPWORDS if not word.isascii())
+# Latin words are only dropped when spelled as a romanised stopword, so
+# English words whose keys collide with one ("the", "is") are kept
+_LATIN_STOPWORD_KEYS = frozenset(_key(word) for word in HINDI_STOPWORDS if word.isascii())
+_TERM_KEYS = {_key(spelling): term for term, spellings in hindi_legal_terms.items() for spelling in spellings}
+_MARKERS = frozenset(_HINGLISH_MARKERS)
+# Romanised legal terms are common in English legal prose, so they only
+# count towards a text that is mostly made of them
+_TERM_SPELLINGS = frozenset(
+    spelling for spellings in hindi_legal_terms.values() for spelling in spellings if spelling.isascii()
+)
+_PUNCTUATION_TABLE = str.maketrans({char: " " for char in string.punctuation})
+_EXTRA_SPACES = re.compile(r" {2,}")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r" +(?=[.,;:!?])")
+
+
+@lru_cache(maxsize=65536)
+def fold_token(token):
+    """
+    Fold a lowercase token of Hindi or mixed-script text.
+
+    Returns:
+        str: The English term for a Hindi legal term, "" for a Hindi
+            stopword, the romanised key for other Devanagari words, and
+            other tokens unchanged
+    """
+    if not token.isascii() and not _DEVANAGARI.search(token):
+        return token
+    key = _key(token)
+    if key in _TERM_KEYS:
+        return _TERM_KEYS[key]
+    if key in (_LATIN_STOPWORD_KEYS if token.isascii() else _STOPWORD_KEYS):
+        return ""
+    # Latin words are only folded to match a known term, so English words
+    # in mixed text keep their spelling
+    return key if not token.isascii() else token
+
+
+def detect_script(text):
+    """
+    Detect the script a text is written in.
+
+    Returns:
+        str: "latin", "devanagari", "indic" (another Indian script) or
+            "mixed" when letters of more than one appear
+    """
+    if text.isascii():
+        return "latin"
+    scripts = [name for name, pattern in (("latin", _LATIN), ("devanagari", _DEVANAGARI), ("indic", _OTHER_INDIC))
+               if pattern.search(text)]
+    if len(scripts) == 1:
+        return scripts[0]
+    return "mixed" if scripts else "latin"
+
+
+def is_hindi(text):
+    """Whether a text is in Devanagari or reads as romanised Hindi."""
+    if not text.isascii() and _DEVANAGARI.search(text):
+        return True
+    # Splitting and a set lookup is far cheaper than a regex over the markers
+    words = text.lower().translate(_PUNCTUATION_TABLE).split()
+    if _MARKERS.isdisjoint(words) and _TERM_SPELLINGS.isdisjoint(words):
+        return False
+    markers = sum(word in _MARKERS for word in words)
+    terms = sum(word in _TERM_SPELLINGS for word in words)
+    letters = sum(word.isalpha() for word in words)
+    if markers >= MIN_MARKERS and markers >= MARKER_RATIO * letters:
+        return True
+    return 2 * (markers + terms) > letters
+
+
+def normalize_text(text):
+    """
+    Normalise a text before the English preprocessing.
+
+    English text is returned unchanged. In Hindi and romanised Hindi text
+    every word is lowercased and replaced with its folded token, see
+    fold_token(); punctuation is kept. Text in other scripts is only put in
+    Unicode NFC form.
+
+    Args:
+        text (str): Input text
+
+    Returns:
+        str: Normalised text
+    """
+    if not text:
+        return ""
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text)
+    if not is_hindi(text):
+        return text
+    text = WORD_PATTERN.sub(lambda match: fold_token(match.group()), text.lower().translate(_FOLD_TABLE))
+    # Close the gaps left by dropped stopwords
+    return _SPACE_BEFORE_PUNCTUATION.sub("", _EXTRA_SPACES.sub(" ", text)).strip()
+
+
+def normalize_batch(texts):
+    """
+    Normalise a batch of texts, see normalize_text().
+
+    normalize_text() is applied to each text in turn; there is no
+    vectorised pass. English texts return after the cheap per-text check,
+    and token folding is cached across calls, see fold_token().
+
+    Returns:
+        list: Normalised texts, in order
+    """
+    return [normalize_text(text) for text in texts]
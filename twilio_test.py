@@ -1,11 +1,53 @@
 import os
+import copy
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from twilio.rest import Client
 import streamlit as st
 
-def test_twilio_setup():
+# Diagnostics results are cached per set of credentials for this many seconds
+DIAGNOSTICS_TTL = float(os.environ.get("TWILIO_DIAGNOSTICS_TTL", "300"))
+
+_diagnostics_cache = {}
+_diagnostics_lock = threading.Lock()
+
+def _cache_key(account_sid, auth_token, from_number):
+    token_digest = hashlib.sha256(auth_token.encode("utf-8")).hexdigest()
+    return (account_sid, token_digest, from_number)
+
+def _timed(func, *args):
+    """Run a check and return (result, error, elapsed_ms)."""
+    start = time.perf_counter()
+    try:
+        return func(*args), None, (time.perf_counter() - start) * 1000
+    except Exception as e:
+        return None, e, (time.perf_counter() - start) * 1000
+
+def _fetch_account(client, account_sid):
+    account = client.api.accounts(account_sid).fetch()
+    return {
+        "friendly_name": account.friendly_name,
+        "status": account.status
+    }
+
+def _lookup_phone_number(client, from_number):
+    return client.incoming_phone_numbers.list(phone_number=from_number, limit=1)
+
+def test_twilio_setup(use_cache=True):
     """
     Test Twilio setup to identify issues with sending SMS.
     Returns a detailed status report.
+    
+    The account and phone number checks are independent network calls and
+    run concurrently. Reports are cached for DIAGNOSTICS_TTL seconds.
+    
+    Args:
+        use_cache (bool): If False, ignore any cached report and run all checks again
+    
+    Returns:
+        dict: Status report including per-check timings in milliseconds
     """
     report = {
         "credentials_found": False,
@@ -13,14 +55,20 @@ def test_twilio_setup():
         "account_info": None,
         "error": None,
         "phone_number_valid": False,
-        "overall_status": "Failed"
+        "overall_status": "Failed",
+        "timings": {},
+        "cached": False,
+        "checked_at": None
     }
+    total_start = time.perf_counter()
     
     try:
         # 1. Check if credentials are present
+        start = time.perf_counter()
         account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
         auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
         from_number = os.environ.get("TWILIO_PHONE_NUMBER")
+        report["timings"]["credentials"] = (time.perf_counter() - start) * 1000
         
         if not account_sid or not auth_token or not from_number:
             missing = []
@@ -34,39 +82,48 @@ def test_twilio_setup():
         # Credentials found
         report["credentials_found"] = True
         
+        # Format the phone number for consistency
+        if not from_number.startswith('+'):
+            from_number = '+' + from_number
+        
+        # Serve a recent report for the same credentials from the cache
+        key = _cache_key(account_sid, auth_token, from_number)
+        if use_cache:
+            with _diagnostics_lock:
+                cached = _diagnostics_cache.get(key)
+            if cached and time.time() - cached[0] < DIAGNOSTICS_TTL:
+                return dict(copy.deepcopy(cached[1]), cached=True)
+        
         # 2. Try to create a client
-        try:
-            client = Client(account_sid, auth_token)
-            report["client_created"] = True
-        except Exception as e:
-            report["error"] = f"Failed to create Twilio client: {str(e)}"
+        client, error, elapsed = _timed(Client, account_sid, auth_token)
+        report["timings"]["client"] = elapsed
+        if error:
+            report["error"] = f"Failed to create Twilio client: {str(error)}"
             return report
+        report["client_created"] = True
+        
+        # 3. Verify the account and 4. the sending number concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            account_future = executor.submit(_timed, _fetch_account, client, account_sid)
+            numbers_future = executor.submit(_timed, _lookup_phone_number, client, from_number)
+            account_info, account_error, account_elapsed = account_future.result()
+            numbers, numbers_error, numbers_elapsed = numbers_future.result()
         
-        # 3. Try to get account info to verify credentials
-        try:
-            account = client.api.accounts(account_sid).fetch()
-            report["account_info"] = {
-                "friendly_name": account.friendly_name,
-                "status": account.status
-            }
-        except Exception as e:
-            report["error"] = f"Failed to verify account: {str(e)}"
+        report["timings"]["account_fetch"] = account_elapsed
+        report["timings"]["phone_number_lookup"] = numbers_elapsed
+        
+        if account_error:
+            report["error"] = f"Failed to verify account: {str(account_error)}"
             return report
+        report["account_info"] = account_info
         
-        # 4. Check if provided phone number is valid for sending
-        try:
-            # Format the phone number for consistency
-            if not from_number.startswith('+'):
-                from_number = '+' + from_number
-                
-            numbers = client.incoming_phone_numbers.list(phone_number=from_number)
-            if not numbers:
-                report["error"] = f"The phone number {from_number} is not found in your Twilio account"
-            else:
-                report["phone_number_valid"] = True
-        except Exception as e:
-            report["error"] = f"Failed to verify phone number: {str(e)}"
+        if numbers_error:
+            report["error"] = f"Failed to verify phone number: {str(numbers_error)}"
             return report
+        if not numbers:
+            report["error"] = f"The phone number {from_number} is not found in your Twilio account"
+        else:
+            report["phone_number_valid"] = True
         
         # Everything looks good
         if report["credentials_found"] and report["client_created"] and report["phone_number_valid"]:
@@ -74,12 +131,52 @@ def test_twilio_setup():
         else:
             if not report["error"]:
                 report["error"] = "Some verifications failed. Check the report details."
+        
+        report["timings"]["total"] = (time.perf_counter() - total_start) * 1000
+        report["checked_at"] = time.time()
+        with _diagnostics_lock:
+            _diagnostics_cache[key] = (report["checked_at"], copy.deepcopy(report))
             
     except Exception as e:
         report["error"] = f"Unexpected error: {str(e)}"
     
+    report["timings"].setdefault("total", (time.perf_counter() - total_start) * 1000)
     return report
 
+def probe_twilio_health(max_age=None):
+    """
+    Cheap health check to call before sending notifications in bulk.
+    
+    Returns immediately when credentials are missing or a recent diagnostics
+    report exists, and only runs the network checks otherwise.
+    
+    Args:
+        max_age (float, optional): Maximum age in seconds of a cached report
+            to accept. Defaults to DIAGNOSTICS_TTL.
+    
+    Returns:
+        dict: "healthy" flag, the error if any, and whether the result was cached
+    """
+    max_age = DIAGNOSTICS_TTL if max_age is None else max_age
+    account_sid = os.environ.get("TWILIO_ACCOUNT_SID")
+    auth_token = os.environ.get("TWILIO_AUTH_TOKEN")
+    from_number = os.environ.get("TWILIO_PHONE_NUMBER")
+    
+    if not account_sid or not auth_token or not from_number:
+        return {"healthy": False, "error": "Missing Twilio credentials", "cached": False}
+    
+    if not from_number.startswith('+'):
+        from_number = '+' + from_number
+    
+    with _diagnostics_lock:
+        cached = _diagnostics_cache.get(_cache_key(account_sid, auth_token, from_number))
+    if cached and time.time() - cached[0] < max_age:
+        report = cached[1]
+        return {"healthy": report["overall_status"] == "Success", "error": report["error"], "cached": True}
+    
+    report = test_twilio_setup(use_cache=False)
+    return {"healthy": report["overall_status"] == "Success", "error": report["error"], "cached": False}
+
 # Create a Streamlit page to display test results
 def show_test_page():
     st.title("Twilio SMS Setup Test")
@@ -88,12 +185,17 @@ def show_test_page():
     This page tests your Twilio setup to diagnose SMS sending issues.
     """)
     
+    force_refresh = st.checkbox("Ignore cached results", value=False)
+    
     if st.button("Run Twilio Diagnostics", use_container_width=True):
         with st.spinner("Testing Twilio setup..."):
-            results = test_twilio_setup()
+            results = test_twilio_setup(use_cache=not force_refresh)
             
             st.markdown("## Test Results")
             
+            if results.get("cached"):
+                st.caption("Showing cached results. Tick \"Ignore cached results\" to run the checks again.")
+            
             # Status indicator
             if results["overall_status"] == "Success":
                 st.success("✅ Twilio setup verified successfully!")
@@ -132,6 +234,14 @@ def show_test_page():
                 else:
                     st.error("❌ Phone number verification failed")
             
+            # Timing breakdown
+            if results.get("timings"):
+                st.markdown("### Timings")
+                st.table({
+                    "Check": [name.replace("_", " ").title() for name in results["timings"]],
+                    "Time (ms)": [round(ms, 1) for ms in results["timings"].values()]
+                })
+            
             # Recommendations
             st.markdown("### Recommendations")
             
@@ -7,6 +7,7 @@ from nltk.corpus import stopwords
 import nltk
 import json
 import os
+from text_normalization import normalize_text, NON_WORD_PATTERN
 
 # Download required NLTK data
 try:
@@ -32,8 +33,8 @@ def load_svg(file_path):
 
 def preprocess_text(text):
     """
-    Preprocess text by removing special characters, converting to lowercase,
-    tokenizing, and removing stopwords.
+    Preprocess text by normalising Hindi text, removing special characters,
+    converting to lowercase, tokenizing, and removing stopwords.
     """
     if pd.isna(text) or text is None:
         return ""
@@ -41,13 +42,16 @@ def preprocess_text(text):
     # Convert to string if it's not already
     text = str(text)
     
-    # Remove special characters and numbers
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\d+', '', text)
+    # Fold Hindi and romanised Hindi onto English terms, dropping Hindi stopwords
+    text = normalize_text(text)
     
     # Convert to lowercase
     text = text.lower()
     
+    # Remove special characters and numbers, keeping Indic vowel signs
+    text = NON_WORD_PATTERN.sub('', text)
+    text = re.sub(r'\d+', '', text)
+    
     # Tokenize
     tokens = word_tokenize(text)
     